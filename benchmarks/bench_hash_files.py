@@ -0,0 +1,62 @@
+"""
+Compares hashing data files by reading them whole against the chunked,
+memory-mapped hashing used for register_data crates, on one thread and
+across threads.
+
+Usage: python benchmarks/bench_hash_files.py [--files 4] [--size-mb 64]
+"""
+import argparse
+import hashlib
+import os
+import tempfile
+import time
+
+from pcl_exchange.datafiles import hash_files
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def read_whole(paths):
+    # the hand-rolled approach: read each file into memory, then hash it
+    for path in paths:
+        with open(path, "rb") as f:
+            hashlib.sha256(f.read()).hexdigest()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--files", type=int, default=4)
+    parser.add_argument("--size-mb", type=int, default=64)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = []
+        for i in range(args.files):
+            path = os.path.join(directory, f"scan_{i}.raw")
+            with open(path, "wb") as f:
+                for _ in range(args.size_mb):
+                    f.write(os.urandom(1024 * 1024))
+            paths.append(path)
+
+        total_mb = args.files * args.size_mb
+        runs = {
+            "read whole file": lambda: read_whole(paths),
+            "mmap chunks, 1 thread": lambda: hash_files(paths, workers=1),
+            "mmap chunks, threads": lambda: hash_files(paths),
+        }
+        print(f"{'path':>24} {'s':>8} {'MB/s':>8}")
+        for label, run in runs.items():
+            elapsed = best_of(run, args.repeat)
+            print(f"{label:>24} {elapsed:>8.3f} {total_mb / elapsed:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
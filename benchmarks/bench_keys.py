@@ -0,0 +1,80 @@
+"""
+Compares looking up and parsing the sender's JWK per message, from a peers
+file, against a KeyResolver over the same file, for growing numbers of peers.
+
+Usage: python benchmarks/bench_keys.py [--peers 3 30 300] [--messages 2000] [--repeat 5]
+"""
+import argparse
+import json
+import logging
+import tempfile
+import time
+from pathlib import Path
+
+from jwcrypto import jwk
+
+from pcl_exchange.builder import PCLMessageBuilder
+from pcl_exchange.crypto import Signer, Verifier
+from pcl_exchange.keys import JWKSFile, KeyResolver
+
+
+def build_envelopes(peers: int, count: int):
+    keys, envelopes = {}, []
+    for p in range(peers):
+        sender = f"https://ror.org/0{p:08d}"
+        key = jwk.JWK.generate(kty="OKP", crv="Ed25519")
+        keys[sender] = key.export_public(as_dict=True)
+        signer = Signer(key)
+        for i in range(count // peers):
+            builder = PCLMessageBuilder(sender, "https://ror.org/01bj3aw27")
+            builder.set_content(
+                "urn:aimd:instrument:proto-xrd-01",
+                f"igsn:XYZ{i:05d}",
+                "urn:aimd:method:xrd:powder:theta-2theta:v1",
+                {"step": {"val": 0.02, "unit": "deg"}},
+            )
+            builder.sign(signer)
+            envelopes.append(json.loads(builder.build().to_json())["@graph"][2])
+    # interleave the senders like a busy receiver sees them
+    envelopes.sort(key=lambda envelope: envelope["@id"] + envelope["dateCreated"])
+    return keys, envelopes
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def load_verifier(path: Path, sender: str) -> Verifier:
+    # what a receiver without a resolver does for every message
+    return Verifier(json.loads(path.read_text())[sender])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--peers", type=int, nargs="+", default=[3, 30, 300])
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    print(f"{'peers':>6} {'per message':>12} {'resolver':>10} {'speedup':>8}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for peers in args.peers:
+            keys, envelopes = build_envelopes(peers, args.messages)
+            path = Path(tmp) / f"peers-{peers}.json"
+            path.write_text(json.dumps(keys))
+
+            per_message = best_of(lambda: [load_verifier(path, e["sender"]).check(e) for e in envelopes], args.repeat)
+            resolver = KeyResolver([JWKSFile(path)])
+            resolved = best_of(lambda: [resolver.check(e) for e in envelopes], args.repeat)
+            rate = len(envelopes) / resolved
+            print(f"{peers:>6} {len(envelopes) / per_message:>10.0f}/s {rate:>8.0f}/s {per_message / resolved:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Compares inbound parsing of crates: the old untagged @graph union against
+PCLMessage.from_json_bytes, eager and lazy.
+
+Usage: python benchmarks/bench_parse.py [--params 2 1000] [--repeat 200]
+"""
+import argparse
+import json
+import time
+from typing import Any, Dict, List, Union
+
+from pydantic import BaseModel, ConfigDict, Field
+
+from pcl_exchange.builder import PCLMessageBuilder
+from pcl_exchange.models import PCLActionContent, PCLEnvelope, PCLMessage, ROCrateMetadata, ROCrateRoot
+
+
+class UntaggedMessage(BaseModel):
+    # the @graph annotation PCLMessage used before the tagged union
+    model_config = ConfigDict(populate_by_name=True)
+    context: List[Any] = Field(..., alias="@context")
+    graph: List[Union[ROCrateMetadata, ROCrateRoot, PCLEnvelope, PCLActionContent, Dict[str, Any]]] = Field(
+        ..., alias="@graph"
+    )
+
+
+def build_crate(n_params: int) -> bytes:
+    builder = PCLMessageBuilder("https://ror.org/03yrm5c26", "https://ror.org/01bj3aw27")
+    params = {f"p{i}": {"val": i * 0.5, "unit": "deg"} for i in range(n_params)}
+    builder.set_content(
+        "urn:aimd:instrument:proto-xrd-01",
+        "igsn:XYZ12345",
+        "urn:aimd:method:xrd:powder:theta-2theta:v1",
+        params,
+    )
+    builder.add_capability("xrd.powder.theta-2theta")
+    return builder.build().to_json().encode()
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--params", type=int, nargs="+", default=[2, 1000])
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+
+    paths = {
+        "untagged (json.loads)": lambda data: UntaggedMessage.model_validate(json.loads(data)),
+        "from_json_bytes": PCLMessage.from_json_bytes,
+        "lazy, envelope only": lambda data: PCLMessage.from_json_bytes(data, lazy=True).envelope,
+        "lazy, then content": lambda data: PCLMessage.from_json_bytes(data, lazy=True).content,
+    }
+    print(f"{'params':>8} {'path':>24} {'us':>10} {'speedup':>8}")
+    for n in args.params:
+        data = build_crate(n)
+        baseline = None
+        for label, parse in paths.items():
+            elapsed = best_of(lambda: parse(data), args.repeat)
+            baseline = baseline or elapsed
+            print(f"{n:>8} {label:>24} {elapsed * 1e6:>10.1f} {baseline / elapsed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
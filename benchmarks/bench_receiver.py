@@ -0,0 +1,79 @@
+"""
+Pushes signed messages through the ReceiverPipeline and reports messages per
+second and the deepest queue seen at each stage.
+
+Usage: python benchmarks/bench_receiver.py [--count 500] [--queue-size 64] [--shacl 4]
+"""
+import argparse
+import asyncio
+
+from jwcrypto import jwk
+
+from pcl_exchange.builder import PCLMessageBuilder
+from pcl_exchange.crypto import Signer, Verifier
+from pcl_exchange.receiver import STAGES, ReceiverPipeline
+
+SENDER = "https://ror.org/03yrm5c26"
+RECEIVER = "https://ror.org/01bj3aw27"
+
+
+def build_messages(count: int, key: jwk.JWK) -> list:
+    signer = Signer(key)
+    messages = []
+    for i in range(count):
+        builder = PCLMessageBuilder(SENDER, RECEIVER)
+        builder.set_content(
+            "urn:aimd:instrument:proto-xrd-01",
+            "igsn:XYZ12345",
+            "urn:aimd:method:xrd:powder:theta-2theta:v1",
+            {"step": {"val": 0.02, "unit": "deg"}, "index": {"val": i}},
+        )
+        builder.add_capability("xrd.powder.theta-2theta")
+        builder.sign(signer)
+        messages.append(builder.build().to_bytes())
+    return messages
+
+
+async def run(messages: list, pipeline: ReceiverPipeline) -> dict:
+    deepest = dict.fromkeys(STAGES, 0)
+    async with pipeline:
+        futures = []
+        for data in messages:
+            futures.append(await pipeline.submit(data))
+            for stage, depth in pipeline.stats().queue_depths.items():
+                deepest[stage] = max(deepest[stage], depth)
+        await asyncio.gather(*futures)
+    return deepest
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=500)
+    parser.add_argument("--queue-size", type=int, default=64)
+    parser.add_argument("--shacl", type=int, default=4, help="SHACL stage workers")
+    args = parser.parse_args()
+
+    sender_key = jwk.JWK.generate(kty="OKP", crv="Ed25519")
+    receiver_key = jwk.JWK.generate(kty="OKP", crv="Ed25519")
+    messages = build_messages(args.count, sender_key)
+
+    for fast in (True, False):
+        pipeline = ReceiverPipeline(
+            RECEIVER,
+            signer=Signer(receiver_key),
+            verifier=Verifier(sender_key),
+            fast=fast,
+            queue_size=args.queue_size,
+            concurrency={"shacl": args.shacl},
+        )
+        deepest = asyncio.run(run(messages, pipeline))
+        stats = pipeline.stats()
+        print(
+            f"fast={fast!s:<5} {stats.messages_per_second:>8.1f} msg/s"
+            f"  accepted {stats.accepted}/{stats.received}"
+            f"  max queue depth " + " ".join(f"{stage}={depth}" for stage, depth in deepest.items())
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""
+Measures ReplayGuard checks per second, in memory and with the SQLite store.
+
+Usage: python benchmarks/bench_replay.py [--count 100000]
+"""
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+
+from pcl_exchange.replay import ReplayGuard, SQLiteReplayStore
+
+
+def run(guard: ReplayGuard, envelopes) -> float:
+    start = time.perf_counter()
+    for envelope in envelopes:
+        guard.check(envelope)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--count", type=int, default=100_000)
+    args = parser.parse_args()
+
+    now = datetime.now(timezone.utc)
+    envelopes = [
+        {"identifier": f"urn:uuid:{i:032x}", "sender": "https://ror.org/03yrm5c26", "dateCreated": now}
+        for i in range(args.count)
+    ]
+
+    print(f"{'store':>10} {'new /s':>12} {'replayed /s':>12}")
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ("memory", "sqlite"):
+            store = SQLiteReplayStore(os.path.join(tmp, "replay.sqlite")) if name == "sqlite" else None
+            guard = ReplayGuard(store=store)
+            fresh = run(guard, envelopes)
+            replayed = run(guard, envelopes)
+            guard.close()
+            print(f"{name:>10} {args.count / fresh:>12,.0f} {args.count / replayed:>12,.0f}")
+
+
+if __name__ == "__main__":
+    main()
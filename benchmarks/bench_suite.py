@@ -0,0 +1,271 @@
+"""
+Measures the intake path (build, sign, verify, validate_structure and
+validate_semantics) over parameter counts and batch sizes.
+
+Every case reports ops/s, p50 and p99 latency per operation and the peak
+memory traced while running one batch. Results can be saved as a JSON
+baseline, and a later run compared against it: a case whose ops/s drops,
+or whose peak memory grows, by more than --threshold is flagged, and the
+exit status is 1. Nothing is fetched from the network, remote JSON-LD
+contexts are served from the bundled copies.
+
+Usage:
+    python benchmarks/bench_suite.py --save baseline.json
+    python benchmarks/bench_suite.py --compare baseline.json [--threshold 0.15]
+    python benchmarks/bench_suite.py --ops build semantics_fast --params 1 10000 --batch 1
+"""
+import argparse
+import json
+import logging
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from jwcrypto import jwk
+
+from pcl_exchange.builder import PCLMessageBuilder
+from pcl_exchange.contexts import ContextLoader
+from pcl_exchange.cache import ValidationCache
+from pcl_exchange.crypto import Signer, Verifier
+from pcl_exchange.params import ParameterTable
+from pcl_exchange.validation import validate_message, validate_semantics, validate_structure
+
+SENDER = "https://ror.org/03yrm5c26"
+RECEIVER = "https://ror.org/01bj3aw27"
+
+# operations whose cost grows with the number of parameters; the others only see the envelope
+CONTENT_OPS = ("build", "build_table", "semantics_fast", "semantics", "semantics_closure", "message_cached")
+OPS = (
+    "build", "build_table", "sign", "verify", "structure", "semantics_fast", "semantics", "semantics_closure",
+    "message_cached",
+)
+# operations running pyshacl, capped by --shacl-max-params
+PYSHACL_OPS = ("semantics", "semantics_closure")
+
+# packages whose upgrades the baselines are meant to catch
+PACKAGES = ("pydantic", "pydantic-core", "jwcrypto", "cryptography", "rdflib", "pyshacl", "jsonschema")
+
+
+def make_params(n_params: int) -> Dict[str, Dict[str, Any]]:
+    return {f"p{i}": {"val": i * 0.37, "unit": "deg"} for i in range(n_params)}
+
+
+def make_builder(params: Union[Dict[str, Dict[str, Any]], ParameterTable]) -> PCLMessageBuilder:
+    builder = PCLMessageBuilder(SENDER, RECEIVER)
+    builder.set_content(
+        "urn:aimd:instrument:proto-xrd-01",
+        "igsn:XYZ12345",
+        "urn:aimd:method:xrd:powder:theta-2theta:v1",
+        params,
+    )
+    builder.add_capability("xrd.powder.theta-2theta")
+    return builder
+
+
+def make_case(op: str, n_params: int, batch: int, key: jwk.JWK, loader: ContextLoader) -> Callable[[], Any]:
+    """Prepares the inputs of one case and returns a function running one batch of it."""
+    signer = Signer(key)
+    params = make_params(n_params)
+    if op == "build":
+        # the content is validated in set_content, so time the whole builder path
+        return lambda: [make_builder(params).build() for _ in range(batch)]
+    if op == "build_table":
+        # the same parameters as columns, built from the columns a scan definition would have
+        names = list(params)
+        values = [spec["val"] for spec in params.values()]
+        return lambda: [make_builder(ParameterTable(names, values, "deg")).build() for _ in range(batch)]
+
+    documents = []
+    for _ in range(batch):
+        builder = make_builder(params)
+        builder.sign(signer)
+        documents.append(json.loads(builder.build().to_json()))
+    envelopes = [document["@graph"][2] for document in documents]
+
+    if op == "sign":
+        # plain dicts, so every call pays for canonicalization like a fresh envelope would
+        return lambda: [signer.sign(envelope) for envelope in envelopes]
+    if op == "verify":
+        verifier = Verifier(jwk.JWK(**key.export_public(as_dict=True)))
+        return lambda: [verifier.verify(envelope) for envelope in envelopes]
+    if op == "structure":
+        return lambda: [validate_structure(envelope) for envelope in envelopes]
+    if op in ("semantics", "semantics_fast", "semantics_closure"):
+        fast = op == "semantics_fast"
+        inference = "closure" if op == "semantics_closure" else "rdfs"
+        return lambda: [
+            validate_semantics(document, fast=fast, context_loader=loader, inference=inference)
+            for document in documents
+        ]
+    if op == "message_cached":
+        # redeliveries: the verdicts are cached up front, so this is digest and lookup only
+        texts = [json.dumps(document) for document in documents]
+        cache = ValidationCache()
+        options = {"fast": True, "context_loader": loader, "cache": cache}
+        for text in texts:
+            validate_message(text, **options)
+        return lambda: [validate_message(text, **options) for text in texts]
+    raise ValueError(f"Unknown operation '{op}'")
+
+
+def percentile(samples: List[float], q: float) -> float:
+    """Nearest-rank percentile."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+
+def run_case(fn: Callable[[], Any], batch: int, min_time: float, max_rounds: int) -> Dict[str, float]:
+    fn()  # warm up caches and compiled validators
+    samples = []
+    spent = 0.0
+    while len(samples) < max_rounds and (spent < min_time or len(samples) < 3):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        spent += elapsed
+        samples.append(elapsed / batch)
+        if spent > min_time and elapsed > min_time:
+            # one round already took longer than the budget, more rounds add little
+            break
+
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "rounds": len(samples),
+        "ops_per_sec": batch * len(samples) / spent,
+        "p50_ms": percentile(samples, 0.50) * 1e3,
+        "p99_ms": percentile(samples, 0.99) * 1e3,
+        "peak_kib": peak / 1024,
+    }
+
+
+def environment() -> Dict[str, Any]:
+    from importlib.metadata import PackageNotFoundError, version
+
+    packages = {}
+    for name in PACKAGES:
+        try:
+            packages[name] = version(name)
+        except PackageNotFoundError:
+            packages[name] = None
+    return {
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "packages": packages,
+    }
+
+
+def case_name(op: str, n_params: Optional[int], batch: int) -> str:
+    params = "envelope" if n_params is None else f"params={n_params}"
+    return f"{op}/{params}/batch={batch}"
+
+
+def run_suite(args) -> Dict[str, Any]:
+    key = jwk.JWK.generate(kty="OKP", crv="Ed25519")
+    # bundled contexts only, a missing one fails instead of going to the network
+    loader = ContextLoader(allow_remote=False)
+    results = []
+    print(f"{'case':<40} {'rounds':>6} {'ops/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'peak KiB':>10}")
+    for op in args.ops:
+        param_counts = args.params if op in CONTENT_OPS else [None]
+        for n_params in param_counts:
+            if op in PYSHACL_OPS and n_params > args.shacl_max_params:
+                continue
+            for batch in args.batch:
+                name = case_name(op, n_params, batch)
+                fn = make_case(op, n_params or 1, batch, key, loader)
+                result = run_case(fn, batch, args.min_time, args.max_rounds)
+                results.append(dict(case=name, op=op, params=n_params, batch=batch, **result))
+                print(
+                    f"{name:<40} {result['rounds']:>6} {result['ops_per_sec']:>10.1f} {result['p50_ms']:>9.3f}"
+                    f" {result['p99_ms']:>9.3f} {result['peak_kib']:>10.1f}"
+                )
+    return {"environment": environment(), "results": results}
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any], threshold: float) -> List[str]:
+    """
+    Compares two runs case by case.
+
+    Returns:
+        One line per regressed case. Cases missing from either run are ignored.
+    """
+    old = {result["case"]: result for result in baseline["results"]}
+    regressions = []
+    print(f"\n{'case':<40} {'ops/s':>10} {'change':>8} {'p99 change':>10} {'peak change':>11}")
+    for result in current["results"]:
+        before = old.get(result["case"])
+        if before is None:
+            continue
+        speed = result["ops_per_sec"] / before["ops_per_sec"] - 1
+        p99 = result["p99_ms"] / before["p99_ms"] - 1 if before["p99_ms"] else 0.0
+        memory = result["peak_kib"] / before["peak_kib"] - 1 if before["peak_kib"] else 0.0
+        flags = []
+        if speed < -threshold:
+            flags.append(f"ops/s {speed:+.0%}")
+        # tiny allocations jitter by a few KiB, only flag growth that is also large in absolute terms
+        if memory > threshold and result["peak_kib"] - before["peak_kib"] > 64:
+            flags.append(f"peak memory {memory:+.0%}")
+        marker = "  REGRESSION" if flags else ""
+        print(f"{result['case']:<40} {result['ops_per_sec']:>10.1f} {speed:>+8.0%} {p99:>+10.0%} {memory:>+11.0%}{marker}")
+        if flags:
+            regressions.append(f"{result['case']}: {', '.join(flags)}")
+
+    changed = {
+        name: (baseline["environment"]["packages"].get(name), version)
+        for name, version in current["environment"]["packages"].items()
+        if baseline["environment"]["packages"].get(name) != version
+    }
+    for name, (before, after) in changed.items():
+        print(f"{name}: {before} -> {after}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--ops", nargs="+", choices=OPS, default=list(OPS))
+    parser.add_argument("--params", type=int, nargs="+", default=[1, 10, 100, 1000, 10000])
+    parser.add_argument("--batch", type=int, nargs="+", default=[1, 16])
+    parser.add_argument("--min-time", type=float, default=1.0, help="Seconds spent timing each case")
+    parser.add_argument("--max-rounds", type=int, default=1000)
+    parser.add_argument(
+        "--shacl-max-params", type=int, default=1000,
+        help="Largest parameter count run through pyshacl, which takes tens of seconds at 10k",
+    )
+    parser.add_argument("--save", metavar="PATH", help="Write the results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="Compare against a saved baseline")
+    parser.add_argument("--threshold", type=float, default=0.15, help="Relative change flagged as a regression")
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    current = run_suite(args)
+
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(current, f, indent=2)
+        print(f"\nSaved {len(current['results'])} results to {args.save}")
+
+    if baseline is not None:
+        regressions = compare(baseline, current, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) beyond {args.threshold:.0%}:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("\nNo regressions.")
+
+
+if __name__ == "__main__":
+    main()
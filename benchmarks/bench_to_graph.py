@@ -0,0 +1,64 @@
+"""
+Compares the JSON-LD round-trip against PCLMessage.to_graph().
+
+Usage: python benchmarks/bench_to_graph.py [--params 1 100 1000] [--repeat 20]
+"""
+import argparse
+import json
+import time
+
+from rdflib import Graph
+
+from pcl_exchange.builder import PCLMessageBuilder
+from pcl_exchange.contexts import default_loader
+from pcl_exchange.rdf import CRATE_BASE
+
+
+def build_message(n_params: int):
+    builder = PCLMessageBuilder("https://ror.org/03yrm5c26", "https://ror.org/01bj3aw27")
+    params = {f"p{i}": {"val": i * 0.5, "unit": "deg"} for i in range(n_params)}
+    builder.set_content(
+        "urn:aimd:instrument:proto-xrd-01",
+        "igsn:XYZ12345",
+        "urn:aimd:method:xrd:powder:theta-2theta:v1",
+        params,
+    )
+    builder.add_capability("xrd.powder.theta-2theta")
+    return builder.build()
+
+
+def jsonld_roundtrip(message) -> Graph:
+    # the path validate_semantics takes for a JSON string
+    document = default_loader.resolve(json.loads(message.to_json()))
+    return Graph().parse(data=json.dumps(document), format="json-ld", base=CRATE_BASE)
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--params", type=int, nargs="+", default=[1, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'params':>8} {'json-ld (ms)':>14} {'to_graph (ms)':>14} {'speedup':>8}")
+    for n in args.params:
+        message = build_message(n)
+        # warm up the context and term caches
+        jsonld_roundtrip(message)
+        message.to_graph()
+
+        slow = best_of(lambda: jsonld_roundtrip(message), args.repeat)
+        fast = best_of(message.to_graph, args.repeat)
+        print(f"{n:>8} {slow * 1e3:>14.2f} {fast * 1e3:>14.2f} {slow / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Measures validate_many throughput for a range of worker counts.
+
+Usage: python benchmarks/bench_validate_many.py [--messages 400] [--workers 1 2 4] [--fast]
+"""
+import argparse
+import os
+import time
+
+from jwcrypto import jwk
+
+from pcl_exchange.builder import PCLMessageBuilder
+from pcl_exchange.crypto import Signer
+from pcl_exchange.validation import validate_many
+
+
+def build_messages(count: int, n_params: int):
+    signer = Signer(jwk.JWK.generate(kty="OKP", crv="Ed25519"))
+    messages = []
+    for i in range(count):
+        builder = PCLMessageBuilder("https://ror.org/03yrm5c26", "https://ror.org/01bj3aw27")
+        params = {f"p{j}": {"val": j * 0.5, "unit": "deg"} for j in range(n_params)}
+        builder.set_content(
+            "urn:aimd:instrument:proto-xrd-01",
+            f"igsn:XYZ{i:05d}",
+            "urn:aimd:method:xrd:powder:theta-2theta:v1",
+            params,
+        )
+        builder.add_capability("xrd.powder.theta-2theta")
+        builder.sign(signer)
+        messages.append(builder.build().to_json())
+    return messages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--messages", type=int, default=400)
+    parser.add_argument("--params", type=int, default=20)
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, 2, os.cpu_count() or 1}))
+    parser.add_argument("--chunksize", type=int, default=8)
+    parser.add_argument("--fast", action="store_true", help="use the compiled SHACL checks")
+    args = parser.parse_args()
+
+    messages = build_messages(args.messages, args.params)
+    print(f"{'workers':>8} {'seconds':>9} {'msg/s':>9} {'scaling':>8}")
+    baseline = None
+    for workers in args.workers:
+        start = time.perf_counter()
+        results = list(validate_many(messages, workers=workers, chunksize=args.chunksize, fast=args.fast))
+        elapsed = time.perf_counter() - start
+        assert all(ok for ok, _ in results), next(r for ok, r in results if not ok)
+        rate = len(messages) / elapsed
+        baseline = baseline or rate
+        print(f"{workers:>8} {elapsed:>9.2f} {rate:>9.1f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
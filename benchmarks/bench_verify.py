@@ -0,0 +1,78 @@
+"""
+Compares per-call Verifier.verify through jwcrypto against Verifier.verify_many.
+
+Usage: python benchmarks/bench_verify.py [--envelopes 2000] [--workers 1 4] [--repeat 5]
+"""
+import argparse
+import json
+import logging
+import os
+import time
+
+from jwcrypto import jwk, jws
+
+from pcl_exchange.builder import PCLMessageBuilder
+from pcl_exchange.crypto import Signer, Verifier, canonicalize
+
+
+def build_envelopes(count: int, key):
+    signer = Signer(key)
+    envelopes = []
+    for i in range(count):
+        builder = PCLMessageBuilder("https://ror.org/03yrm5c26", "https://ror.org/01bj3aw27")
+        builder.set_content(
+            "urn:aimd:instrument:proto-xrd-01",
+            f"igsn:XYZ{i:05d}",
+            "urn:aimd:method:xrd:powder:theta-2theta:v1",
+            {"step": {"val": 0.02, "unit": "deg"}},
+        )
+        builder.sign(signer)
+        message = json.loads(builder.build().to_json())
+        envelopes.append(next(n for n in message["@graph"] if n["@id"] == "#envelope"))
+    return envelopes
+
+
+def jwcrypto_verify(key, envelope) -> bool:
+    # the per-call path Verifier.verify used before the key was pre-parsed
+    try:
+        verifier = jws.JWS()
+        verifier.deserialize(envelope["authz"]["jws"])
+        verifier.verify(key, detached_payload=canonicalize(envelope))
+        return True
+    except jws.InvalidJWSSignature:
+        return False
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--envelopes", type=int, default=2000)
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, os.cpu_count() or 1}))
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+    logging.disable(logging.WARNING)
+
+    key = jwk.JWK.generate(kty="OKP", crv="Ed25519")
+    public = jwk.JWK(**key.export_public(as_dict=True))
+    envelopes = build_envelopes(args.envelopes, key)
+    verifier = Verifier(public)
+
+    baseline = best_of(lambda: [jwcrypto_verify(public, e) for e in envelopes], args.repeat)
+    print(f"{'path':>22} {'seconds':>9} {'env/s':>10} {'speedup':>8}")
+    print(f"{'jwcrypto per call':>22} {baseline:>9.3f} {len(envelopes) / baseline:>10.0f} {1:>7.1f}x")
+    for workers in args.workers:
+        elapsed = best_of(lambda: verifier.verify_many(envelopes, workers=workers), args.repeat)
+        label = f"verify_many x{workers}"
+        print(f"{label:>22} {elapsed:>9.3f} {len(envelopes) / elapsed:>10.0f} {baseline / elapsed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Compares wire sizes and encode/decode times of indented JSON against the
+compact encodings, and the cost of the content digest check on receipt.
+
+Usage: python benchmarks/bench_wire.py [--params 2 1000] [--repeat 100]
+"""
+import argparse
+import json
+import time
+
+from pcl_exchange.builder import PCLMessageBuilder
+from pcl_exchange.models import PCLMessage
+from pcl_exchange.wire import check_content_digest, decompress
+
+
+def build_message(n_params: int, encoding: str) -> PCLMessage:
+    builder = PCLMessageBuilder("https://ror.org/03yrm5c26", "https://ror.org/01bj3aw27")
+    params = {f"p{i}": {"val": i * 0.37, "unit": "deg"} for i in range(n_params)}
+    builder.set_content(
+        "urn:aimd:instrument:proto-xrd-01",
+        "igsn:XYZ12345",
+        "urn:aimd:method:xrd:powder:theta-2theta:v1",
+        params,
+    )
+    builder.add_capability("xrd.powder.theta-2theta")
+    builder.set_encoding(encoding)
+    return builder.build()
+
+
+def best_of(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--params", type=int, nargs="+", default=[2, 1000])
+    parser.add_argument("--repeat", type=int, default=100)
+    args = parser.parse_args()
+
+    encodings = ["identity", "gzip"]
+    try:
+        import zstandard  # noqa: F401
+        encodings.append("zstd")
+    except ImportError:
+        pass
+
+    print(f"{'params':>8} {'encoding':>10} {'bytes':>10} {'encode us':>10} {'decode us':>10} {'digest us':>10}")
+    for n in args.params:
+        message = build_message(n, "identity")
+        text = message.to_json().encode()
+        encode = best_of(message.to_json, args.repeat)
+        decode = best_of(lambda: PCLMessage.model_validate(json.loads(text)), args.repeat)
+        print(f"{n:>8} {'indented':>10} {len(text):>10} {encode * 1e6:>10.1f} {decode * 1e6:>10.1f} {'-':>10}")
+
+        for encoding in encodings:
+            message = build_message(n, encoding)
+            data = message.to_bytes()
+            document = json.loads(decompress(data)[0])
+            encode = best_of(message.to_bytes, args.repeat)
+            decode = best_of(lambda: PCLMessage.from_bytes(data), args.repeat)
+            digest = best_of(lambda: check_content_digest(document), args.repeat)
+            print(
+                f"{n:>8} {encoding:>10} {len(data):>10} {encode * 1e6:>10.1f}"
+                f" {decode * 1e6:>10.1f} {digest * 1e6:>10.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""
+Building, signing, exchanging and validating PCL messages.
+
+The names below are imported from their submodules on first access, so
+`import pcl_exchange` is cheap, and a process that only builds and signs
+messages never loads rdflib, pyshacl, jsonschema or jwcrypto:
+
+    from pcl_exchange import PCLMessageBuilder, Signer
+    from pcl_exchange import validate_message  # loads the validation stack
+"""
+from importlib import import_module
+from typing import Any, List
+
+# public name -> submodule defining it
+_EXPORTS = {
+    "PCLMessageBuilder": "builder",
+    "PCLDataRegistrationBuilder": "builder",
+    "PCLReplyBuilder": "builder",
+    "PCLCampaignBuilder": "builder",
+    "PCLMessage": "models",
+    "LazyPCLMessage": "models",
+    "PCLEnvelope": "models",
+    "PCLActionContent": "models",
+    "PCLDatasetContent": "models",
+    "PCLReplyContent": "models",
+    "PCLError": "models",
+    "ContentDigest": "models",
+    "DataFile": "models",
+    "ParameterTable": "params",
+    "Signer": "crypto",
+    "Verifier": "crypto",
+    "VerificationResult": "crypto",
+    "KeyResolver": "keys",
+    "JWKSFile": "keys",
+    "DidWebBackend": "keys",
+    "validate_structure": "validation",
+    "validate_semantics": "validation",
+    "validate_message": "validation",
+    "validate_many": "validation",
+    "SchemaRegistry": "registry",
+    "default_registry": "registry",
+    "ContextLoader": "contexts",
+    "ReplayGuard": "replay",
+    "ReceiverPipeline": "receiver",
+    "DataFileVerifier": "datafiles",
+    "hash_file": "datafiles",
+    "ValidationCache": "cache",
+    "SQLiteResultStore": "cache",
+    "MetricsRecorder": "metrics",
+    "recording": "metrics",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name: str) -> Any:
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(import_module(f".{module}", __name__), name)
+    # later lookups find the name directly and skip this function
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(_EXPORTS))
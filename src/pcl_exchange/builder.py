@@ -1,6 +1,37 @@
+import os
+import posixpath
+import re
 import uuid
 from datetime import datetime, timezone
-from .models import PCLMessage, PCLEnvelope, PCLActionContent, ROCrateMetadata, ROCrateRoot
+from itertools import zip_longest
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+from .datafiles import CHUNK_SIZE, FILE_ALGORITHMS, hash_files
+from .metrics import span, timed
+from .params import ParameterTable
+from .models import (
+    ACTION_FAILED, AuthZ, ContentDigest, DataFile, PCLError, PCLMessage, PCLEnvelope, PCLActionContent,
+    PCLDatasetContent, PCLReplyContent, PropertyValue, ROCrateMetadata, ROCrateRoot,
+)
+
+REGISTER_DATA_SCHEMA = "https://w3id.org/pcl-schema/register-data/v1.0"
+REPLY_SCHEMA = "https://w3id.org/pcl-schema/reply/v1.0"
+
+# error.json restricts correlationId further than envelope identifiers
+_CORRELATION_ID = re.compile(r"[A-Za-z0-9_.:-]{6,128}")
+
+
+def default_context() -> List[Any]:
+    """Returns a fresh copy of the JSON-LD context used for PCL messages."""
+    return [
+        "https://w3id.org/ro/crate/1.1/context",
+        {
+            "prov": "http://www.w3.org/ns/prov#", 
+            "qudt": "http://qudt.org/schema/qudt/",
+            "parameter": "http://schema.org/parameter",
+            "unitText": "http://schema.org/unitText"
+        }
+    ]
+
 
 class PCLMessageBuilder:
     def __init__(self, sender_id: str, receiver_id: str):
@@ -14,17 +45,42 @@ class PCLMessageBuilder:
         self.project_id = "doi:10.1234/placeholder" 
         self.sample_id = ""
         self.authz = None 
+        self.encoding = "identity"
+        self.digest_alg = "sha256"
+        self._content_digest = None
         
-    def set_content(self, instrument: str, sample: str, method: str, params: dict):
+    def set_content(self, instrument: str, sample: str, method: str, params: Union[dict, ParameterTable]):
         self.sample_id = sample
-        self.payload = PCLActionContent.create(
-            instrument_id=instrument,
-            sample_id=sample,
-            method_id=method,
-            params=params
-        )
+        with span("build.content"):
+            self.payload = PCLActionContent.create(
+                instrument_id=instrument,
+                sample_id=sample,
+                method_id=method,
+                params=params
+            )
+        self._content_digest = None
+        return self
+
+    def set_encoding(self, encoding: str, digest_alg: Optional[str] = None):
+        """
+        Sets the wire encoding declared in the envelope (identity, gzip or zstd)
+        and optionally the contentDigest algorithm (sha256, sha384 or sha512).
+        """
+        self.encoding = encoding
+        if digest_alg is not None:
+            self.digest_alg = digest_alg
+        self._content_digest = None
         return self
 
+    def _digest(self) -> Optional[ContentDigest]:
+        # computed once per content, sign() and build() share it
+        if self.payload is None:
+            return None
+        if self._content_digest is None:
+            with span("build.digest"):
+                self._content_digest = ContentDigest.of(self.payload, self.digest_alg)
+        return self._content_digest
+
     def add_capability(self, capability: str):
         self.capabilities.append(capability)
         return self
@@ -44,29 +100,29 @@ class PCLMessageBuilder:
             identifier=self.envelope_uuid,      # overrides default_factory=uuid
             date_created=self.creation_timestamp, # overrides default_factory=datetime    
             contentRef={"@id": "#content"},
+            content_digest=self._digest(),
+            encoding=self.encoding,
             authz=authz_data
         )
 
     def sign(self, signer):
         temp_envelope = self._create_envelope_model(authz_data=None)
-        envelope_data = temp_envelope.model_dump(
-            mode='json', 
-            by_alias=True, 
-            exclude_none=True
-        )
         
-        jws_string = signer.sign(envelope_data)
+        # signs the envelope's memoized canonical bytes
+        jws_string = signer.sign(temp_envelope)
         
         self.authz = {
             "type": "DetachedJWS",
             "jws": jws_string
         }
 
+    @timed("build")
     def build(self) -> PCLMessage:
         if not self.payload:
             raise ValueError("Message content has not been set. Call set_content() before building.")
 
-        envelope = self._create_envelope_model(authz_data=self.authz)
+        with span("build.envelope"):
+            envelope = self._create_envelope_model(authz_data=self.authz)
         
         graph_items = [
             ROCrateMetadata(),
@@ -75,14 +131,313 @@ class PCLMessageBuilder:
             self.payload
         ]
         
-        context = [
-            "https://w3id.org/ro/crate/1.1/context",
-            {
-                "prov": "http://www.w3.org/ns/prov#", 
-                "qudt": "http://qudt.org/schema/qudt/",
-                "parameter": "http://schema.org/parameter",
-                "unitText": "http://schema.org/unitText"
-            }
+        with span("build.message"):
+            return PCLMessage(context=default_context(), graph=graph_items)
+
+class PCLDataRegistrationBuilder(PCLMessageBuilder):
+    """
+    Builds a register_data crate whose content is a Dataset of data files.
+
+    Files are hashed once, when the crate is first signed or built, by
+    streaming memory-mapped chunks and in parallel across files. Each file
+    becomes a File entity listed in the hasPart of both the crate root and
+    the Dataset. The Dataset's entries carry the size and checksum as well,
+    so the contentDigest, and through it the signature, covers them.
+    """
+    def __init__(
+        self,
+        sender_id: str,
+        receiver_id: str,
+        base_dir: str = ".",
+        checksum_alg: str = "sha256",
+        workers: Optional[int] = None,
+        chunk_size: int = CHUNK_SIZE,
+    ):
+        """
+        Args:
+            sender_id: ROR or ORCID of the sender.
+            receiver_id: Identifier of the receiving PCL.
+            base_dir: Directory the file @id values are relative to.
+            checksum_alg: sha256, sha384 or sha512. Only sha256 has a
+                schema.org term, the others stay plain JSON properties.
+            workers: Threads used to hash files. Defaults to os.cpu_count().
+            chunk_size: Bytes hashed per chunk.
+        """
+        if checksum_alg not in FILE_ALGORITHMS:
+            raise ValueError(f"checksum_alg must be one of {', '.join(FILE_ALGORITHMS)}")
+        super().__init__(sender_id, receiver_id)
+        self.action_type = "register_data"
+        self.base_dir = os.fspath(base_dir)
+        self.checksum_alg = checksum_alg
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.dataset_name: Optional[str] = None
+        # (file @id, path on disk, encoding format)
+        self._files: List[Tuple[str, str, Optional[str]]] = []
+        self._entities: Optional[List[DataFile]] = None
+
+    def set_content(self, *args, **kwargs):
+        raise TypeError("Data registration crates are built with set_dataset() and add_file().")
+
+    def set_dataset(self, sample: str, name: Optional[str] = None):
+        """Sets the sample the data belongs to and an optional Dataset name."""
+        self.sample_id = sample
+        self.dataset_name = name
+        self._entities = None
+        return self
+
+    def add_file(self, path: str, encoding_format: Optional[str] = None):
+        """
+        Adds a data file. Its path relative to base_dir becomes the File @id.
+
+        Args:
+            path: Path relative to base_dir, or an absolute path inside it.
+            encoding_format: Optional media type, e.g. "text/csv".
+        """
+        full_path = os.path.join(self.base_dir, os.fspath(path))
+        relative = os.path.relpath(full_path, self.base_dir)
+        if relative == os.curdir or relative.split(os.sep)[0] == os.pardir:
+            raise ValueError(f"'{path}' is not a file inside {self.base_dir}")
+        self._files.append((relative.replace(os.sep, "/"), full_path, encoding_format))
+        self._entities = None
+        return self
+
+    def hash_files(self) -> List[DataFile]:
+        """Hashes the added files, once, and returns their File entities."""
+        if self._entities is None:
+            if not self._files:
+                raise ValueError("No data files added. Call add_file() before building.")
+            with span("build.hash_files"):
+                digests = hash_files(
+                    [path for _, path, _ in self._files], self.checksum_alg, self.workers, self.chunk_size
+                )
+            self._entities = [
+                DataFile(
+                    id=file_id,
+                    name=posixpath.basename(file_id),
+                    content_size=digest.size,
+                    encoding_format=encoding_format,
+                    **{self.checksum_alg: digest.value},
+                )
+                for (file_id, _, encoding_format), digest in zip(self._files, digests)
+            ]
+            self.payload = PCLDatasetContent(
+                id="#content",
+                name=self.dataset_name,
+                about={"@id": self.sample_id} if self.sample_id else None,
+                hasPart=[
+                    {"@id": entity.id, "contentSize": entity.content_size, self.checksum_alg: getattr(entity, self.checksum_alg)}
+                    for entity in self._entities
+                ],
+            )
+            self._content_digest = None
+        return self._entities
+
+    def _create_envelope_model(self, authz_data=None) -> PCLEnvelope:
+        envelope = super()._create_envelope_model(authz_data)
+        envelope.schema_ = REGISTER_DATA_SCHEMA
+        return envelope
+
+    def sign(self, signer):
+        self.hash_files()
+        super().sign(signer)
+
+    def build(self) -> PCLMessage:
+        entities = self.hash_files()
+        message = super().build()
+        if self.checksum_alg == "sha256":
+            message.context[1]["sha256"] = "http://schema.org/sha256"
+        message.graph[1].hasPart.extend({"@id": entity.id} for entity in entities)
+        message.graph.extend(entity.model_copy() for entity in entities)
+        return message
+
+
+class PCLReplyBuilder(PCLMessageBuilder):
+    """
+    Builds the ack or nack crate answering a received message.
+
+    The reply is addressed to the request's sender and carries its project,
+    sample and capabilities. Its content is a schema:Action whose object is
+    the request's identifier and whose actionStatus tells whether the
+    request was accepted. A nack also carries the PCLError.
+    """
+    def __init__(self, sender_id: str, request: Any):
+        """
+        Args:
+            sender_id: ROR of the replying PCL, i.e. the request's receiver.
+            request: The received envelope, a PCLEnvelope or its JSON dict.
+        """
+        if hasattr(request, "model_dump"):
+            request = request.model_dump(mode="json", by_alias=True)
+        super().__init__(sender_id, request["sender"])
+        self.request_id = request["identifier"]
+        self.project_id = request.get("project", self.project_id)
+        self.sample_id = request.get("sample", "")
+        self.capabilities = list(request.get("capabilities") or [])
+        self.error: Optional[PCLError] = None
+        self.accept()
+
+    def set_content(self, *args, **kwargs):
+        raise TypeError("Reply crates are built with accept() or reject().")
+
+    def accept(self):
+        """Makes the reply an ack."""
+        self.action_type = "ack"
+        self.error = None
+        self.payload = PCLReplyContent(object={"@id": self.request_id})
+        self._content_digest = None
+        return self
+
+    def reject(self, error: PCLError):
+        """Makes the reply a nack carrying the error, correlated with the request."""
+        if error.correlation_id is None and _CORRELATION_ID.fullmatch(self.request_id):
+            error = error.model_copy(update={"correlation_id": self.request_id})
+        self.action_type = "nack"
+        self.error = error
+        self.payload = PCLReplyContent(action_status=ACTION_FAILED, object={"@id": self.request_id}, error=error)
+        self._content_digest = None
+        return self
+
+    def _create_envelope_model(self, authz_data=None) -> PCLEnvelope:
+        envelope = super()._create_envelope_model(authz_data)
+        envelope.schema_ = REPLY_SCHEMA
+        return envelope
+
+
+_MISSING = object()
+
+
+class PCLCampaignBuilder:
+    """
+    Builds many request messages that share a template and differ per row.
+
+    The template (sender, receiver, instrument, method, capabilities and
+    default parameters) is validated once by building it through
+    PCLMessageBuilder. Rows come from a columnar table and only their own
+    values are checked: each row's content node is validated, the other
+    nodes are copies of the template instead of being validated again.
+    """
+    def __init__(
+        self,
+        sender_id: str,
+        receiver_id: str,
+        instrument: str,
+        method: str,
+        capabilities: Iterable[str] = (),
+        params: Optional[Dict[str, Dict[str, Any]]] = None,
+        project: str = "doi:10.1234/placeholder",
+        action: str = "request_measurement",
+        sample_column: str = "sample",
+        encoding: str = "identity",
+        digest_alg: str = "sha256",
+    ):
+        """
+        Args:
+            sender_id: ROR or ORCID of the sender.
+            receiver_id: Identifier of the receiving PCL.
+            instrument: Instrument IRI shared by every message.
+            method: Method IRI shared by every message.
+            capabilities: Capability tags shared by every message.
+            params: Default parameters as in set_content, {"name": {"val": v, "unit": u}}.
+                Table columns with the same name override the value, the unit is kept.
+            project: Project PID shared by every message.
+            action: Action verb shared by every message.
+            sample_column: Name of the table column holding the sample IGSN.
+            encoding: Wire encoding declared in every envelope.
+            digest_alg: Algorithm of each row's contentDigest.
+        """
+        self.params = {name: dict(spec) for name, spec in (params or {}).items()}
+        self.sample_column = sample_column
+
+        # validate the shared part once with the regular builder
+        template = PCLMessageBuilder(sender_id, receiver_id)
+        template.action_type = action
+        template.project_id = project
+        for capability in capabilities:
+            template.add_capability(capability)
+        template.set_content(instrument, "igsn:TEMPLATE", method, self.params)
+        template.set_encoding(encoding, digest_alg)
+        self.digest_alg = digest_alg
+        self._message = template.build()
+        self._metadata, self._root, self._envelope, self._content = self._message.graph
+        self._content_fields = self._content.model_dump(by_alias=True, exclude={"parameters", "object"})
+        self._defaults = {
+            pv.name: pv.model_dump(by_alias=True, exclude={"type"}) for pv in self._content.parameters
+        }
+
+    def _content_for(self, sample: str, values: Dict[str, Any]) -> PCLActionContent:
+        parameters = []
+        for name, default in self._defaults.items():
+            if name in values:
+                parameters.append(dict(default, value=values.pop(name)))
+            else:
+                parameters.append(dict(default))
+        for name, value in values.items():
+            parameters.append({"name": name, "value": value})
+
+        content = dict(self._content_fields, object={"@id": sample}, parameter=parameters)
+        content["instrument"] = dict(content["instrument"])
+        content["prov:used"] = dict(content["prov:used"])
+        # one pydantic-core call checks the row values, cheaper than model_construct per parameter
+        return PCLActionContent.model_validate(content)
+
+    def build_row(self, sample: str, values: Optional[Dict[str, Any]] = None) -> PCLMessage:
+        """
+        Builds the message for one sample with its parameter values.
+
+        Only the content node is validated, the other nodes are shallow copies
+        of the validated template with fresh containers, so no two messages
+        share mutable state.
+        """
+        if not isinstance(sample, str) or not sample:
+            raise ValueError(f"Sample identifier must be a non-empty string, got {sample!r}")
+        metadata, root, envelope = self._metadata, self._root, self._envelope
+        content = self._content_for(sample, dict(values or {}))
+
+        graph = [
+            metadata.model_copy(update={"about": dict(metadata.about), "conformsTo": dict(metadata.conformsTo)}),
+            root.model_copy(update={"hasPart": [dict(part) for part in root.hasPart]}),
+            envelope.model_copy(update={
+                "identifier": f"urn:uuid:{uuid.uuid4()}",
+                "date_created": datetime.now(timezone.utc),
+                "capabilities": list(envelope.capabilities),
+                "sample": sample,
+                "content_ref": dict(envelope.content_ref),
+                "content_digest": ContentDigest.of(content, self.digest_alg),
+            }),
+            content,
         ]
-        
-        return PCLMessage(context=context, graph=graph_items)
\ No newline at end of file
+        return self._message.model_copy(update={"context": default_context(), "graph": graph})
+
+    def rows(self, table: Mapping[str, Iterable[Any]]) -> Iterator[Dict[str, Any]]:
+        """
+        Turns a columnar table into row dicts, one at a time.
+
+        Args:
+            table: Mapping of column name to an iterable of values. Columns are
+                consumed lazily, so generators keep memory flat.
+        """
+        names = list(table.keys())
+        if self.sample_column not in names:
+            raise ValueError(f"Table has no '{self.sample_column}' column")
+        for values in zip_longest(*(table[name] for name in names), fillvalue=_MISSING):
+            if any(value is _MISSING for value in values):
+                raise ValueError("Table columns have different lengths")
+            yield dict(zip(names, values))
+
+    def messages(self, table: Mapping[str, Iterable[Any]], signer=None) -> Iterator[PCLMessage]:
+        """
+        Lazily yields one finished message per table row.
+
+        Args:
+            table: Mapping of column name to values, must include the sample column.
+                Every other column is a parameter.
+            signer: Optional Signer, each envelope is signed before it is yielded.
+        """
+        for row in self.rows(table):
+            sample = row.pop(self.sample_column)
+            message = self.build_row(sample, row)
+            if signer is not None:
+                envelope = message.graph[2]
+                envelope.authz = AuthZ(jws=signer.sign(envelope))
+            yield message
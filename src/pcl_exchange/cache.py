@@ -0,0 +1,223 @@
+"""
+Cached verdicts for messages that arrive more than once.
+
+Peers retry on timeout and brokers redeliver, so the same crate is often
+validated several times. A ValidationCache remembers the (ok, report) of
+validate_message under a key made of the message digest and everything
+the verdict depends on: the schema and shapes file versions, the options
+and the verifier's key ID. A repeat is then answered from an in-memory LRU,
+or from an optional SQLite tier shared between processes and restarts.
+
+    cache = ValidationCache(store=SQLiteResultStore("verdicts.db"))
+    ok, report = validate_message(data, verifier=verifier, cache=cache)
+    print(cache.stats())
+"""
+import hashlib
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Iterable, NamedTuple, Optional, Tuple
+
+from . import jcs
+
+Verdict = Tuple[bool, Optional[str]]
+
+
+class CacheStats(NamedTuple):
+    """Counters for sizing a ValidationCache. hits counts both tiers."""
+    hits: int
+    misses: int
+    memory_hits: int
+    store_hits: int
+    entries: int
+
+    @property
+    def hit_ratio(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+
+def message_digest(data: Any) -> str:
+    """
+    Returns the SHA-256 of a message: of the JSON text when given str or
+    (decompressed) bytes, which a redelivered crate repeats exactly, and of
+    the RFC 8785 canonical form when given a dict or PCLMessage.
+    """
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    elif not isinstance(data, bytes):
+        if hasattr(data, "model_dump"):
+            data = data.model_dump(mode="json", by_alias=True)
+        data = jcs.canonicalize(data)
+    return hashlib.sha256(data).hexdigest()
+
+
+def cache_key(digest: str, parts: Iterable[Any]) -> str:
+    """Combines a message digest with the versions and options its verdict depends on."""
+    context = "\n".join(map(str, parts))
+    return hashlib.sha256(f"{digest}\n{context}".encode("utf-8")).hexdigest()
+
+
+class SQLiteResultStore:
+    """
+    Persists verdicts with an expiry time, so they outlive the process and
+    can be shared by several workers on one host.
+
+    Writes are committed in batches like the replay store; flush() commits
+    immediately. Expired rows are ignored on read and deleted by expire().
+    """
+    def __init__(self, path: str, batch_size: int = 64):
+        """
+        Args:
+            path: SQLite database file, created if missing.
+            batch_size: Number of new verdicts per commit.
+        """
+        self.batch_size = max(1, batch_size)
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS verdicts "
+            "(key TEXT PRIMARY KEY, ok INTEGER NOT NULL, report TEXT, expires REAL NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS verdicts_expires ON verdicts (expires)")
+        self._connection.execute("BEGIN")
+
+    def get(self, key: str, now: float) -> Optional[Verdict]:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT ok, report FROM verdicts WHERE key = ? AND expires > ?", (key, now)
+            ).fetchone()
+        return None if row is None else (bool(row[0]), row[1])
+
+    def put(self, key: str, verdict: Verdict, expires: float):
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO verdicts (key, ok, report, expires) VALUES (?, ?, ?, ?)",
+                (key, int(verdict[0]), verdict[1], expires),
+            )
+            self._pending += 1
+            if self._pending >= self.batch_size:
+                self._commit()
+
+    def expire(self, now: float) -> int:
+        """Deletes expired verdicts and returns how many were dropped."""
+        with self._lock:
+            return self._connection.execute("DELETE FROM verdicts WHERE expires <= ?", (now,)).rowcount
+
+    def _commit(self):
+        self._connection.execute("COMMIT")
+        self._connection.execute("BEGIN")
+        self._pending = 0
+
+    def flush(self):
+        """Commits pending writes."""
+        with self._lock:
+            self._commit()
+
+    def close(self):
+        with self._lock:
+            self._connection.execute("COMMIT")
+            self._connection.close()
+
+
+class ValidationCache:
+    """
+    Two-tier cache of validation verdicts: an in-memory LRU in front of an
+    optional SQLiteResultStore.
+
+    Both tiers keep a verdict for ttl seconds. A store hit is copied into the
+    LRU. Thread-safe; the counters are read with stats().
+    """
+    def __init__(
+        self,
+        maxsize: int = 4096,
+        ttl: float = 3600.0,
+        store: Optional[SQLiteResultStore] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Args:
+            maxsize: Maximum number of verdicts held in memory.
+            ttl: Seconds a verdict stays valid.
+            store: Optional persistent tier, read on a memory miss and written through.
+            clock: Returns the current time as a Unix timestamp.
+        """
+        if maxsize < 1 or ttl <= 0:
+            raise ValueError("maxsize must be at least 1 and ttl positive")
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.store = store
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> (verdict, expires)
+        self._data: "OrderedDict[str, Tuple[Verdict, float]]" = OrderedDict()
+        self._memory_hits = self._store_hits = self._misses = 0
+        if store is not None:
+            store.expire(clock())
+
+    def get(self, key: str) -> Optional[Verdict]:
+        """Returns the cached verdict for a key, or None on a miss."""
+        now = self._clock()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None:
+                if entry[1] > now:
+                    self._data.move_to_end(key)
+                    self._memory_hits += 1
+                    return entry[0]
+                del self._data[key]
+        verdict = self.store.get(key, now) if self.store is not None else None
+        with self._lock:
+            if verdict is None:
+                self._misses += 1
+                return None
+            self._store_hits += 1
+            # the store does not hand back the expiry, a fresh ttl in memory is close enough
+            self._remember(key, verdict, now + self.ttl)
+        return verdict
+
+    def put(self, key: str, verdict: Verdict):
+        expires = self._clock() + self.ttl
+        verdict = (bool(verdict[0]), verdict[1])
+        with self._lock:
+            self._remember(key, verdict, expires)
+        if self.store is not None:
+            self.store.put(key, verdict, expires)
+
+    def _remember(self, key: str, verdict: Verdict, expires: float):
+        self._data[key] = (verdict, expires)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return CacheStats(
+                hits=self._memory_hits + self._store_hits,
+                misses=self._misses,
+                memory_hits=self._memory_hits,
+                store_hits=self._store_hits,
+                entries=len(self._data),
+            )
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def clear(self):
+        """Drops the in-memory verdicts and resets the counters. The store is left as is."""
+        with self._lock:
+            self._data.clear()
+            self._memory_hits = self._store_hits = self._misses = 0
+
+    def flush(self):
+        if self.store is not None:
+            self.store.flush()
+
+    def close(self):
+        if self.store is not None:
+            self.store.close()
@@ -0,0 +1,207 @@
+"""
+Command-line entry point: ``pcl-exchange validate``.
+
+Reads crates from JSON files, directories, tarballs or NDJSON streams and
+writes one NDJSON result line per message. Everything is streamed, so memory
+use does not grow with the number of messages.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import tarfile
+import time
+from collections import deque
+from typing import IO, Iterable, Iterator, List, Optional, Tuple
+
+from .crypto import Verifier
+from .validation import INFERENCE_MODES, validate_many
+
+NDJSON_SUFFIXES = (".ndjson", ".jsonl")
+TAR_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+
+# number of latency samples kept for the percentiles in the summary
+LATENCY_SAMPLES = 10000
+
+
+def _read_ndjson(stream: IO[bytes], name: str) -> Iterator[Tuple[str, bytes]]:
+    for lineno, line in enumerate(stream, 1):
+        if line.strip():
+            yield f"{name}:{lineno}", line
+
+
+def _read_tar(path: str) -> Iterator[Tuple[str, bytes]]:
+    # "r|*" reads the archive as a stream, members are never all in memory
+    with tarfile.open(path, "r|*") as archive:
+        for member in archive:
+            if not member.isfile():
+                continue
+            handle = archive.extractfile(member)
+            if member.name.endswith(NDJSON_SUFFIXES):
+                yield from _read_ndjson(handle, f"{path}:{member.name}")
+            elif member.name.endswith(".json"):
+                yield f"{path}:{member.name}", handle.read()
+
+
+def _read_directory(path: str) -> Iterator[Tuple[str, bytes]]:
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for filename in sorted(files):
+            if filename.endswith((".json",) + NDJSON_SUFFIXES + TAR_SUFFIXES):
+                yield from _read_path(os.path.join(root, filename))
+
+
+def _read_path(path: str) -> Iterator[Tuple[str, bytes]]:
+    if path == "-":
+        yield from _read_ndjson(sys.stdin.buffer, "<stdin>")
+    elif os.path.isdir(path):
+        yield from _read_directory(path)
+    elif path.endswith(TAR_SUFFIXES):
+        yield from _read_tar(path)
+    elif path.endswith(NDJSON_SUFFIXES):
+        with open(path, "rb") as f:
+            yield from _read_ndjson(f, path)
+    else:
+        with open(path, "rb") as f:
+            yield path, f.read()
+
+
+def iter_records(paths: Iterable[str]) -> Iterator[Tuple[str, bytes]]:
+    """
+    Yields (source, raw_json) for every message found in the given inputs.
+
+    Args:
+        paths: Files, directories or tarballs. "-" reads NDJSON from stdin.
+    """
+    for path in paths:
+        yield from _read_path(path)
+
+
+class _Summary:
+    """Counts results and keeps a bounded sample of latencies."""
+    def __init__(self):
+        self.ok = 0
+        self.failed = 0
+        self.started = time.perf_counter()
+        self._latencies: List[float] = []
+        self._seen = 0
+        self._random = random.Random(0)
+
+    def add(self, ok: bool, latency: float):
+        if ok:
+            self.ok += 1
+        else:
+            self.failed += 1
+        # reservoir sampling keeps the percentiles honest in constant memory
+        self._seen += 1
+        if len(self._latencies) < LATENCY_SAMPLES:
+            self._latencies.append(latency)
+        else:
+            slot = self._random.randrange(self._seen)
+            if slot < LATENCY_SAMPLES:
+                self._latencies[slot] = latency
+
+    def _percentile(self, samples: List[float], q: float) -> float:
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+    def render(self) -> str:
+        elapsed = time.perf_counter() - self.started
+        total = self.ok + self.failed
+        text = (
+            f"{total} messages, {self.ok} valid, {self.failed} invalid in {elapsed:.2f}s"
+            f" ({total / elapsed if elapsed else 0:.1f} msg/s)"
+        )
+        if self._latencies:
+            samples = sorted(self._latencies)
+            p50, p95, p99 = (self._percentile(samples, q) * 1e3 for q in (0.5, 0.95, 0.99))
+            text += f"\nlatency ms: p50 {p50:.2f}  p95 {p95:.2f}  p99 {p99:.2f}  max {samples[-1] * 1e3:.2f}"
+        return text
+
+
+def _load_verifier(path: Optional[str]) -> Optional[Verifier]:
+    if path is None:
+        return None
+    with open(path, encoding="utf-8") as f:
+        return Verifier(json.load(f))
+
+
+def run_validate(args: argparse.Namespace, out: IO[str]) -> int:
+    verifier = _load_verifier(args.key)
+    summary = _Summary()
+
+    # sources of the messages handed to the pool, results come back in the same order
+    in_flight: deque = deque()
+
+    def payloads():
+        for source, raw in iter_records(args.inputs or ["-"]):
+            in_flight.append((source, time.perf_counter()))
+            yield raw
+
+    results = validate_many(
+        payloads(),
+        workers=args.workers,
+        chunksize=args.chunksize,
+        shape_filename=args.shapes,
+        schema_filename=args.schema,
+        structure=not args.no_schema,
+        semantics=not args.no_shacl,
+        fast=args.fast,
+        inference=args.inference,
+        verifier=verifier,
+    )
+    for ok, report in results:
+        source, started = in_flight.popleft()
+        summary.add(ok, time.perf_counter() - started)
+        if ok and args.failures_only:
+            continue
+        out.write(json.dumps({"source": source, "ok": ok, "error": report}) + "\n")
+
+    if not args.quiet:
+        print(summary.render(), file=sys.stderr)
+    return 0 if summary.failed == 0 else 1
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="pcl-exchange", description="PCL Exchange tools.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    validate = commands.add_parser(
+        "validate",
+        help="validate PCL messages and write NDJSON results",
+        description="Validates PCL messages (JSON Schema, signature, SHACL) and writes one NDJSON line per message.",
+    )
+    validate.add_argument(
+        "inputs", nargs="*",
+        help="JSON files, NDJSON files, directories or tarballs; '-' or nothing reads NDJSON from stdin",
+    )
+    validate.add_argument("--key", help="JWK file with the sender's public key, enables signature checks")
+    validate.add_argument("--shapes", default="shapes/measurement_request.ttl", help="bundled shapes file")
+    validate.add_argument("--schema", default="envelope.json", help="bundled envelope schema")
+    validate.add_argument("--no-schema", action="store_true", help="skip the JSON Schema check")
+    validate.add_argument("--no-shacl", action="store_true", help="skip the SHACL check")
+    validate.add_argument("--fast", action="store_true", help="use the compiled SHACL checks where possible")
+    validate.add_argument(
+        "--inference", choices=INFERENCE_MODES, default="rdfs",
+        help="RDFS inference for pyshacl; 'closure' precomputes it per shapes file (default: rdfs)",
+    )
+    validate.add_argument("-j", "--workers", type=int, default=1, help="worker processes (default: 1)")
+    validate.add_argument("--chunksize", type=int, default=16, help="messages per worker batch")
+    validate.add_argument("-o", "--output", help="write results to this file instead of stdout")
+    validate.add_argument("--failures-only", action="store_true", help="only write invalid messages")
+    validate.add_argument("-q", "--quiet", action="store_true", help="do not print the summary")
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    if args.command == "validate":
+        if args.output:
+            with open(args.output, "w", encoding="utf-8") as out:
+                return run_validate(args, out)
+        return run_validate(args, sys.stdout)
+    return 2
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,163 @@
+import hashlib
+import importlib.resources
+import json
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, Union
+
+from . import schemas
+
+RO_CRATE_CONTEXT = "https://w3id.org/ro/crate/1.1/context"
+PCL_PROFILE_CONTEXT = "https://w3id.org/pcl-profile/action/v1/context"
+
+# remote context URL -> file bundled in the schemas package
+BUNDLED_CONTEXTS = {
+    RO_CRATE_CONTEXT: "contexts/ro-crate-1.1.jsonld",
+    PCL_PROFILE_CONTEXT: "contexts/pcl-profile-action-v1.jsonld",
+}
+
+
+def _normalize_url(url: str) -> str:
+    # https://w3id.org/ro/crate/1.1/context and http://... name the same document
+    url = url.strip()
+    if url.startswith("http://"):
+        url = "https://" + url[len("http://"):]
+    return url.rstrip("/")
+
+
+def _fetch_remote(url: str) -> Dict[str, Any]:
+    import requests
+
+    response = requests.get(
+        url,
+        headers={"Accept": "application/ld+json, application/json"},
+        timeout=10,
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+class ContextLoader:
+    """
+    Resolves remote JSON-LD contexts without touching the network in steady state.
+
+    Contexts bundled with the package (RO-Crate 1.1 and the PCL profile) are
+    served from memory. Any other remote context is fetched once, kept in an
+    in-memory LRU and, if a cache directory is given, written to disk so it
+    survives restarts.
+    """
+    def __init__(
+        self,
+        cache_dir: Optional[Union[str, Path]] = None,
+        max_entries: int = 64,
+        allow_remote: bool = True,
+        fetch: Optional[Callable[[str], Dict[str, Any]]] = None,
+    ):
+        """
+        Args:
+            cache_dir: Optional directory for an on-disk cache of fetched contexts.
+            max_entries: Maximum number of remote contexts kept in memory.
+            allow_remote: If False, unknown contexts raise instead of being fetched.
+            fetch: Callable used to download a context document. Defaults to an
+                HTTP GET via requests.
+        """
+        self.cache_dir = Path(cache_dir) if cache_dir is not None else None
+        self.max_entries = max_entries
+        self.allow_remote = allow_remote
+        self._fetch = fetch or _fetch_remote
+        self._bundled: Dict[str, Dict[str, Any]] = {}
+        self._remote: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _load_bundled(self, url: str) -> Optional[Dict[str, Any]]:
+        filename = BUNDLED_CONTEXTS.get(url)
+        if filename is None:
+            return None
+        with self._lock:
+            document = self._bundled.get(url)
+        if document is None:
+            resource = importlib.resources.files(schemas)
+            for part in filename.split("/"):
+                resource = resource / part
+            document = json.loads(resource.read_text(encoding="utf-8"))
+            with self._lock:
+                self._bundled[url] = document
+        return document
+
+    def _disk_path(self, url: str) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        name = hashlib.sha256(url.encode("utf-8")).hexdigest()
+        return self.cache_dir / f"{name}.jsonld"
+
+    def _remember(self, url: str, document: Dict[str, Any]):
+        with self._lock:
+            self._remote[url] = document
+            self._remote.move_to_end(url)
+            while len(self._remote) > self.max_entries:
+                self._remote.popitem(last=False)
+
+    def load(self, url: str) -> Dict[str, Any]:
+        """
+        Returns the JSON-LD document for a context URL.
+
+        Raises:
+            LookupError: If the context is unknown and remote fetching is disabled.
+        """
+        key = _normalize_url(url)
+
+        document = self._load_bundled(key)
+        if document is not None:
+            return document
+
+        with self._lock:
+            if key in self._remote:
+                self._remote.move_to_end(key)
+                return self._remote[key]
+
+        path = self._disk_path(key)
+        if path is not None and path.is_file():
+            document = json.loads(path.read_text(encoding="utf-8"))
+            self._remember(key, document)
+            return document
+
+        if not self.allow_remote:
+            raise LookupError(f"JSON-LD context '{url}' is not available offline.")
+
+        document = self._fetch(url)
+        self._remember(key, document)
+        if path is not None:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(document), encoding="utf-8")
+            tmp.replace(path)
+        return document
+
+    def _expand_context(self, context: Any) -> Any:
+        if isinstance(context, str):
+            return self.load(context).get("@context", {})
+        if isinstance(context, list):
+            return [self._expand_context(item) for item in context]
+        return context
+
+    def resolve(self, document: Any) -> Any:
+        """
+        Returns a shallow copy of a JSON-LD document whose remote @context
+        references are replaced by the inline context definitions.
+        """
+        if isinstance(document, list):
+            return [self.resolve(item) for item in document]
+        if not isinstance(document, dict) or "@context" not in document:
+            return document
+        resolved = dict(document)
+        resolved["@context"] = self._expand_context(document["@context"])
+        return resolved
+
+    def clear(self):
+        """Drops the in-memory cache of remote contexts. Bundled contexts stay loaded."""
+        with self._lock:
+            self._remote.clear()
+
+
+default_loader = ContextLoader()
@@ -1,57 +1,123 @@
+import base64
+import hashlib
 import json
 import logging
-from typing import Dict, Any, Union
-from jwcrypto import jws, jwk
-from jwcrypto.common import json_encode
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Union
+
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
+
+from . import jcs
+from .metrics import span, timed
+
+# jwcrypto is only needed for non-Ed25519 keys and is imported on first use
+if TYPE_CHECKING:
+    from jwcrypto import jwk
 
 logger = logging.getLogger(__name__)
 
 def canonicalize(data: Dict[str, Any]) -> bytes:
     """
-    Prepares a dictionary for signing/hashing by ensuring a 
-    consistent string representation (JCS-like).
-    
-    1. Removes 'authz' field (since that holds the signature).
-    2. Sorts keys.
-    3. Removes whitespace (separators=(',', ':')).
+    Prepares a dictionary for signing/hashing by producing its RFC 8785
+    (JCS) canonical form, without the 'authz' field since that holds the
+    signature.
     """
-    
-    clean_data = data.copy()
-    
-    # remove 'authz' if present
-    if 'authz' in clean_data:
-        del clean_data['authz']
-        
-    # JSON canonicalization
-    return json.dumps(clean_data, sort_keys=True, separators=(',', ':'),ensure_ascii=False).encode('utf-8')
+    if 'authz' in data:
+        data = {k: v for k, v in data.items() if k != 'authz'}
+    return jcs.canonicalize(data)
+
+
+def _b64url_encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b"=").decode("ascii")
+
+
+def _b64url_decode(data: str) -> bytes:
+    return base64.urlsafe_b64decode(data + "=" * (-len(data) % 4))
 
-class Signer:
+
+# members of the RFC 7638 thumbprint per key type
+_THUMBPRINT_MEMBERS = {
+    "EC": ("crv", "kty", "x", "y"),
+    "OKP": ("crv", "kty", "x"),
+    "RSA": ("e", "kty", "n"),
+    "oct": ("k", "kty"),
+}
+
+
+def thumbprint(key) -> str:
+    """Returns the RFC 7638 SHA-256 thumbprint of a JWK (dict or jwcrypto JWK), base64url encoded."""
+    members = _THUMBPRINT_MEMBERS.get(key.get("kty"))
+    if members is None:
+        raise ValueError(f"Unsupported key type {key.get('kty')!r}")
+    data = json.dumps({name: key[name] for name in members}, separators=(",", ":"), sort_keys=True)
+    return _b64url_encode(hashlib.sha256(data.encode("utf-8")).digest())
+
+
+def _is_ed25519(key) -> bool:
+    return key.get("kty") == "OKP" and key.get("crv") == "Ed25519"
+
+
+class _LazyJWK:
+    """
+    Holds a key given as a dict or a jwcrypto JWK, and only builds the JWK
+    (importing jwcrypto) when the key is actually needed as one.
+    """
+    def __init__(self, key: Union["jwk.JWK", dict]):
+        self._source = key
+        self._jwk = None
+        self._thumbprint: Optional[str] = None
+
+    @property
+    def key(self) -> "jwk.JWK":
+        if self._jwk is None:
+            from jwcrypto import jwk
+
+            self._jwk = self._source if isinstance(self._source, jwk.JWK) else jwk.JWK(**self._source)
+        return self._jwk
+
+    @property
+    def thumbprint(self) -> str:
+        """The key's RFC 7638 thumbprint."""
+        if self._thumbprint is None:
+            self._thumbprint = thumbprint(self._source)
+        return self._thumbprint
+
+    @property
+    def key_id(self) -> str:
+        """The key's kid, or its RFC 7638 thumbprint when it has none."""
+        return self._source.get("kid") or self.thumbprint
+
+
+class Signer(_LazyJWK):
     """
     Handles cryptographic signing using a private key.
+
+    Ed25519 keys sign the canonical bytes directly with a cached protected
+    header. Ed25519 is deterministic, so the result is byte-identical to
+    building the JWS with jwcrypto, which is still used for other key types.
     """
-    def __init__(self, private_key: Union[jwk.JWK, dict]):
+    def __init__(self, private_key: Union["jwk.JWK", dict], kid: Optional[str] = None):
         """
         Args:
             private_key: A jwcrypto.jwk.JWK object or a dict representing the key.
+            kid: Key ID put in the protected header, e.g. the DID URL of the
+                verification method, so receivers can pick the key without trying each.
         """
-        if isinstance(private_key, dict):
-            self.key = jwk.JWK(**private_key)
-        else:
-            self.key = private_key
+        super().__init__(private_key)
+
+        header = {"alg": "EdDSA"} if kid is None else {"alg": "EdDSA", "kid": kid}
+        # the same bytes jwcrypto's json_encode produces
+        self._protected = json.dumps(header, separators=(",", ":"), sort_keys=True)
+        self._ed25519 = None
+        if _is_ed25519(private_key) and private_key.get("d"):
+            self._ed25519 = Ed25519PrivateKey.from_private_bytes(_b64url_decode(private_key["d"]))
+            self._header_b64 = _b64url_encode(self._protected.encode("utf-8"))
+
+    def _sign_jwcrypto(self, payload_bytes: bytes) -> str:
+        from jwcrypto import jws
 
-    def sign(self, payload: Dict[str, Any]) -> str:
-        """
-        Generates a Detached JWS for the given payload dictionary.
-        
-        Args:
-            payload: The dictionary (Envelope) to sign.
-            
-        Returns:
-            str: The serialized JWS (Compact Serialization).
-        """
-        # canonicalize the data
-        payload_bytes = canonicalize(payload)
-        
         # create JWS object
         # uses EdDSA by default
         signer = jws.JWS(payload_bytes)
@@ -59,7 +125,7 @@ class Signer:
         # add signature
         signer.add_signature(
             self.key, 
-            protected=json_encode({"alg": "EdDSA"})
+            protected=self._protected
         )
         
         # serialize to compact form
@@ -68,15 +134,216 @@ class Signer:
         
         return f"{header}..{signature}"
 
-class Verifier:
+    @timed("sign")
+    def sign(self, payload: Union[Dict[str, Any], Any]) -> str:
+        """
+        Generates a Detached JWS for the given payload dictionary.
+        
+        Args:
+            payload: The dictionary (Envelope) to sign, or a PCLEnvelope whose
+                memoized canonical bytes are used.
+            
+        Returns:
+            str: The serialized JWS (Compact Serialization).
+        """
+        # canonicalize the data
+        with span("sign.canonicalize"):
+            if hasattr(payload, "canonical_bytes"):
+                payload_bytes = payload.canonical_bytes()
+            else:
+                payload_bytes = canonicalize(payload)
+
+        with span("sign.signature"):
+            if self._ed25519 is None:
+                return self._sign_jwcrypto(payload_bytes)
+
+            signing_input = f"{self._header_b64}.{_b64url_encode(payload_bytes)}".encode("ascii")
+            return f"{self._header_b64}..{_b64url_encode(self._ed25519.sign(signing_input))}"
+
+    def sign_many(self, items: Iterable[Any], workers: Optional[int] = None) -> List[str]:
+        """
+        Signs a batch of envelope dicts or PCLMessageBuilders, spread over a thread pool.
+
+        Builders are signed in place through builder.sign(), exactly as if
+        each had been signed on its own.
+
+        Args:
+            items: Envelope dictionaries or PCLMessageBuilder instances.
+            workers: Number of threads. Defaults to os.cpu_count(). With 0 or 1
+                everything runs in the calling thread.
+
+        Returns:
+            The detached JWS for each item, in input order.
+        """
+        def sign_one(item) -> str:
+            if isinstance(item, dict):
+                return self.sign(item)
+            item.sign(self)
+            return item.authz["jws"]
+
+        return _map_in_threads(sign_one, list(items), workers)
+
+
+def _map_in_threads(fn: Callable[[Any], Any], items: List[Any], workers: Optional[int]) -> List[Any]:
+    """Applies fn to every item, one contiguous slice per thread, keeping the order."""
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(items) < 2:
+        return [fn(item) for item in items]
+
+    # one slice per thread keeps the pool overhead per batch, not per item
+    size = -(-len(items) // workers)
+    slices = [items[i:i + size] for i in range(0, len(items), size)]
+    with ThreadPoolExecutor(max_workers=len(slices)) as pool:
+        batches = pool.map(lambda batch: [fn(item) for item in batch], slices)
+        return [result for batch in batches for result in batch]
+
+
+class VerificationResult(NamedTuple):
+    """Outcome of verifying one envelope, reason is None when valid."""
+    valid: bool
+    reason: Optional[str] = None
+
+
+class Verifier(_LazyJWK):
     """
     Handles cryptographic verification using a public key.
+
+    Ed25519 keys are unwrapped into a cryptography key object once, and
+    detached EdDSA signatures are checked against it directly. Other key
+    types and headers go through jwcrypto.
     """
-    def __init__(self, public_key: Union[jwk.JWK, dict]):
-        if isinstance(public_key, dict):
-            self.key = jwk.JWK(**public_key)
+    # protected headers the direct Ed25519 path understands
+    _DIRECT_HEADER_KEYS = {"alg", "kid", "typ"}
+
+    def __init__(self, public_key: Union["jwk.JWK", dict]):
+        super().__init__(public_key)
+
+        self._ed25519 = None
+        if _is_ed25519(public_key):
+            self._ed25519 = Ed25519PublicKey.from_public_bytes(_b64url_decode(public_key["x"]))
+        # decoded protected headers, nearly every message shares the same one
+        self._headers: Dict[str, Optional[dict]] = {}
+
+    def _header(self, encoded: str) -> Optional[dict]:
+        try:
+            return self._headers[encoded]
+        except KeyError:
+            pass
+        try:
+            header = json.loads(_b64url_decode(encoded))
+        except ValueError:
+            header = None
+        if len(self._headers) < 64:
+            self._headers[encoded] = header
+        return header
+
+    def _verify_jwcrypto(self, signature_str: str, payload: bytes) -> VerificationResult:
+        from jwcrypto import jws
+
+        try:
+            with span("verify.signature"):
+                verifier = jws.JWS()
+                verifier.deserialize(signature_str)
+                verifier.verify(self.key, detached_payload=payload)
+        except jws.InvalidJWSSignature:
+            return VerificationResult(False, "Signature does not match.")
+        except jws.InvalidJWSObject as e:
+            return VerificationResult(False, f"Malformed JWS: {e}")
+        return VerificationResult(True)
+
+    @timed("verify")
+    def check(self, envelope_model) -> VerificationResult:
+        """
+        Verifies the 'authz.jws' signature and reports why it failed, if it did.
+
+        Args:
+            envelope_model: An instance of PCLEnvelope (or a dict equivalent).
+
+        Returns:
+            VerificationResult(valid, reason).
+        """
+        try:
+            if hasattr(envelope_model, 'canonical_bytes'):
+                # a PCLEnvelope: the same memoized bytes Signer.sign signs
+                if envelope_model.authz is None or not envelope_model.authz.jws:
+                    return VerificationResult(False, "No signature found in the envelope.")
+                signature_str = envelope_model.authz.jws.strip()
+                with span("verify.canonicalize"):
+                    expected_payload = envelope_model.canonical_bytes()
+            else:
+                data = envelope_model
+                if not isinstance(data, dict) or not isinstance(data.get('authz'), dict) or not data['authz'].get('jws'):
+                    return VerificationResult(False, "No signature found in the envelope.")
+
+                signature_str = str(data['authz']['jws']).strip()
+                with span("verify.canonicalize"):
+                    expected_payload = canonicalize(data)
+        except Exception as e:
+            return VerificationResult(False, f"Unexpected error: {e}")
+
+        parts = signature_str.split('.')
+        if self._ed25519 is None or len(parts) != 3 or parts[1]:
+            return self._verify_jwcrypto(signature_str, expected_payload)
+
+        header = self._header(parts[0])
+        if not isinstance(header, dict) or header.get("alg") != "EdDSA" or not header.keys() <= self._DIRECT_HEADER_KEYS:
+            return self._verify_jwcrypto(signature_str, expected_payload)
+
+        try:
+            signature = _b64url_decode(parts[2])
+        except ValueError:
+            return VerificationResult(False, "Malformed JWS: signature is not base64url.")
+        signing_input = f"{parts[0]}.{_b64url_encode(expected_payload)}".encode("ascii")
+        try:
+            with span("verify.signature"):
+                self._ed25519.verify(signature, signing_input)
+        except InvalidSignature:
+            return VerificationResult(False, "Signature does not match.")
+        return VerificationResult(True)
+
+    def check_message(self, message) -> VerificationResult:
+        """
+        Verifies the envelope signature of a whole message, then that the
+        content node still matches the envelope's contentDigest. The digest
+        is what binds the content to the signature, so an envelope without
+        one is rejected.
+
+        Args:
+            message: A PCLMessage, or its JSON dict.
+
+        Returns:
+            VerificationResult(valid, reason).
+        """
+        from .wire import ContentDigestError, check_content_digest, find_nodes
+
+        if hasattr(message, "graph"):
+            envelope = next((n for n in message.graph if getattr(n, "type", None) == "PCLActionEnvelope"), None)
+            declared = envelope.content_digest if envelope is not None else None
         else:
-            self.key = public_key
+            envelope, _ = find_nodes(message)
+            declared = envelope.get("contentDigest") if envelope is not None else None
+        if envelope is None:
+            return VerificationResult(False, "No PCLActionEnvelope node found.")
+
+        result = self.check(envelope)
+        if not result.valid:
+            return result
+        if declared is None:
+            return VerificationResult(False, "Envelope has no contentDigest, the signature does not cover the content.")
+
+        if hasattr(message, "graph"):
+            content = next((n for n in message.graph if getattr(n, "id", None) == envelope.content_id), None)
+            if content is None:
+                return VerificationResult(False, "contentDigest is set but the referenced content node is missing")
+            if not declared.matches(content):
+                return VerificationResult(False, "Content does not match the envelope's contentDigest")
+            return VerificationResult(True)
+        try:
+            check_content_digest(message)
+        except ContentDigestError as e:
+            return VerificationResult(False, str(e))
+        return VerificationResult(True)
 
     def verify(self, envelope_model) -> bool:
         """
@@ -88,33 +355,28 @@ class Verifier:
         Returns:
             True if valid, False otherwise.
         """
-        signature_str = ''
-        try:
-            # extract the JWS signature
-            if hasattr(envelope_model, 'model_dump'):
-                data = envelope_model.model_dump(by_alias=True)
-            else:
-                data = envelope_model
-            
-            if not isinstance(data, dict) or 'authz' not in data or not isinstance(data.get('authz'), dict) or not data['authz'].get('jws'):
-                logger.warning("Verification failed: No signature found in the envelope.")
-                return False
-                
-            signature_str = str(data.get('authz', {}).get('jws', '')).strip()
-            
-            # prepare the payload for verification
-            expected_payload = canonicalize(data)
-            
-            # verify the JWS
-            verifier = jws.JWS()            
-            verifier.deserialize(signature_str)
-            verifier.verify(self.key, detached_payload=expected_payload)
-            
-            return True
-            
-        except jws.InvalidJWSSignature:
-            logger.warning("Verification failed: Signature does not match.")
-            return False
-        except Exception as e:
-            logger.error(f"An unexpected error occurred during verification: {e}")
-            return False
\ No newline at end of file
+        result = self.check(envelope_model)
+        if not result.valid:
+            level = logging.ERROR if result.reason.startswith("Unexpected error") else logging.WARNING
+            logger.log(level, f"Verification failed: {result.reason}")
+        return result.valid
+
+    def verify_many(
+        self,
+        envelopes: Iterable[Any],
+        workers: Optional[int] = None,
+    ) -> List[VerificationResult]:
+        """
+        Verifies many envelopes with the pre-parsed key, spread over a thread pool.
+
+        Failures are returned as results rather than logged.
+
+        Args:
+            envelopes: PCLEnvelope instances or dict equivalents.
+            workers: Number of threads. Defaults to os.cpu_count(). With 0 or 1
+                everything runs in the calling thread.
+
+        Returns:
+            One VerificationResult per envelope, in input order.
+        """
+        return _map_in_threads(self.check, list(envelopes), workers)
@@ -0,0 +1,337 @@
+"""
+Checksums for the data files listed in register_data crates.
+
+Files are hashed in fixed-size chunks of a read-only memory map, so memory
+use stays flat whatever the file size. hashlib releases the GIL while it
+hashes a chunk, so several files hash in parallel on threads.
+"""
+import hashlib
+import json
+import mmap
+import os
+import posixpath
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+
+# 8 MiB per chunk: large enough that hashing dominates the per-chunk overhead
+CHUNK_SIZE = 8 * 1024 * 1024
+
+# checksum properties a File entity may carry, strongest first
+FILE_ALGORITHMS = ("sha512", "sha384", "sha256")
+
+PathLike = Union[str, "os.PathLike[str]"]
+
+
+class FileDigest(NamedTuple):
+    """Checksum and size of one file."""
+    path: str
+    alg: str
+    value: str
+    size: int
+
+
+class FileCheck(NamedTuple):
+    """Outcome of checking one File entity, reason is None when valid."""
+    id: str
+    valid: bool
+    reason: Optional[str] = None
+
+
+class FileHasher:
+    """
+    Hashes one file chunk by chunk and can continue where it stopped.
+
+    run() can be limited to a number of bytes, or interrupted by an I/O
+    error, and called again later: the hash state and offset are kept. If
+    the file's size or modification time changes in between, hashing starts
+    over.
+    """
+    def __init__(self, path: PathLike, alg: str = "sha256", chunk_size: int = CHUNK_SIZE):
+        self.path = os.fspath(path)
+        self.alg = alg
+        # whole pages, so every chunk starts on a page boundary for madvise
+        self.chunk_size = max(mmap.PAGESIZE, chunk_size - chunk_size % mmap.PAGESIZE)
+        self.offset = 0
+        self._hash = hashlib.new(alg)
+        self._stamp = None
+
+    @property
+    def done(self) -> bool:
+        return self._stamp is not None and self.offset >= self._stamp[0]
+
+    def _restart_if_changed(self, stat: os.stat_result):
+        stamp = (stat.st_size, stat.st_mtime_ns)
+        if stamp != self._stamp:
+            self._stamp = stamp
+            self.offset = 0
+            self._hash = hashlib.new(self.alg)
+
+    def _hash_mapped(self, f, size: int, stop: int):
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            if hasattr(mapped, "madvise"):
+                mapped.madvise(mmap.MADV_SEQUENTIAL)
+            view = memoryview(mapped)
+            try:
+                while self.offset < stop:
+                    end = min(self.offset + self.chunk_size, size)
+                    self._hash.update(view[self.offset:end])
+                    if hasattr(mapped, "madvise") and hasattr(mmap, "MADV_DONTNEED"):
+                        # hashed pages are not needed again, keeps the resident set flat
+                        mapped.madvise(mmap.MADV_DONTNEED, self.offset, end - self.offset)
+                    self.offset = end
+            finally:
+                view.release()
+
+    def _hash_read(self, f, stop: int):
+        # for files that cannot be mapped, e.g. on some network filesystems
+        buffer = bytearray(self.chunk_size)
+        view = memoryview(buffer)
+        f.seek(self.offset)
+        while self.offset < stop:
+            read = f.readinto(view[:min(self.chunk_size, stop - self.offset)])
+            if not read:
+                raise OSError(f"{self.path} ended after {self.offset} bytes")
+            self._hash.update(view[:read])
+            self.offset += read
+
+    def run(self, max_bytes: Optional[int] = None) -> Optional[FileDigest]:
+        """
+        Hashes the rest of the file, or about max_bytes more of it.
+
+        Args:
+            max_bytes: Stop after the chunk that crosses this many bytes.
+
+        Returns:
+            The FileDigest once the whole file is hashed, otherwise None.
+        """
+        with open(self.path, "rb") as f:
+            stat = os.fstat(f.fileno())
+            self._restart_if_changed(stat)
+            size = stat.st_size
+            stop = size
+            if max_bytes is not None:
+                chunks = max(1, -(-max_bytes // self.chunk_size))
+                stop = min(size, self.offset + chunks * self.chunk_size)
+            if self.offset < stop:
+                try:
+                    self._hash_mapped(f, size, stop)
+                except (OSError, ValueError):
+                    self._hash_read(f, stop)
+        return self.result()
+
+    def result(self) -> Optional[FileDigest]:
+        """The FileDigest if hashing is complete, otherwise None."""
+        if not self.done:
+            return None
+        return FileDigest(self.path, self.alg, self._hash.hexdigest(), self.offset)
+
+
+def hash_file(path: PathLike, alg: str = "sha256", chunk_size: int = CHUNK_SIZE) -> FileDigest:
+    """Returns the checksum and size of a file, read in memory-mapped chunks."""
+    return FileHasher(path, alg, chunk_size).run()
+
+
+def _map(fn, items: List[Any], workers: Optional[int]) -> List[Any]:
+    if workers is None:
+        workers = os.cpu_count() or 1
+    if workers <= 1 or len(items) < 2:
+        return [fn(item) for item in items]
+    # files differ in size, so hand them out one at a time
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as pool:
+        return list(pool.map(fn, items))
+
+
+def hash_files(
+    paths: Iterable[PathLike],
+    alg: str = "sha256",
+    workers: Optional[int] = None,
+    chunk_size: int = CHUNK_SIZE,
+) -> List[FileDigest]:
+    """
+    Hashes several files, in parallel across files.
+
+    Args:
+        paths: Files to hash.
+        alg: Any hashlib algorithm, sha256 by default.
+        workers: Number of threads. Defaults to os.cpu_count(). With 0 or 1
+            everything runs in the calling thread.
+        chunk_size: Bytes hashed per chunk.
+
+    Returns:
+        One FileDigest per path, in input order.
+    """
+    return _map(lambda path: hash_file(path, alg, chunk_size), list(paths), workers)
+
+
+# the File properties a Dataset's hasPart entries carry, where the contentDigest covers them
+SIGNED_FILE_FIELDS = ("contentSize",) + FILE_ALGORITHMS
+
+
+def _file_entities(message: Any) -> List[Tuple[Dict[str, Any], Optional[str]]]:
+    """
+    Returns (File entity, problem) pairs, with sizes and checksums taken from
+    the signed Dataset content. A top-level File node is not covered by the
+    contentDigest, so it is only trusted as far as it agrees with the content.
+    """
+    from .wire import find_nodes
+
+    if hasattr(message, "document"):
+        message = message.document
+    elif not isinstance(message, dict):
+        message = json.loads(message.to_json())
+    _, content = find_nodes(message)
+
+    # @id -> signed size and checksums, in content order
+    signed: Dict[str, Dict[str, Any]] = {}
+    for part in (content or {}).get("hasPart") or []:
+        if isinstance(part, dict) and isinstance(part.get("@id"), str):
+            signed[part["@id"]] = {name: part[name] for name in SIGNED_FILE_FIELDS if name in part}
+
+    entities = []
+    for node in message.get("@graph", []):
+        if not isinstance(node, dict) or node.get("@type") != "File":
+            continue
+        claims = signed.pop(node.get("@id"), None)
+        if not claims or "contentSize" not in claims or len(claims) < 2:
+            entities.append((node, "Size and checksum are not covered by the signed content."))
+        elif any(name in node and node[name] != value for name, value in claims.items()):
+            entities.append((node, "File entity does not match the signed content."))
+        else:
+            entities.append((dict(node, **claims), None))
+    # listed in the content without a File node, still checked
+    for file_id, claims in signed.items():
+        entity = {"@id": file_id, "@type": "File", **claims}
+        complete = "contentSize" in claims and len(claims) >= 2
+        entities.append((entity, None if complete else "Size and checksum are not covered by the signed content."))
+    return entities
+
+
+class DataFileVerifier:
+    """
+    Checks the data files of a register_data crate against the sizes and
+    checksums declared in its Dataset content, which the envelope's
+    contentDigest and signature cover. File entities that disagree with the
+    content, or that it does not cover, fail without being hashed.
+
+    Sizes are compared before anything is hashed. With a checkpoint file,
+    every file that verifies is recorded, and a later run (for example
+    after the receiver restarted) skips files whose record, size and
+    modification time still match. Within one process, a file whose hashing
+    was interrupted by an error resumes from where it stopped.
+    """
+    def __init__(
+        self,
+        base_dir: PathLike,
+        checkpoint: Optional[PathLike] = None,
+        workers: Optional[int] = None,
+        chunk_size: int = CHUNK_SIZE,
+    ):
+        """
+        Args:
+            base_dir: Directory the File @id values are relative to.
+            checkpoint: Optional JSON-lines file recording verified files.
+            workers: Number of hashing threads. Defaults to os.cpu_count().
+            chunk_size: Bytes hashed per chunk.
+        """
+        self.base_dir = os.path.realpath(os.fspath(base_dir))
+        self.checkpoint = os.fspath(checkpoint) if checkpoint is not None else None
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self._lock = threading.Lock()
+        self._verified: Dict[str, dict] = {}
+        # hashers of files whose hashing was interrupted, by path
+        self._partial: Dict[str, FileHasher] = {}
+        if self.checkpoint is not None and os.path.exists(self.checkpoint):
+            self._load_checkpoint()
+
+    def _load_checkpoint(self):
+        with open(self.checkpoint, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                    self._verified[record["path"]] = record
+                except (ValueError, KeyError, TypeError):
+                    # a torn last line from an interrupted write
+                    continue
+
+    def _record(self, record: dict):
+        with self._lock:
+            self._verified[record["path"]] = record
+            if self.checkpoint is not None:
+                with open(self.checkpoint, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(record) + "\n")
+
+    def resolve(self, file_id: str) -> Optional[str]:
+        """Maps a File @id to a path inside base_dir, or None if it points elsewhere."""
+        if "://" in file_id or file_id.startswith(("/", "#")):
+            return None
+        relative = posixpath.normpath(file_id)
+        if relative.startswith("../") or relative == "..":
+            return None
+        path = os.path.realpath(os.path.join(self.base_dir, *relative.split("/")))
+        if os.path.commonpath([path, self.base_dir]) != self.base_dir:
+            return None
+        return path
+
+    def check_file(self, entity: Any) -> FileCheck:
+        """Checks one File entity (a DataFile or its JSON dict)."""
+        from .models import DataFile
+
+        if isinstance(entity, dict):
+            entity = DataFile.model_validate(entity)
+        path = self.resolve(entity.id)
+        if path is None:
+            return FileCheck(entity.id, False, "File is not inside the crate directory.")
+        declared = entity.checksum()
+        if declared is None:
+            return FileCheck(entity.id, False, "No checksum declared.")
+        alg, value = declared
+
+        try:
+            stat = os.stat(path)
+        except OSError as e:
+            return FileCheck(entity.id, False, f"Cannot read file: {e.strerror or e}")
+        if stat.st_size != entity.content_size:
+            return FileCheck(entity.id, False, f"Size is {stat.st_size}, expected {entity.content_size}.")
+
+        record = {"path": path, "alg": alg, "value": value, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        if self._verified.get(path) == record:
+            return FileCheck(entity.id, True)
+
+        with self._lock:
+            hasher = self._partial.pop(path, None)
+        if hasher is None or hasher.alg != alg:
+            hasher = FileHasher(path, alg, self.chunk_size)
+        try:
+            digest = hasher.run()
+        except OSError as e:
+            with self._lock:
+                self._partial[path] = hasher
+            return FileCheck(entity.id, False, f"Cannot read file: {e.strerror or e}")
+
+        if digest.size != entity.content_size:
+            return FileCheck(entity.id, False, f"Size is {digest.size}, expected {entity.content_size}.")
+        if digest.value != value:
+            return FileCheck(entity.id, False, f"{alg} does not match.")
+        self._record(record)
+        return FileCheck(entity.id, True)
+
+    def verify(self, message: Any) -> List[FileCheck]:
+        """
+        Checks every File entity of a crate.
+
+        Args:
+            message: A PCLMessage, LazyPCLMessage or JSON-LD document dict.
+
+        Returns:
+            One FileCheck per File entity, in graph order, then one per file
+            listed in the content without an entity.
+        """
+        def check(item: Tuple[Dict[str, Any], Optional[str]]) -> FileCheck:
+            entity, problem = item
+            if problem is not None:
+                return FileCheck(str(entity.get("@id")), False, problem)
+            return self.check_file(entity)
+
+        return _map(check, _file_entities(message), self.workers)
@@ -0,0 +1,199 @@
+"""
+JSON Canonicalization Scheme (RFC 8785).
+
+Produces the same bytes as other JCS implementations: object keys sorted by
+UTF-16 code units, ECMAScript number formatting and minimal string escaping.
+"""
+import hashlib
+import json
+import math
+import re
+import threading
+from decimal import Decimal
+from json.encoder import encode_basestring
+from typing import Any
+
+# integers beyond this cannot be represented exactly as an IEEE 754 double
+_MAX_SAFE_INTEGER = 2 ** 53
+
+# json.dumps output is canonical apart from numbers with a trailing ".0", an
+# exponent or more than 15 integer digits, which ECMAScript formats differently.
+# Outside strings, number tokens always follow one of : [ , or a \x00 sentinel
+# and are followed by one of , ] } or a sentinel.
+_TRAILING_ZERO = re.compile(r"\.0(?=[,\]}\x00])")
+_NEGATIVE_ZERO = re.compile(r"-0\.0(?=[,\]}\x00])")
+_DIGIT_RUN = re.compile(r"[0-9]{16}")
+_LONG_INTEGER = re.compile(r"[:\[,\x00-][0-9]{16}")
+_NON_ES_NUMBER = re.compile(
+    r"([:\[,\x00])(-?(?:[0-9]+(?:\.[0-9]+)?[eE][-+]?[0-9]+|[0-9]{16,}(?![.0-9eE])))"
+)
+# code point order only differs from UTF-16 order for these
+_NON_UTF16_ORDER = re.compile("[\ue000-\U0010ffff]")
+
+
+def _sorted_keys(obj: dict):
+    keys = list(obj)
+    for key in keys:
+        if not isinstance(key, str):
+            raise TypeError(f"Object keys must be strings, got {type(key).__name__}")
+    if all(key.isascii() for key in keys):
+        keys.sort()
+    else:
+        # big-endian UTF-16 bytes compare like UTF-16 code units
+        keys.sort(key=lambda key: key.encode("utf-16-be", "surrogatepass"))
+    return keys
+
+
+def format_number(value: Any) -> str:
+    """
+    Formats a number the way ECMAScript's Number.prototype.toString does.
+
+    Raises:
+        ValueError: For NaN, infinities and integers that are not exact doubles.
+    """
+    if isinstance(value, int):
+        if -_MAX_SAFE_INTEGER <= value <= _MAX_SAFE_INTEGER:
+            return str(value)
+        if float(value) != value:
+            raise ValueError(f"Integer {value} cannot be represented as an IEEE 754 double")
+        value = float(value)
+
+    if math.isnan(value) or math.isinf(value):
+        raise ValueError(f"{value} is not allowed in canonical JSON")
+    if value == 0:
+        return "0"
+
+    # repr gives the shortest digits that round-trip, same as ECMAScript
+    sign, raw_digits, exponent = Decimal(repr(value)).as_tuple()
+    raw = "".join(map(str, raw_digits))
+    # value == 0.<digits> * 10**point
+    point = len(raw) + exponent
+    digits = raw.rstrip("0")
+    k = len(digits)
+    prefix = "-" if sign else ""
+
+    if k <= point <= 21:
+        return prefix + digits + "0" * (point - k)
+    if 0 < point <= 21:
+        return prefix + digits[:point] + "." + digits[point:]
+    if -6 < point <= 0:
+        return prefix + "0." + "0" * -point + digits
+    exp = point - 1
+    exp_text = f"e+{exp}" if exp >= 0 else f"e-{-exp}"
+    if k == 1:
+        return prefix + digits + exp_text
+    return prefix + digits[0] + "." + digits[1:] + exp_text
+
+
+class JCSEncoder:
+    """
+    Streams the canonical form of a JSON value into a text buffer.
+
+    An encoder reuses its buffer between calls, so one instance per thread
+    avoids allocating a new one for every document.
+    """
+    def __init__(self):
+        self._parts = []
+
+    def _write(self, value: Any):
+        write = self._parts.append
+        if isinstance(value, str):
+            write(encode_basestring(value))
+        elif value is None:
+            write("null")
+        elif value is True:
+            write("true")
+        elif value is False:
+            write("false")
+        elif isinstance(value, (int, float)):
+            write(format_number(value))
+        elif isinstance(value, dict):
+            write("{")
+            first = True
+            for key in _sorted_keys(value):
+                if not first:
+                    write(",")
+                first = False
+                write(encode_basestring(key))
+                write(":")
+                self._write(value[key])
+            write("}")
+        elif isinstance(value, (list, tuple)):
+            write("[")
+            for index, item in enumerate(value):
+                if index:
+                    write(",")
+                self._write(item)
+            write("]")
+        else:
+            raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+    def encode(self, value: Any) -> bytes:
+        """Returns the canonical UTF-8 bytes of a JSON value."""
+        try:
+            self._write(value)
+            return "".join(self._parts).encode("utf-8")
+        finally:
+            self._parts.clear()
+
+    def encode_into(self, value: Any, buffer: bytearray) -> bytearray:
+        """Appends the canonical UTF-8 bytes of a JSON value to buffer."""
+        buffer += self.encode(value)
+        return buffer
+
+
+def _es_number(match) -> str:
+    delimiter, token = match.groups()
+    if "." in token or "e" in token or "E" in token:
+        return delimiter + format_number(float(token))
+    return delimiter + format_number(int(token))
+
+
+_local = threading.local()
+
+
+def _encoder() -> JCSEncoder:
+    encoder = getattr(_local, "encoder", None)
+    if encoder is None:
+        encoder = _local.encoder = JCSEncoder()
+    return encoder
+
+
+def canonicalize(value: Any) -> bytes:
+    """
+    Returns the RFC 8785 canonical UTF-8 bytes of a JSON value.
+
+    Serializes with the C json encoder and rewrites only the numbers that
+    ECMAScript formats differently. JCSEncoder handles the rare documents the
+    C output cannot be patched for: escaped quotes, and keys whose code point
+    order differs from UTF-16 order. Non-string keys are coerced as json.dumps does.
+
+    Raises:
+        ValueError: For numbers JCS cannot represent.
+        TypeError: For values that are not JSON.
+    """
+    try:
+        text = json.dumps(value, sort_keys=True, separators=(",", ":"), ensure_ascii=False, allow_nan=False)
+    except (TypeError, ValueError):
+        # the reference encoder raises the precise error
+        return _encoder().encode(value)
+    if '\\"' in text or (not text.isascii() and _NON_UTF16_ORDER.search(text)):
+        return _encoder().encode(value)
+
+    # without escaped quotes, every even part lies outside a string
+    parts = text.split('"')
+    outside = patched = "\x00" + "\x00".join(parts[0::2]) + "\x00"
+    # repr always signs its exponents, "e+" and "e-" never occur otherwise
+    if "e+" in patched or "e-" in patched or (_DIGIT_RUN.search(patched) and _LONG_INTEGER.search(patched)):
+        patched = _NON_ES_NUMBER.sub(_es_number, patched)
+    if ".0" in patched:
+        patched = _TRAILING_ZERO.sub("", _NEGATIVE_ZERO.sub("0", patched))
+    if patched != outside:
+        parts[0::2] = patched[1:-1].split("\x00")
+        text = '"'.join(parts)
+    return text.encode("utf-8")
+
+
+def digest(value: Any) -> str:
+    """Returns the hex SHA-256 of the canonical bytes of a JSON value."""
+    return hashlib.sha256(canonicalize(value)).hexdigest()
@@ -0,0 +1,415 @@
+"""
+Resolving sender keys for a receiving PCL that talks to many peers.
+
+A KeyResolver maps a reference, a sender's ROR or ORCID, a DID, or the
+kid of a JWS header, to parsed Verifiers. The references are looked up in
+a chain of backends: a local JSON or JWKS file, and did:web documents
+fetched over HTTPS. A file can point a sender at its DID, which is then
+resolved in turn:
+
+    {"https://ror.org/01bj3aw27": "did:web:lab.example.org",
+     "keys": [{"kty": "OKP", "crv": "Ed25519", "x": "...", "kid": "lab-key-1"}]}
+
+Results are cached for a TTL, unknown references for a shorter one, and
+concurrent lookups of the same reference share one backend call. Each
+distinct key is parsed once, however many references point at it, so
+verifying costs the same with three peers as with three hundred:
+
+    resolver = KeyResolver([JWKSFile("peers.json"), DidWebBackend()])
+    result = resolver.check(envelope)
+"""
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple, Union
+from urllib.parse import unquote
+from weakref import WeakValueDictionary
+
+from .crypto import VerificationResult, Verifier, _b64url_decode, thumbprint
+from .metrics import span
+
+logger = logging.getLogger(__name__)
+
+# how many references a backend may hand back in place of keys, one after another
+_MAX_ALIASES = 4
+
+
+class KeyLookupError(LookupError):
+    """Raised when no key is known for a reference."""
+
+
+def _jwks(document: Any) -> List[Dict[str, Any]]:
+    """Returns the JWKs in a JWK, a JWKS or a list of JWKs."""
+    if isinstance(document, list):
+        return [key for key in document if isinstance(key, dict)]
+    if isinstance(document, dict):
+        if isinstance(document.get("keys"), list):
+            return _jwks(document["keys"])
+        if "kty" in document:
+            return [document]
+    raise ValueError("Expected a JWK, a JWKS or a list of JWKs")
+
+
+class JWKSFile:
+    """
+    Keys from a local JSON file.
+
+    The file holds a JWKS, whose keys are found by kid or RFC 7638
+    thumbprint, and/or other members mapping a reference (a sender ROR or
+    ORCID, usually) to a JWK, a JWKS or a DID to resolve instead. The file
+    is read again when its modification time changes.
+    """
+    def __init__(self, path: Union[str, Path]):
+        self.path = Path(path)
+        self._mtime: Optional[int] = None
+        self._entries: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Any]:
+        mtime = self.path.stat().st_mtime_ns
+        with self._lock:
+            if mtime == self._mtime:
+                return self._entries
+        document = json.loads(self.path.read_text(encoding="utf-8"))
+        if not isinstance(document, dict):
+            raise ValueError(f"{self.path} does not hold a JSON object")
+        entries = {reference: value for reference, value in document.items() if reference != "keys"}
+        for key in _jwks(document.get("keys", [])):
+            entries.setdefault(thumbprint(key), key)
+            if key.get("kid"):
+                entries.setdefault(key["kid"], key)
+        with self._lock:
+            self._mtime, self._entries = mtime, entries
+        return entries
+
+    def lookup(self, reference: str) -> Any:
+        """Returns the keys or the DID a reference maps to, None if the file does not name it."""
+        return self._load().get(reference)
+
+
+def _fetch_json(url: str) -> Optional[Dict[str, Any]]:
+    import requests
+
+    response = requests.get(
+        url,
+        headers={"Accept": "application/did+json, application/json"},
+        timeout=10,
+    )
+    if response.status_code == 404:
+        return None
+    response.raise_for_status()
+    return response.json()
+
+
+class DidWebBackend:
+    """
+    Keys from did:web DID documents.
+
+    did:web:lab.example.org resolves to https://lab.example.org/.well-known/did.json
+    and did:web:lab.example.org:pcl to https://lab.example.org/pcl/did.json.
+    The publicKeyJwk of every verification method is returned with the
+    method's DID URL as its kid.
+    """
+    def __init__(
+        self,
+        fetch: Optional[Callable[[str], Optional[Dict[str, Any]]]] = None,
+        scheme: str = "https",
+    ):
+        """
+        Args:
+            fetch: Callable returning the JSON document at a URL, or None if
+                there is none. Defaults to an HTTP GET via requests.
+            scheme: URL scheme of the documents. did:web requires https; a
+                local stand-in for testing may serve http.
+        """
+        self._fetch = fetch or _fetch_json
+        self.scheme = scheme
+
+    def url(self, did: str) -> str:
+        """Returns the URL of the DID document for a did:web identifier."""
+        parts = did[len("did:web:"):].split(":")
+        path = "/".join(unquote(part) for part in parts[1:]) or ".well-known"
+        return f"{self.scheme}://{unquote(parts[0])}/{path}/did.json"
+
+    def lookup(self, reference: str) -> Optional[List[Dict[str, Any]]]:
+        if not reference.startswith("did:web:") or "#" in reference:
+            return None
+        document = self._fetch(self.url(reference))
+        if document is None:
+            return None
+        if document.get("id") != reference:
+            raise ValueError(f"DID document at {self.url(reference)} is for {document.get('id')!r}")
+        keys = []
+        for method in document.get("verificationMethod", []):
+            jwk = method.get("publicKeyJwk")
+            if not isinstance(jwk, dict) or not isinstance(method.get("id"), str):
+                continue
+            method_id = method["id"]
+            keys.append(dict(jwk, kid=reference + method_id if method_id.startswith("#") else method_id))
+        return keys
+
+
+class ResolverStats(NamedTuple):
+    """Counters for sizing a KeyResolver."""
+    hits: int
+    negative_hits: int
+    lookups: int
+    coalesced: int
+    entries: int
+    keys: int
+
+
+@lru_cache(maxsize=256)
+def _kid(encoded_header: str) -> Optional[str]:
+    """Returns the kid of a JWS protected header, if it has one. Each sender reuses one header."""
+    try:
+        header = json.loads(_b64url_decode(encoded_header))
+    except ValueError:
+        return None
+    kid = header.get("kid") if isinstance(header, dict) else None
+    return kid if isinstance(kid, str) else None
+
+
+def _sender_and_jws(envelope_model) -> Optional[Tuple[Any, Any]]:
+    """The sender and JWS of a PCLEnvelope or its dict, None for anything else."""
+    if hasattr(envelope_model, "canonical_bytes"):
+        return envelope_model.sender, envelope_model.authz.jws if envelope_model.authz is not None else None
+    if isinstance(envelope_model, dict):
+        authz = envelope_model.get("authz")
+        return envelope_model.get("sender"), authz.get("jws") if isinstance(authz, dict) else None
+    return None
+
+
+class KeyResolver:
+    """
+    Maps sender identifiers, DIDs and JWS key IDs to parsed Verifiers.
+
+    Backends are asked in order and the first to know a reference wins.
+    A backend is any object with a lookup(reference) method returning None
+    when it does not know the reference, a JWK, a JWKS or a list of JWKs,
+    or a DID (or other reference) to resolve instead.
+
+    Resolved references are kept for ttl seconds, unknown ones and failed
+    lookups for negative_ttl seconds. A reference being looked up by one
+    thread is waited for, not looked up again, by the others. Thread-safe.
+    """
+    def __init__(
+        self,
+        backends: Iterable[Any],
+        ttl: float = 3600.0,
+        negative_ttl: float = 60.0,
+        max_entries: int = 1024,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        """
+        Args:
+            backends: Backends to ask, in order.
+            ttl: Seconds a resolved reference is kept.
+            negative_ttl: Seconds an unknown reference, or one whose lookup
+                failed, is remembered as such.
+            max_entries: Maximum number of references kept.
+            clock: Returns the current time in seconds.
+        """
+        self.backends = list(backends)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._lock = threading.Lock()
+        # reference -> (verifiers, or the reason there are none, expires)
+        self._entries: "OrderedDict[str, Tuple[Union[Tuple[Verifier, ...], str], float]]" = OrderedDict()
+        self._inflight: Dict[str, Future] = {}
+        # kid and thumbprint -> Verifier, so a key named by several references is parsed once;
+        # weak, so a key goes once no cached reference names it any more
+        self._verifiers: "WeakValueDictionary[str, Verifier]" = WeakValueDictionary()
+        self._hits = self._negative_hits = self._lookups = self._coalesced = 0
+
+    def _parse(self, keys: List[Dict[str, Any]]) -> Tuple[Verifier, ...]:
+        verifiers = []
+        for key in keys:
+            public = {name: value for name, value in key.items() if name not in ("d", "p", "q", "dp", "dq", "qi")}
+            # the kid names the key, the thumbprint identifies it
+            identity = f"{public.get('kid')}:{thumbprint(public)}"
+            with self._lock:
+                verifier = self._verifiers.get(identity)
+                if verifier is None:
+                    verifier = self._verifiers[identity] = Verifier(public)
+            verifiers.append(verifier)
+        return tuple(verifiers)
+
+    def _lookup(self, reference: str, depth: int = 0) -> Union[Tuple[Verifier, ...], str]:
+        """Asks the backends, following aliases. Returns the verifiers or why there are none."""
+        if depth > _MAX_ALIASES:
+            return f"Too many aliases resolving {reference}"
+        if "#" in reference and reference.startswith("did:"):
+            # a DID URL names one method of the DID's document
+            did = reference.split("#", 1)[0]
+            verifiers = self._lookup(did, depth + 1)
+            if isinstance(verifiers, str):
+                return verifiers
+            return tuple(v for v in verifiers if v.key_id == reference) or f"{did} has no key {reference}"
+        for backend in self.backends:
+            found = backend.lookup(reference)
+            if found is None:
+                continue
+            if isinstance(found, str):
+                return self._lookup(found, depth + 1)
+            return self._parse(_jwks(found)) or f"No keys for {reference}"
+        return f"No key known for {reference}"
+
+    def _get(self, reference: str) -> Union[Tuple[Verifier, ...], str]:
+        now = self._clock()
+        with self._lock:
+            entry = self._entries.get(reference)
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(reference)
+                if isinstance(entry[0], str):
+                    self._negative_hits += 1
+                else:
+                    self._hits += 1
+                return entry[0]
+            future = self._inflight.get(reference)
+            if future is not None:
+                self._coalesced += 1
+                owner = False
+            else:
+                future = self._inflight[reference] = Future()
+                self._lookups += 1
+                owner = True
+        if not owner:
+            return future.result()
+
+        value = f"Key lookup for {reference} was interrupted"
+        try:
+            with span("keys.lookup"):
+                value = self._lookup(reference)
+        except Exception as e:
+            # remembered briefly, so a peer whose DID host is down is not asked on every message
+            logger.warning(f"Key lookup for {reference} failed: {e}")
+            value = f"Key lookup for {reference} failed: {e}"
+        finally:
+            expires = self._clock() + (self.negative_ttl if isinstance(value, str) else self.ttl)
+            with self._lock:
+                self._entries[reference] = (value, expires)
+                self._entries.move_to_end(reference)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                del self._inflight[reference]
+            # waiters are released even if the lookup was interrupted
+            future.set_result(value)
+        return value
+
+    def resolve_all(self, reference: str) -> Tuple[Verifier, ...]:
+        """
+        Returns a Verifier per key a reference maps to.
+
+        Raises:
+            KeyLookupError: If no backend knows the reference or its lookup failed.
+        """
+        value = self._get(reference)
+        if isinstance(value, str):
+            raise KeyLookupError(value)
+        return value
+
+    def resolve(self, reference: str, kid: Optional[str] = None) -> Verifier:
+        """
+        Returns the Verifier for a reference, the one whose key ID is kid if given.
+
+        Raises:
+            KeyLookupError: If the reference is unknown or has no key with that kid.
+        """
+        verifiers = self.resolve_all(reference)
+        if kid is not None:
+            verifiers = tuple(v for v in verifiers if v.key_id == kid)
+            if not verifiers:
+                raise KeyLookupError(f"{reference} has no key {kid}")
+        return verifiers[0]
+
+    def _candidates(self, sender: Any, jws: Any) -> Union[Tuple[Verifier, ...], str]:
+        """The sender's keys a signature is checked against, or why there are none."""
+        if not isinstance(sender, str):
+            return "No sender to resolve a key for."
+        kid = _kid(str(jws).split(".", 1)[0]) if jws else None
+        try:
+            verifiers = self.resolve_all(sender)
+        except KeyLookupError as e:
+            return str(e)
+        if kid is not None:
+            verifiers = tuple(v for v in verifiers if v.key_id == kid)
+            if not verifiers:
+                return f"{sender} has no key {kid}"
+        return verifiers
+
+    def key_identity(self, envelope_model) -> Optional[str]:
+        """
+        Names the keys check() tries for an envelope by kid and thumbprint, or
+        returns None if the sender's keys cannot be resolved. It changes when
+        the sender's keys do, so results cached under it are not reused
+        across a rotation.
+        """
+        fields = _sender_and_jws(envelope_model)
+        verifiers = self._candidates(*fields) if fields is not None else None
+        if verifiers is None or isinstance(verifiers, str):
+            return None
+        return ",".join(f"{verifier.key_id}:{verifier.thumbprint}" for verifier in verifiers)
+
+    def check(self, envelope_model) -> VerificationResult:
+        """
+        Verifies an envelope's signature with its sender's key.
+
+        When the JWS header names a kid, only the sender's key with that ID
+        is tried, so a sender cannot sign with a key resolved for another.
+        Otherwise each of the sender's keys is tried, which covers rotation.
+
+        Args:
+            envelope_model: An instance of PCLEnvelope (or a dict equivalent).
+
+        Returns:
+            VerificationResult(valid, reason).
+        """
+        fields = _sender_and_jws(envelope_model)
+        if fields is None:
+            return VerificationResult(False, "Unexpected error: envelope is not a mapping")
+        verifiers = self._candidates(*fields)
+        if isinstance(verifiers, str):
+            return VerificationResult(False, verifiers)
+
+        # models go to Verifier.check as they are, to be checked against their canonical bytes
+        result = VerificationResult(False, f"No keys for {fields[0]}")
+        for verifier in verifiers:
+            result = verifier.check(envelope_model)
+            if result.valid:
+                break
+        return result
+
+    def verify(self, envelope_model) -> bool:
+        """Like Verifier.verify, with the key resolved from the envelope's sender."""
+        result = self.check(envelope_model)
+        if not result.valid:
+            logger.warning(f"Verification failed: {result.reason}")
+        return result.valid
+
+    def invalidate(self, reference: Optional[str] = None):
+        """Forgets one reference, or everything, e.g. after a peer rotated its keys."""
+        with self._lock:
+            if reference is None:
+                self._entries.clear()
+                self._verifiers.clear()
+            else:
+                self._entries.pop(reference, None)
+
+    def stats(self) -> ResolverStats:
+        with self._lock:
+            return ResolverStats(
+                hits=self._hits,
+                negative_hits=self._negative_hits,
+                lookups=self._lookups,
+                coalesced=self._coalesced,
+                entries=len(self._entries),
+                keys=len(self._verifiers),
+            )
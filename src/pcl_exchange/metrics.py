@@ -0,0 +1,216 @@
+"""
+Stage timings for building, signing, verifying and validating messages.
+
+The library marks its internal stages with span() and timed(). Nothing is
+measured until a hook is installed, and while none is, a span costs one
+truthiness check and an empty with-block. Hooks are called as
+hook(stage, seconds) from whatever thread ran the stage.
+
+    with recording() as recorder:
+        validate_message(data)
+    print(recorder.to_prometheus())
+"""
+import functools
+import threading
+from bisect import bisect_left
+from contextlib import contextmanager
+from time import perf_counter
+from typing import Callable, Dict, Iterator, Optional, Sequence, Tuple
+
+Hook = Callable[[str, float], None]
+
+# upper bounds in seconds, from 100 microseconds to 10 seconds
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# replaced, never mutated, so spans can iterate it without a lock
+_hooks: Tuple[Hook, ...] = ()
+_hooks_lock = threading.Lock()
+
+
+def add_hook(hook: Hook):
+    """Installs a callback receiving (stage, seconds) for every finished stage."""
+    global _hooks
+    with _hooks_lock:
+        _hooks = _hooks + (hook,)
+
+
+def remove_hook(hook: Hook):
+    global _hooks
+    with _hooks_lock:
+        _hooks = tuple(h for h in _hooks if h is not hook)
+
+
+def enabled() -> bool:
+    """True while at least one hook is installed."""
+    return bool(_hooks)
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NOOP = _NoopSpan()
+
+
+class _Span:
+    __slots__ = ("name", "start")
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __enter__(self):
+        self.start = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        elapsed = perf_counter() - self.start
+        for hook in _hooks:
+            hook(self.name, elapsed)
+        return False
+
+
+def span(name: str):
+    """Context manager timing one stage, a shared no-op while no hook is installed."""
+    return _Span(name) if _hooks else _NOOP
+
+
+def timed(name: str):
+    """Decorator timing every call of a function as the given stage."""
+    def decorate(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _hooks:
+                return fn(*args, **kwargs)
+            with _Span(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+class Histogram:
+    """Counts of observed durations per bucket, with their sum, min and max."""
+    __slots__ = ("bounds", "counts", "count", "sum", "min", "max")
+
+    def __init__(self, bounds: Sequence[float] = DEFAULT_BUCKETS):
+        self.bounds = tuple(bounds)
+        # one count per bound, plus the overflow bucket
+        self.counts = [0] * (len(self.bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.min = float("inf")
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Estimates a quantile by interpolating inside its bucket."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            if count and seen + count >= rank:
+                lower = self.bounds[index - 1] if index > 0 else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else self.max
+                estimate = lower + (upper - lower) * (rank - seen) / count
+                return min(max(estimate, self.min), self.max)
+            seen += count
+        return self.max
+
+    def cumulative(self) -> Iterator[Tuple[float, int]]:
+        """Yields (upper bound, observations at or below it), ending with +inf."""
+        total = 0
+        for bound, count in zip(self.bounds + (float("inf"),), self.counts):
+            total += count
+            yield bound, total
+
+    def to_dict(self) -> Dict[str, object]:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "min": self.min if self.count else 0.0,
+            "max": self.max,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "buckets": {_format_bound(bound): total for bound, total in self.cumulative()},
+        }
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else format(bound, "g")
+
+
+class MetricsRecorder:
+    """
+    A hook that aggregates stage durations into one Histogram per stage.
+
+    Thread-safe; install it with add_hook() or the recording() context manager.
+    """
+    def __init__(self, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._histograms: Dict[str, Histogram] = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, stage: str, seconds: float):
+        with self._lock:
+            histogram = self._histograms.get(stage)
+            if histogram is None:
+                histogram = self._histograms[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def __getitem__(self, stage: str) -> Histogram:
+        return self._histograms[stage]
+
+    def __contains__(self, stage: str) -> bool:
+        return stage in self._histograms
+
+    def reset(self):
+        with self._lock:
+            self._histograms.clear()
+
+    def to_dict(self) -> Dict[str, Dict[str, object]]:
+        """Returns {stage: histogram summary} for every stage seen so far."""
+        with self._lock:
+            return {stage: histogram.to_dict() for stage, histogram in sorted(self._histograms.items())}
+
+    def to_prometheus(self, name: str = "pcl_exchange_stage_seconds") -> str:
+        """Renders the histograms in the Prometheus text exposition format, one series per stage."""
+        lines = [
+            f"# HELP {name} Time spent in each pcl-exchange stage.",
+            f"# TYPE {name} histogram",
+        ]
+        with self._lock:
+            for stage, histogram in sorted(self._histograms.items()):
+                label = stage.replace("\\", "\\\\").replace('"', '\\"')
+                for bound, total in histogram.cumulative():
+                    lines.append(f'{name}_bucket{{stage="{label}",le="{_format_bound(bound)}"}} {total}')
+                lines.append(f'{name}_sum{{stage="{label}"}} {histogram.sum!r}')
+                lines.append(f'{name}_count{{stage="{label}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def recording(recorder: Optional[MetricsRecorder] = None) -> Iterator[MetricsRecorder]:
+    """Installs a MetricsRecorder for the duration of the with-block and yields it."""
+    recorder = recorder if recorder is not None else MetricsRecorder()
+    add_hook(recorder)
+    try:
+        yield recorder
+    finally:
+        remove_hook(recorder)
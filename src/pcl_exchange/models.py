@@ -1,9 +1,15 @@
 from __future__ import annotations
-from typing import List, Optional, Union, Literal, Dict, Any
-from pydantic import BaseModel, Field, ConfigDict
+from typing import Annotated, List, Optional, Union, Literal, Dict, Any
+from pydantic import (
+    BaseModel, Field, ConfigDict, Discriminator, PrivateAttr, Tag, TypeAdapter, field_serializer, model_serializer,
+)
+import pydantic_core
 from datetime import datetime, timezone
+import hashlib
 import uuid
 
+from .params import ParameterTable
+
 # primitive patterns
 ROR_PATTERN = r"^https://ror\.org/[0-9a-hjkmnp-z]{9}$"
 ORCID_PATTERN = r"^https://orcid\.org/\d{4}-\d{4}-\d{4}-\d{3}[\dX]$"
@@ -19,21 +25,38 @@ class PropertyValue(BaseModel):
     
 class PCLActionContent(BaseModel):
     """Represents the domain payload"""
-    model_config = ConfigDict(populate_by_name=True)
+    model_config = ConfigDict(populate_by_name=True, arbitrary_types_allowed=True)
     id: str = Field(alias="@id")
     type: Literal["Action"] = Field("Action", alias="@type")
     instrument: Dict[str, str] = Field(..., description="Pointer to Instrument IRI")
     object: Dict[str, str] = Field(..., description="Pointer to Sample (IGSN)")
     used: Dict[str, str] = Field(..., alias="prov:used", description="Pointer to Method")
-    parameters: List[PropertyValue] = Field(..., alias="parameter")
+    # a ParameterTable holds many parameters as columns, see params.py
+    parameters: Union[ParameterTable, List[PropertyValue]] = Field(..., alias="parameter")
+
+    @field_serializer("parameters", mode="wrap")
+    def _serialize_parameters(self, value, handler):
+        if isinstance(value, ParameterTable):
+            return value.to_jsonld()
+        return handler(value)
     
     # helper to construct from strings
     @classmethod
-    def create(cls, instrument_id: str, sample_id: str, method_id: str, params: dict):
-        p_list = [
-            PropertyValue(name=k, value=v["val"], unit_text=v.get("unit")) 
-            for k, v in params.items()
-        ]
+    def create(
+        cls, instrument_id: str, sample_id: str, method_id: str, params: Union[dict, ParameterTable]
+    ):
+        """
+        Args:
+            params: {"name": {"val": v, "unit": u}}, or a ParameterTable which
+                is kept as is.
+        """
+        if isinstance(params, ParameterTable):
+            p_list = params
+        else:
+            p_list = [
+                PropertyValue(name=k, value=v["val"], unit_text=v.get("unit")) 
+                for k, v in params.items()
+            ]
         return cls(
             id="#content",
             instrument={"@id": instrument_id},
@@ -42,7 +65,184 @@ class PCLActionContent(BaseModel):
             parameter=p_list
         )
 
+def _drop_none(data: Dict[str, Any], keys: tuple) -> Dict[str, Any]:
+    # optional wire fields are left out rather than sent as null, the schema has no null for them
+    for key in keys:
+        if key in data and data[key] is None:
+            del data[key]
+    return data
+
+
+# data registration entities
+class DataFile(BaseModel):
+    """A data file listed in a register_data crate, with its size and checksum"""
+    model_config = ConfigDict(populate_by_name=True, extra="allow")
+    id: str = Field(alias="@id")
+    type: Literal["File"] = Field("File", alias="@type")
+    name: Optional[str] = None
+    content_size: int = Field(..., ge=0, alias="contentSize")
+    encoding_format: Optional[str] = Field(None, alias="encodingFormat")
+    sha256: Optional[str] = Field(None, pattern=r"^[A-Fa-f0-9]{64}$")
+    sha384: Optional[str] = Field(None, pattern=r"^[A-Fa-f0-9]{96}$")
+    sha512: Optional[str] = Field(None, pattern=r"^[A-Fa-f0-9]{128}$")
+
+    @model_serializer(mode="wrap")
+    def _serialize(self, handler):
+        return _drop_none(
+            handler(self),
+            ("name", "encodingFormat", "encoding_format", "sha256", "sha384", "sha512"),
+        )
+
+    def checksum(self) -> Optional[tuple]:
+        """Returns (alg, hex value) for the strongest declared checksum, or None."""
+        for alg in ("sha512", "sha384", "sha256"):
+            value = getattr(self, alg)
+            if value is not None:
+                return alg, value.lower()
+        return None
+
+
+class PCLDatasetContent(BaseModel):
+    """Represents the payload of a register_data crate"""
+    model_config = ConfigDict(populate_by_name=True, extra="allow")
+    id: str = Field(alias="@id")
+    type: Literal["Dataset"] = Field("Dataset", alias="@type")
+    name: Optional[str] = None
+    about: Optional[Dict[str, str]] = Field(None, description="Pointer to Sample (IGSN)")
+    # {"@id", "contentSize", checksum} per file, so the contentDigest covers the checksums
+    has_part: List[Dict[str, Any]] = Field(default_factory=list, alias="hasPart")
+
+    @model_serializer(mode="wrap")
+    def _serialize(self, handler):
+        return _drop_none(handler(self), ("name", "about"))
+
+
+# reply entities
+ERROR_TYPE = "https://w3id.org/pcl-profile/action/v1#Error"
+
+ErrorCode = Literal[
+    "INVALID_ENVELOPE", "UNAUTHORIZED", "FORBIDDEN", "SCHEMA_MISMATCH", "UNSUPPORTED_ACTION",
+    "CAPABILITY_MISMATCH", "NOT_FOUND", "CONFLICT", "RATE_LIMITED", "TEMPORARY_FAILURE", "INTERNAL_ERROR",
+]
+
+# default HTTP status per error code, and the codes a sender may retry
+ERROR_STATUS = {
+    "INVALID_ENVELOPE": 400,
+    "UNAUTHORIZED": 401,
+    "FORBIDDEN": 403,
+    "NOT_FOUND": 404,
+    "CONFLICT": 409,
+    "SCHEMA_MISMATCH": 422,
+    "UNSUPPORTED_ACTION": 422,
+    "CAPABILITY_MISMATCH": 422,
+    "RATE_LIMITED": 429,
+    "INTERNAL_ERROR": 500,
+    "TEMPORARY_FAILURE": 503,
+}
+RETRIABLE_CODES = ("RATE_LIMITED", "TEMPORARY_FAILURE", "INTERNAL_ERROR")
+
+
+class ErrorFault(BaseModel):
+    """One fine grained validation fault of a PCLError"""
+    model_config = ConfigDict(populate_by_name=True)
+    path: Optional[str] = None
+    schema_: Optional[str] = Field(None, alias="schema")
+    message: str = Field(..., min_length=1, max_length=512)
+
+    @model_serializer(mode="wrap")
+    def _serialize(self, handler):
+        return _drop_none(handler(self), ("path", "schema", "schema_"))
+
+
+class PCLError(BaseModel):
+    """The error object of the error.json contract, carried by nack replies"""
+    model_config = ConfigDict(populate_by_name=True)
+    type: Literal["https://w3id.org/pcl-profile/action/v1#Error"] = ERROR_TYPE
+    timestamp: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
+    code: ErrorCode
+    reason: str = Field(..., min_length=1, max_length=2048)
+    correlation_id: Optional[str] = Field(None, alias="correlationId", pattern=r"^[A-Za-z0-9_.:-]{6,128}$")
+    idempotency_key: Optional[str] = Field(None, alias="idempotencyKey", pattern=r"^[A-Za-z0-9_.:-]{6,128}$")
+    http_status: Optional[int] = Field(None, alias="httpStatus", ge=100, le=599)
+    retriable: bool = False
+    faults: Optional[List[ErrorFault]] = Field(None, max_length=50)
+    details: Optional[Dict[str, Any]] = None
+
+    @model_serializer(mode="wrap")
+    def _serialize(self, handler):
+        return _drop_none(
+            handler(self),
+            ("correlationId", "correlation_id", "idempotencyKey", "idempotency_key",
+             "httpStatus", "http_status", "faults", "details"),
+        )
+
+    @classmethod
+    def create(cls, code: str, reason: str, **fields: Any) -> "PCLError":
+        """
+        Builds an error with the default HTTP status and retriable flag of
+        its code. Over-long reasons are truncated to fit the contract.
+        """
+        fields.setdefault("http_status", ERROR_STATUS.get(code))
+        fields.setdefault("retriable", code in RETRIABLE_CODES)
+        if len(reason) > 2048:
+            reason = reason[:2045] + "..."
+        return cls(code=code, reason=reason or code, **fields)
+
+
+ACTION_COMPLETED = "http://schema.org/CompletedActionStatus"
+ACTION_FAILED = "http://schema.org/FailedActionStatus"
+
+
+class PCLReplyContent(BaseModel):
+    """The payload of an ack or nack crate: the outcome of receiving a message"""
+    model_config = ConfigDict(populate_by_name=True)
+    id: str = Field("#content", alias="@id")
+    type: Literal["Action"] = Field("Action", alias="@type")
+    action_status: Literal[
+        "http://schema.org/CompletedActionStatus", "http://schema.org/FailedActionStatus"
+    ] = Field(ACTION_COMPLETED, alias="actionStatus")
+    object: Dict[str, str] = Field(..., description="Pointer to the identifier of the received message")
+    error: Optional[PCLError] = None
+
+    @model_serializer(mode="wrap")
+    def _serialize(self, handler):
+        return _drop_none(handler(self), ("error",))
+
+
 # envelope entity
+class ContentDigest(BaseModel):
+    """Hash and size of the RFC 8785 canonical form of the content node."""
+    model_config = ConfigDict(populate_by_name=True)
+    alg: Literal["sha256", "sha384", "sha512"] = "sha256"
+    value: str = Field(..., pattern=r"^[A-Fa-f0-9]{64,128}$")
+    size: Optional[int] = Field(None, ge=0)
+
+    @model_serializer(mode="wrap")
+    def _serialize(self, handler):
+        return _drop_none(handler(self), ("size",))
+
+    @classmethod
+    def of(cls, node: Any, alg: str = "sha256") -> "ContentDigest":
+        """
+        Computes the digest of a content node.
+
+        Args:
+            node: The content node as a PCLActionContent or its JSON dict.
+            alg: sha256, sha384 or sha512.
+        """
+        from .jcs import canonicalize
+        if isinstance(node, BaseModel):
+            node = node.model_dump(mode="json", by_alias=True)
+        # one pass over the canonical buffer gives both the hash and the size
+        data = canonicalize(node)
+        return cls(alg=alg, value=hashlib.new(alg, data).hexdigest(), size=len(data))
+
+    def matches(self, node: Any) -> bool:
+        """True if node hashes to this digest (and size, when present)."""
+        other = ContentDigest.of(node, self.alg)
+        return other.value == self.value.lower() and self.size in (None, other.size)
+
+
 class AuthZ(BaseModel):
     model_config = ConfigDict(populate_by_name=True)
     type: Literal["DetachedJWS"] = "DetachedJWS"
@@ -60,7 +260,7 @@ class PCLEnvelope(BaseModel):
     )
 
     identifier: str = Field(default_factory=lambda: f"urn:uuid:{uuid.uuid4()}")
-    date_created: datetime = Field(default_factory=datetime.now(timezone.utc), alias="dateCreated")
+    date_created: datetime = Field(default_factory=lambda: datetime.now(timezone.utc), alias="dateCreated")
     
     sender: str = Field(..., pattern=f"{ROR_PATTERN}|{ORCID_PATTERN}")
     receiver: str
@@ -71,8 +271,69 @@ class PCLEnvelope(BaseModel):
     sample: str
     
     content_ref: Union[Dict[str, str], str] = Field(..., alias="contentRef")
+    content_digest: Optional[ContentDigest] = Field(None, alias="contentDigest")
+    encoding: Optional[Literal["identity", "gzip", "zstd"]] = None
     authz: Optional[AuthZ] = None
 
+    # memoized JCS bytes and digest of the signed fields, cleared on assignment
+    _canonical: Optional[bytes] = PrivateAttr(None)
+    _digest: Optional[str] = PrivateAttr(None)
+
+    @model_serializer(mode="wrap")
+    def _serialize(self, handler):
+        return _drop_none(handler(self), ("contentDigest", "content_digest", "encoding"))
+
+    @property
+    def content_id(self) -> str:
+        """The @id of the content node this envelope points to."""
+        if isinstance(self.content_ref, dict):
+            return self.content_ref.get("@id", "")
+        return self.content_ref
+
+    def __setattr__(self, name: str, value: Any):
+        super().__setattr__(name, value)
+        # authz is not part of the signed bytes
+        if not name.startswith("_") and name != "authz":
+            self.invalidate_canonical()
+
+    def model_copy(self, *, update: Optional[Dict[str, Any]] = None, deep: bool = False):
+        copied = super().model_copy(update=update, deep=deep)
+        if update:
+            copied.invalidate_canonical()
+        return copied
+
+    def invalidate_canonical(self):
+        """
+        Drops the memoized canonical bytes. Needed after mutating a nested
+        list or dict in place, e.g. capabilities.append().
+        """
+        self.__pydantic_private__.update(_canonical=None, _digest=None)
+
+    def signing_dict(self) -> Dict[str, Any]:
+        """The JSON form of the envelope that signatures cover, without authz."""
+        data = self.model_dump(mode="json", by_alias=True, exclude_none=True)
+        data.pop("authz", None)
+        return data
+
+    def canonical_bytes(self) -> bytes:
+        """
+        Returns the RFC 8785 canonical bytes of the signed fields, computed once
+        and shared by signing, digests and replay checks.
+        """
+        # read the private dict directly, pydantic's __getattr__ fallback is slow
+        cache = self.__pydantic_private__
+        if cache["_canonical"] is None:
+            from .jcs import canonicalize
+            cache["_canonical"] = canonicalize(self.signing_dict())
+        return cache["_canonical"]
+
+    def canonical_digest(self) -> str:
+        """Returns the hex SHA-256 of canonical_bytes()."""
+        cache = self.__pydantic_private__
+        if cache["_digest"] is None:
+            cache["_digest"] = hashlib.sha256(self.canonical_bytes()).hexdigest()
+        return cache["_digest"]
+
 # root RO-crate
 class ROCrateMetadata(BaseModel):
     model_config = ConfigDict(populate_by_name=True)
@@ -91,11 +352,187 @@ class ROCrateRoot(BaseModel):
     type: Literal["Dataset"] = Field("Dataset", alias="@type")
     hasPart: List[Dict[str, str]] = [{"@id": "#envelope"}, {"@id": "#content"}]
 
+def _graph_node_tag(node: Any) -> str:
+    """Picks the model for a @graph node from its @type and @id."""
+    if isinstance(node, dict):
+        node_type, node_id = node.get("@type"), node.get("@id")
+    else:
+        node_type, node_id = getattr(node, "type", None), getattr(node, "id", None)
+    if node_type == "PCLActionEnvelope":
+        return "envelope"
+    if node_type == "Action":
+        has_status = "actionStatus" in node if isinstance(node, dict) else hasattr(node, "action_status")
+        return "reply" if has_status else "content"
+    if node_type == "CreativeWork" and node_id == "ro-crate-metadata.json":
+        return "metadata"
+    if node_type == "Dataset" and node_id == "./":
+        return "root"
+    if node_type == "Dataset":
+        return "dataset"
+    if node_type == "File":
+        return "file"
+    return "node"
+
+
+# tagged union: each node is validated against exactly one model, so a broken
+# envelope is reported instead of silently falling through to a plain dict
+GraphNode = Annotated[
+    Union[
+        Annotated[ROCrateMetadata, Tag("metadata")],
+        Annotated[ROCrateRoot, Tag("root")],
+        Annotated[PCLEnvelope, Tag("envelope")],
+        Annotated[PCLActionContent, Tag("content")],
+        Annotated[PCLReplyContent, Tag("reply")],
+        Annotated[PCLDatasetContent, Tag("dataset")],
+        Annotated[DataFile, Tag("file")],
+        Annotated[Dict[str, Any], Tag("node")],
+    ],
+    Discriminator(_graph_node_tag),
+]
+
+_graph_node_adapter = TypeAdapter(GraphNode)
+
+
 class PCLMessage(BaseModel):
     """The full JSON-LD document"""
     model_config = ConfigDict(populate_by_name=True)
     context: List[Any] = Field(..., alias="@context")
-    graph: List[Union[ROCrateMetadata, ROCrateRoot, PCLEnvelope, PCLActionContent, Dict[str, Any]]] = Field(..., alias="@graph")
+    graph: List[GraphNode] = Field(..., alias="@graph")
 
     def to_json(self):
-        return self.model_dump_json(by_alias=True, indent=2)
\ No newline at end of file
+        return self.model_dump_json(by_alias=True, indent=2)
+
+    def to_graph(self, base: Optional[str] = None):
+        """
+        Returns the message as an rdflib Graph, built directly from the models.
+        """
+        from .rdf import CRATE_BASE, message_to_graph
+        return message_to_graph(self, base=base or CRATE_BASE)
+
+    def to_bytes(self, encoding: Optional[str] = None, level: Optional[int] = None) -> bytes:
+        """
+        Serializes the message to compact JSON bytes for the wire.
+
+        Args:
+            encoding: identity, gzip or zstd. Defaults to the envelope's encoding.
+            level: Compression level.
+        """
+        from .wire import encode_message
+        return encode_message(self, encoding, level)
+
+    @classmethod
+    def from_bytes(
+        cls,
+        data: bytes,
+        lazy: bool = False,
+        verify_digest: bool = True,
+        max_size: Optional[int] = None,
+    ) -> Union["PCLMessage", "LazyPCLMessage"]:
+        """
+        Parses a received message in any supported encoding.
+
+        The payload is decompressed and parsed, and the envelope's
+        contentDigest is checked against the content node before any model
+        is validated.
+
+        Args:
+            data: The received bytes, identity, gzip or zstd.
+            lazy: Return a LazyPCLMessage, see from_json_bytes.
+            verify_digest: Check the contentDigest when the envelope has one.
+            max_size: Refuse payloads that expand beyond this many bytes.
+
+        Raises:
+            ContentDigestError: If the content does not match its digest.
+            ValueError: If the payload cannot be decoded or parsed.
+            pydantic.ValidationError: If the document is invalid.
+        """
+        from .wire import decode_document
+        document = decode_document(data, verify_digest=verify_digest, max_size=max_size)
+        if lazy:
+            return LazyPCLMessage(document)
+        return cls.model_validate(document)
+
+    @classmethod
+    def from_json_bytes(cls, data: Union[bytes, str], lazy: bool = False) -> Union["PCLMessage", "LazyPCLMessage"]:
+        """
+        Parses an inbound crate straight from its JSON bytes.
+
+        Args:
+            data: The JSON document.
+            lazy: Only validate the envelope now and defer the other nodes until
+                they are accessed. Useful for routing and signature checks.
+
+        Returns:
+            A PCLMessage, or a LazyPCLMessage if lazy is set.
+
+        Raises:
+            pydantic.ValidationError: If the document (or, when lazy, the envelope) is invalid.
+            ValueError: If a lazy document has no envelope node.
+        """
+        if not lazy:
+            return cls.model_validate_json(data)
+        return LazyPCLMessage(pydantic_core.from_json(data))
+
+
+class LazyPCLMessage:
+    """
+    A parsed crate whose envelope is validated up front and whose other
+    nodes are validated on first access.
+    """
+    def __init__(self, document: Any):
+        if not isinstance(document, dict) or not isinstance(document.get("@graph"), list):
+            raise ValueError("Document is not a JSON-LD object with an @graph list")
+        self.document = document
+        self._message: Optional[PCLMessage] = None
+        self._content: Any = None
+        self._content_index: Optional[int] = None
+
+        self._envelope_index = next(
+            (i for i, node in enumerate(document["@graph"]) if _graph_node_tag(node) == "envelope"),
+            None,
+        )
+        if self._envelope_index is None:
+            raise ValueError("Document has no PCLActionEnvelope node")
+        self.envelope: PCLEnvelope = PCLEnvelope.model_validate(document["@graph"][self._envelope_index])
+
+    @property
+    def context(self) -> List[Any]:
+        return self.document.get("@context", [])
+
+    @property
+    def content(self) -> Union[PCLActionContent, PCLDatasetContent, PCLReplyContent, None]:
+        """The node the envelope's contentRef points to, validated on first access."""
+        if self._message is not None:
+            content_id = self.envelope.content_id
+            return next((n for n in self._message.graph if getattr(n, "id", None) == content_id), None)
+        if self._content is None:
+            content_id = self.envelope.content_id
+            self._content_index = next(
+                (i for i, n in enumerate(self.document["@graph"]) if isinstance(n, dict) and n.get("@id") == content_id),
+                None,
+            )
+            if self._content_index is not None:
+                self._content = _graph_node_adapter.validate_python(self.document["@graph"][self._content_index])
+        return self._content
+
+    def load(self) -> PCLMessage:
+        """Validates the remaining nodes and returns the full PCLMessage."""
+        if self._message is None:
+            graph = []
+            for index, node in enumerate(self.document["@graph"]):
+                if index == self._envelope_index:
+                    graph.append(self.envelope)
+                elif index == self._content_index and self._content is not None:
+                    graph.append(self._content)
+                else:
+                    graph.append(_graph_node_adapter.validate_python(node))
+            # already validated nodes pass through without being validated again
+            self._message = PCLMessage.model_validate({"@context": self.document.get("@context"), "@graph": graph})
+        return self._message
+
+    @property
+    def graph(self) -> list:
+        return self.load().graph
+
+    def to_json(self) -> str:
+        return self.load().to_json()
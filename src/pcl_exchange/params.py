@@ -0,0 +1,144 @@
+"""
+Column-oriented storage for the parameters of a content node.
+
+PCLActionContent normally holds one PropertyValue model per parameter. Scan
+definitions with per-point positions or composition grids carry thousands
+of them, and a ParameterTable keeps them as columns instead: the names in a
+list, the values in an array.array when they are all ints or all floats,
+and the units as small integer codes into a table of the distinct units.
+The columns are type-checked once each, and the table serializes to the
+same JSON-LD parameter list as the PropertyValue models would.
+
+    table = ParameterTable(names, positions, units="mm")
+    builder.set_content(instrument, sample, method, table)
+"""
+from array import array
+from typing import Any, Dict, Iterable, Iterator, List, Mapping, Optional, Tuple, Union
+
+Value = Union[str, float, int]
+
+_INT64_MIN, _INT64_MAX = -(2 ** 63), 2 ** 63 - 1
+
+
+def _as_list(values: Iterable[Any]) -> List[Any]:
+    # numpy arrays and array.array convert to Python scalars in one C call
+    tolist = getattr(values, "tolist", None)
+    return tolist() if tolist is not None else list(values)
+
+
+def _value_column(values: List[Any]) -> Union[array, List[Value]]:
+    """Packs the values into the narrowest column that keeps each one exactly as PropertyValue would."""
+    kinds = set(map(type, values))
+    unknown = kinds - {str, int, float, bool}
+    if unknown:
+        names = ", ".join(sorted(kind.__name__ for kind in unknown))
+        raise TypeError(f"Parameter values must be str, int or float, got {names}")
+    if not kinds or kinds <= {float, bool}:
+        # PropertyValue turns booleans into floats as well
+        return array("d", values)
+    if kinds == {int} and _INT64_MIN <= min(values) and max(values) <= _INT64_MAX:
+        return array("q", values)
+    if bool in kinds:
+        return [float(v) if type(v) is bool else v for v in values]
+    return values
+
+
+class ParameterTable:
+    """
+    Parameters of a content node stored as columns.
+
+    Iterating yields PropertyValue models, built on demand, so code written
+    against a list of them keeps working. rows() and to_jsonld() read the
+    columns directly.
+    """
+    __slots__ = ("names", "values", "unit_codes", "units")
+
+    def __init__(
+        self,
+        names: Iterable[str],
+        values: Iterable[Value],
+        units: Union[None, str, Iterable[Optional[str]]] = None,
+    ):
+        """
+        Args:
+            names: Parameter names.
+            values: One value per name: str, int or float. array.array and
+                numpy arrays are accepted as well.
+            units: One unitText per name (None for no unit), a single unit
+                shared by every parameter, or None for no units at all.
+
+        Raises:
+            TypeError: If a name is not a string or a value has another type.
+            ValueError: If the columns differ in length.
+        """
+        self.names: List[str] = _as_list(names)
+        if not all(type(name) is str for name in self.names):
+            raise TypeError("Parameter names must be strings")
+        value_list = _as_list(values)
+        if len(value_list) != len(self.names):
+            raise ValueError(f"Got {len(value_list)} values for {len(self.names)} names")
+        self.values: Union[array, List[Value]] = _value_column(value_list)
+
+        # code 0 is reserved for "no unit"
+        self.units: List[Optional[str]] = [None]
+        if units is None or isinstance(units, str):
+            code = 0 if units is None else self._intern(units, {})
+            self.unit_codes = array("I", [code]) * len(self.names)
+            return
+        unit_list = _as_list(units)
+        if len(unit_list) != len(self.names):
+            raise ValueError(f"Got {len(unit_list)} units for {len(self.names)} names")
+        codes: Dict[Optional[str], int] = {None: 0}
+        self.unit_codes = array("I", [
+            codes[unit] if unit in codes else self._intern(unit, codes) for unit in unit_list
+        ])
+
+    def _intern(self, unit: str, codes: Dict[Optional[str], int]) -> int:
+        if type(unit) is not str:
+            raise TypeError(f"Units must be strings or None, got {type(unit).__name__}")
+        codes[unit] = len(self.units)
+        self.units.append(unit)
+        return codes[unit]
+
+    @classmethod
+    def from_params(cls, params: Mapping[str, Mapping[str, Any]]) -> "ParameterTable":
+        """Builds a table from the set_content format, {"name": {"val": v, "unit": u}}."""
+        return cls(params, [spec["val"] for spec in params.values()], [spec.get("unit") for spec in params.values()])
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def rows(self) -> Iterator[Tuple[str, Value, Optional[str]]]:
+        """Yields (name, value, unitText) per parameter."""
+        units = self.units
+        for name, value, code in zip(self.names, self.values, self.unit_codes):
+            yield name, value, units[code]
+
+    def __iter__(self):
+        from .models import PropertyValue
+
+        for name, value, unit in self.rows():
+            yield PropertyValue.model_construct(name=name, value=value, unit_text=unit)
+
+    def __getitem__(self, index: int):
+        from .models import PropertyValue
+
+        return PropertyValue.model_construct(
+            name=self.names[index], value=self.values[index], unit_text=self.units[self.unit_codes[index]]
+        )
+
+    def __eq__(self, other: Any) -> bool:
+        if not isinstance(other, ParameterTable):
+            return NotImplemented
+        return list(self.rows()) == list(other.rows())
+
+    def __repr__(self) -> str:
+        kind = f"array('{self.values.typecode}')" if isinstance(self.values, array) else "list"
+        return f"ParameterTable({len(self)} parameters, values={kind}, units={self.units[1:]})"
+
+    def to_jsonld(self) -> List[Dict[str, Any]]:
+        """Returns the parameter list exactly as the PropertyValue models serialize it."""
+        return [
+            {"@type": "PropertyValue", "name": name, "value": value, "unitText": unit}
+            for name, value, unit in self.rows()
+        ]
@@ -0,0 +1,334 @@
+import json
+import threading
+from urllib.parse import urljoin
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from rdflib import BNode, Graph, Literal, URIRef
+from rdflib.namespace import RDF, XSD
+from rdflib.plugins.shared.jsonld.context import UNDEF, Context
+
+from .contexts import ContextLoader, default_loader
+from .models import PCLActionContent, PCLMessage
+from .params import ParameterTable
+from .registry import _LRUCache
+
+# base IRI used to resolve relative @id values such as "#content" or "./"
+CRATE_BASE = "file:///crate/"
+
+
+class _Unsupported(Exception):
+    """Raised when a node uses JSON-LD features the direct converter does not cover."""
+
+
+class _TermMap:
+    """
+    Resolves terms, types and @id values against a fixed JSON-LD context.
+
+    The lookups mirror what rdflib's JSON-LD parser does for the flat node
+    objects used in PCL crates and are memoized per term.
+    """
+    def __init__(self, context: Context):
+        self.context = context
+        self._predicates: Dict[str, Any] = {}
+        self._types: Dict[str, URIRef] = {}
+        self._ids: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def predicate(self, key: str):
+        """Returns (predicate, term) for a property key, predicate is None if undefined."""
+        entry = self._predicates.get(key)
+        if entry is None:
+            term = self.context.terms.get(key)
+            if term is not None:
+                if (
+                    term.reverse
+                    or term.container
+                    or term.context
+                    or term.language is not UNDEF
+                    or term.type == "@json"
+                ):
+                    raise _Unsupported(key)
+                pred_uri = term.id
+            else:
+                pred_uri = self.context.expand(key)
+            predicate = URIRef(pred_uri) if pred_uri and not pred_uri.startswith("_:") else False
+            entry = (predicate, term)
+            with self._lock:
+                self._predicates[key] = entry
+        return entry
+
+    def type_iri(self, value: str) -> URIRef:
+        iri = self._types.get(value)
+        if iri is None:
+            iri = URIRef(self.context.expand(value) or self.context.resolve_iri(value))
+            with self._lock:
+                self._types[value] = iri
+        return iri
+
+    def node_id(self, value: str):
+        """Returns the subject for an @id value, or None if it is not a usable IRI."""
+        node = self._ids.get(value)
+        if node is None:
+            if value.startswith("_:"):
+                node = BNode(value[2:]) if len(value) > 2 else False
+            else:
+                uri = self.context.resolve(value)
+                node = URIRef(uri) if uri and ":" in uri else False
+            with self._lock:
+                self._ids[value] = node
+        return node or None
+
+
+# keyed by the @context of inbound messages, so bounded: a peer varying it cannot grow this;
+# also keyed by the loader, since two loaders may resolve the same context URL differently
+MAX_TERM_MAPS = 64
+_term_maps = _LRUCache(MAX_TERM_MAPS)
+
+
+def _term_map(context: Any, base: str, loader: ContextLoader) -> _TermMap:
+    def build() -> _TermMap:
+        resolved = loader.resolve({"@context": context})["@context"]
+        ctx = Context(base=base, version=1.1)
+        ctx.load(resolved, ctx.base)
+        if ctx.language or ctx.vocab:
+            raise _Unsupported("@language/@vocab")
+        # the entry holds on to its loader, so the loader's id cannot be reused while it is cached
+        return loader, _TermMap(ctx)
+
+    key = json.dumps([id(loader), context, base], sort_keys=True)
+    return _term_maps.get_or_create(key, build)[1]
+
+
+def _literal(value: Any) -> Literal:
+    # same literal forms rdflib's JSON-LD parser produces for native JSON values
+    if isinstance(value, float):
+        return Literal(value, datatype=XSD.double)
+    return Literal(value)
+
+
+def _object(add: Callable, terms: _TermMap, term, value: Any):
+    if isinstance(value, dict):
+        if any(k.startswith("@") and k not in ("@id", "@type") for k in value):
+            raise _Unsupported(next(iter(value)))
+        return _emit_node(add, terms, value)
+    if value is None:
+        return None
+    if term is not None and term.type is not UNDEF and term.type is not None:
+        if isinstance(value, str) and term.type == "@id":
+            return terms.node_id(value)
+        if isinstance(value, str) and term.type == "@vocab":
+            return terms.type_iri(value)
+        return Literal(value, datatype=terms.context.expand(term.type))
+    return _literal(value)
+
+
+def _values(value: Any) -> Iterable[Any]:
+    if isinstance(value, list):
+        for item in value:
+            yield from _values(item)
+    else:
+        yield value
+
+
+def _emit_node(add: Callable, terms: _TermMap, node: Dict[str, Any]):
+    node_id = node.get("@id")
+    subject = terms.node_id(node_id) if isinstance(node_id, str) else BNode()
+    if subject is None:
+        return None
+
+    for key, value in node.items():
+        if key == "@id":
+            continue
+        if key == "@type":
+            for type_name in _values(value):
+                add((subject, RDF.type, terms.type_iri(type_name)))
+            continue
+        if key.startswith("@"):
+            raise _Unsupported(key)
+
+        predicate, term = terms.predicate(key)
+        if not predicate:
+            continue
+        for item in _values(value):
+            obj = _object(add, terms, term, item)
+            if obj is not None:
+                add((subject, predicate, obj))
+    return subject
+
+
+def _emit_content(add: Callable, terms: _TermMap, content: PCLActionContent):
+    subject = terms.node_id(content.id)
+    if subject is None:
+        return
+    add((subject, RDF.type, terms.type_iri(content.type)))
+
+    for key, value in (
+        ("instrument", content.instrument),
+        ("object", content.object),
+        ("prov:used", content.used),
+    ):
+        predicate, term = terms.predicate(key)
+        if predicate and value is not None:
+            obj = _object(add, terms, term, value)
+            if obj is not None:
+                add((subject, predicate, obj))
+
+    # parameters are the bulk of a crate, emit them without going through dicts
+    parameter, _ = terms.predicate("parameter")
+    if not parameter:
+        return
+    pv_type = terms.type_iri("PropertyValue")
+    name, _ = terms.predicate("name")
+    value, _ = terms.predicate("value")
+    unit_text, _ = terms.predicate("unitText")
+    params = content.parameters
+    if isinstance(params, ParameterTable):
+        rows = params.rows()
+    else:
+        rows = ((pv.name, pv.value, pv.unit_text) for pv in params)
+    # a crate repeats a handful of units across all its parameters
+    unit_literals: Dict[str, Literal] = {}
+    for pv_name, pv_value, pv_unit in rows:
+        node = BNode()
+        add((subject, parameter, node))
+        add((node, RDF.type, pv_type))
+        if name:
+            add((node, name, Literal(pv_name)))
+        if value and pv_value is not None:
+            add((node, value, _literal(pv_value)))
+        if unit_text and pv_unit is not None:
+            unit = unit_literals.get(pv_unit)
+            if unit is None:
+                unit = unit_literals[pv_unit] = Literal(pv_unit)
+            add((node, unit_text, unit))
+
+
+def _emit_message(add: Callable, terms: _TermMap, message: PCLMessage):
+    for node in message.graph:
+        if isinstance(node, PCLActionContent):
+            _emit_content(add, terms, node)
+        elif isinstance(node, dict):
+            if "@context" in node:
+                raise _Unsupported("@context")
+            _emit_node(add, terms, node)
+        else:
+            _emit_node(add, terms, node.model_dump(mode="json", by_alias=True))
+
+
+def _emit_document(add: Callable, terms: _TermMap, document: Dict[str, Any]):
+    if any(k not in ("@context", "@graph") for k in document):
+        raise _Unsupported("top-level node")
+    for node in _values(document.get("@graph", [])):
+        if not isinstance(node, dict) or "@context" in node:
+            raise _Unsupported("@context")
+        _emit_node(add, terms, node)
+
+
+def _parse_jsonld(document: Dict[str, Any], base: str, loader: ContextLoader) -> Graph:
+    graph = Graph()
+    graph.parse(data=json.dumps(loader.resolve(document)), format="json-ld", base=base)
+    return graph
+
+
+def triples(
+    data: Union[PCLMessage, Dict[str, Any]],
+    base: str = CRATE_BASE,
+    context_loader: Optional[ContextLoader] = None,
+) -> List[Tuple[Any, Any, Any]]:
+    """
+    Returns the RDF triples of a PCLMessage or a parsed JSON-LD crate.
+
+    Flat node objects are converted directly against the message context.
+    Anything else falls back to rdflib's JSON-LD parser, so the triples are
+    always the same as parsing the JSON-LD text with the same base.
+
+    Args:
+        data: A PCLMessage or a JSON-LD document with @context and @graph.
+        base: Base IRI used to resolve relative @id values.
+        context_loader: Resolves remote @context references. Defaults to the shared loader.
+    """
+    loader = context_loader or default_loader
+    out: List[Tuple[Any, Any, Any]] = []
+    try:
+        if isinstance(data, PCLMessage):
+            terms = _term_map(data.context, base, loader)
+            _emit_message(out.append, terms, data)
+        else:
+            terms = _term_map(data.get("@context"), base, loader)
+            _emit_document(out.append, terms, data)
+    except _Unsupported:
+        if isinstance(data, PCLMessage):
+            data = json.loads(data.model_dump_json(by_alias=True))
+        return list(_parse_jsonld(data, base, loader))
+    return out
+
+
+def message_to_graph(
+    message: Union[PCLMessage, Dict[str, Any]],
+    base: str = CRATE_BASE,
+    graph: Optional[Graph] = None,
+    context_loader: Optional[ContextLoader] = None,
+) -> Graph:
+    """
+    Converts a PCLMessage into an rdflib Graph without a JSON round-trip.
+
+    The result is isomorphic to parsing message.to_json() as JSON-LD with the
+    same base. Nodes using JSON-LD features outside the flat node objects of a
+    PCL crate fall back to the JSON-LD parser. A parsed JSON-LD document is
+    accepted as well.
+
+    Args:
+        message: The message to convert.
+        base: Base IRI used to resolve relative @id values.
+        graph: Optional graph to add the triples to.
+        context_loader: Resolves remote @context references. Defaults to the shared loader.
+
+    Returns:
+        The graph holding the message triples.
+    """
+    target = Graph() if graph is None else graph
+    add = target.add
+    for triple in triples(message, base=base, context_loader=context_loader):
+        add(triple)
+    return target
+
+
+def reachable(
+    data_triples: Iterable[Tuple[Any, Any, Any]],
+    ref: Any,
+    base: str = CRATE_BASE,
+) -> Optional[List[Tuple[Any, Any, Any]]]:
+    """
+    Returns the triples describing a node and every node it links to, directly
+    or through other nodes, such as the content entity named by contentRef.
+
+    Args:
+        data_triples: The triples of the whole crate.
+        ref: The node's @id, as a string or {"@id": ...} reference.
+        base: Base IRI used to resolve a relative @id.
+
+    Returns:
+        The triples of the reachable nodes, or None if the node is not
+        described in the crate, for example an external contentRef.
+    """
+    node_id = ref.get("@id") if isinstance(ref, dict) else ref
+    if not isinstance(node_id, str):
+        return None
+    by_subject: Dict[Any, List[Tuple[Any, Any, Any]]] = {}
+    for triple in data_triples:
+        by_subject.setdefault(triple[0], []).append(triple)
+
+    root = BNode(node_id[2:]) if node_id.startswith("_:") else URIRef(urljoin(base, node_id))
+    if root not in by_subject:
+        return None
+    seen = {root}
+    stack = [root]
+    out: List[Tuple[Any, Any, Any]] = []
+    while stack:
+        for triple in by_subject[stack.pop()]:
+            out.append(triple)
+            value = triple[2]
+            if value not in seen and value in by_subject:
+                seen.add(value)
+                stack.append(value)
+    return out
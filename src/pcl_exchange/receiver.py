@@ -0,0 +1,415 @@
+"""
+Asyncio ingest pipeline for a receiving PCL.
+
+Every received message passes parse -> verify -> schema -> shacl and ends
+with a signed ack or nack reply. The stages are connected by bounded
+queues, so when a stage falls behind, submit() waits instead of buffering
+without limit. Each stage runs a configurable number of workers, and the
+stage functions, which are CPU-bound, run in an executor rather than on the
+event loop. A message that fails a stage skips the remaining checks and
+goes straight to the reply stage.
+"""
+import asyncio
+import functools
+import json
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Mapping, NamedTuple, Optional, Tuple, Union
+
+from .builder import PCLReplyBuilder
+from .contexts import ContextLoader
+from .crypto import Signer, Verifier
+from .keys import KeyResolver
+from .models import PCLError, PCLMessage
+from .registry import SchemaRegistry, default_registry
+from .replay import ReplayGuard
+from .validation import validate_semantics
+from .wire import ContentDigestError, check_content_digest, decompress, find_nodes
+
+if TYPE_CHECKING:
+    import jsonschema
+
+STAGES = ("parse", "verify", "schema", "shacl", "reply")
+
+DEFAULT_CONCURRENCY = {"parse": 2, "verify": 2, "schema": 2, "shacl": 4, "reply": 2}
+
+# error.json allows at most this many faults
+MAX_FAULTS = 50
+
+
+class ReceiveResult(NamedTuple):
+    """Outcome of receiving one message. error is None when accepted."""
+    accepted: bool
+    identifier: Optional[str]
+    error: Optional[PCLError]
+    reply: Optional[PCLMessage]
+    document: Optional[Dict[str, Any]]
+
+
+class PipelineStats(NamedTuple):
+    """Counters of a ReceiverPipeline since it started."""
+    received: int
+    accepted: int
+    rejected: int
+    in_flight: int
+    messages_per_second: float
+    queue_depths: Dict[str, int]
+
+
+class _Item:
+    __slots__ = ("data", "future", "document", "envelope", "error")
+
+    def __init__(self, data: Any, future: "asyncio.Future[ReceiveResult]"):
+        self.data = data
+        self.future = future
+        self.document: Optional[Dict[str, Any]] = None
+        self.envelope: Optional[Dict[str, Any]] = None
+        self.error: Optional[PCLError] = None
+
+
+def parse_stage(
+    data: Union[bytes, str, Dict[str, Any]],
+    max_size: Optional[int] = None,
+) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]], Optional[PCLError]]:
+    """
+    Decodes a message and checks its contentDigest.
+
+    Returns:
+        (document, envelope node, error). The document and envelope are
+        returned even when the digest check fails, so the error can be
+        answered with a nack.
+    """
+    try:
+        if isinstance(data, bytes):
+            data, _ = decompress(data, max_size)
+        document = json.loads(data) if isinstance(data, (str, bytes)) else data
+    except (ImportError, ValueError) as e:
+        return None, None, PCLError.create("INVALID_ENVELOPE", f"Cannot decode message: {e}")
+    envelope, _ = find_nodes(document)
+    if envelope is None:
+        return None, None, PCLError.create("INVALID_ENVELOPE", "No PCLActionEnvelope node found")
+    try:
+        check_content_digest(document)
+    except ContentDigestError as e:
+        return document, envelope, PCLError.create("INVALID_ENVELOPE", f"Content Digest: {e}")
+    return document, envelope, None
+
+
+def verify_stage(
+    envelope: Dict[str, Any],
+    receiver_id: str,
+    verifier: Union[Verifier, KeyResolver, Mapping[str, Verifier], None] = None,
+    replay_guard: Optional[ReplayGuard] = None,
+) -> Optional[PCLError]:
+    """
+    Checks the addressee, the signature and, once the signature holds, that
+    the message is not a replay. With a verifier, the envelope must carry a
+    contentDigest, which parse_stage has checked against the content.
+    """
+    if envelope.get("receiver") != receiver_id:
+        return PCLError.create("FORBIDDEN", f"Message is addressed to {envelope.get('receiver')}, not {receiver_id}")
+    if isinstance(verifier, Mapping):
+        verifier = verifier.get(envelope.get("sender"))
+        if verifier is None:
+            return PCLError.create("UNAUTHORIZED", f"No key known for sender {envelope.get('sender')}")
+    if verifier is not None:
+        result = verifier.check(envelope)
+        if not result.valid:
+            return PCLError.create("UNAUTHORIZED", f"Signature verification failed: {result.reason}")
+        if envelope.get("contentDigest") is None:
+            return PCLError.create(
+                "UNAUTHORIZED", "Envelope has no contentDigest, the signature does not cover the content."
+            )
+    if replay_guard is not None:
+        # only after the signature holds, so forged messages cannot burn identifiers
+        result = replay_guard.check(envelope)
+        if not result.accepted:
+            return PCLError.create("CONFLICT", f"Replay check failed: {result.reason}")
+    return None
+
+
+def _fault(error: "jsonschema.ValidationError", schema_id: Optional[str]) -> Dict[str, Any]:
+    path = "".join(f"/{part}" for part in error.absolute_path)
+    message = error.message if len(error.message) <= 512 else error.message[:509] + "..."
+    fault = {"path": path or "/", "message": message}
+    if schema_id:
+        fault["schema"] = schema_id
+    return fault
+
+
+def shapes_for(
+    envelope: Dict[str, Any],
+    shapes: Optional[Mapping[str, Optional[str]]] = None,
+    registry: Optional[SchemaRegistry] = None,
+) -> Optional[str]:
+    """
+    Returns the shapes file for an envelope, from the given action mapping or,
+    without one, from the registry's dispatch by schema URI and action.
+
+    Raises:
+        KeyError: If the action is not handled.
+    """
+    if shapes is not None:
+        return shapes[envelope.get("action")]
+    return (registry or default_registry).shapes_for(envelope.get("action"), envelope.get("schema"))
+
+
+def schema_stage(
+    envelope: Dict[str, Any],
+    shapes: Optional[Mapping[str, Optional[str]]] = None,
+    schema_filename: str = "envelope.json",
+    registry: Optional[SchemaRegistry] = None,
+) -> Optional[PCLError]:
+    """Checks the envelope against the JSON Schema, with one fault per violation, and that its action is handled."""
+    from jsonschema.exceptions import best_match
+
+    validator = (registry or default_registry).get_validator(schema_filename)
+    errors = list(validator.iter_errors(envelope))
+    if errors:
+        schema_id = validator.schema.get("$id")
+        best = best_match(iter(errors))
+        return PCLError.create(
+            "SCHEMA_MISMATCH",
+            f"JSON Schema: {best.message}",
+            faults=[_fault(error, schema_id) for error in errors[:MAX_FAULTS]],
+        )
+    try:
+        shapes_for(envelope, shapes, registry)
+    except KeyError:
+        return PCLError.create("UNSUPPORTED_ACTION", f"Action '{envelope.get('action')}' is not handled here")
+    return None
+
+
+def shacl_stage(
+    document: Dict[str, Any],
+    shape_filename: Optional[str],
+    fast: bool = True,
+    registry: Optional[SchemaRegistry] = None,
+    context_loader: Optional[ContextLoader] = None,
+) -> Optional[PCLError]:
+    """Checks the content subgraph against the SHACL shapes of its action, if it has any."""
+    if shape_filename is None:
+        return None
+    conforms, report = validate_semantics(
+        document, shape_filename, registry=registry, context_loader=context_loader, fast=fast, content_only=True
+    )
+    if conforms:
+        return None
+    return PCLError.create("SCHEMA_MISMATCH", str(report), details={"shapes": shape_filename})
+
+
+def reply_stage(
+    receiver_id: str,
+    envelope: Optional[Dict[str, Any]],
+    error: Optional[PCLError],
+    signer: Optional[Signer] = None,
+) -> Optional[PCLMessage]:
+    """
+    Builds the ack or nack crate for a message.
+
+    Returns:
+        The reply, or None when there is nobody to answer: the envelope could
+        not be read, or the message is itself an ack or nack.
+    """
+    if envelope is None or envelope.get("action") in ("ack", "nack"):
+        return None
+    try:
+        builder = PCLReplyBuilder(receiver_id, envelope)
+        if error is not None:
+            builder.reject(error)
+        if signer is not None:
+            builder.sign(signer)
+        return builder.build()
+    except (KeyError, TypeError, ValueError):
+        # sender or identifier unusable, the reply cannot be addressed
+        return None
+
+
+class ReceiverPipeline:
+    """
+    Receives messages for one PCL and answers each with an ack or nack.
+
+    Use it as an async context manager, or call start() and close():
+
+        async with ReceiverPipeline(receiver_id, signer, verifier) as pipeline:
+            result = await pipeline.receive(data)
+
+    Stage functions run in the given executor, or the loop's default thread
+    pool. hashlib, zlib and the Ed25519 checks release the GIL; for the pure
+    Python SHACL and schema checks, schema and shacl concurrency mainly
+    overlaps them with I/O.
+    """
+    def __init__(
+        self,
+        receiver_id: str,
+        signer: Optional[Signer] = None,
+        verifier: Union[Verifier, KeyResolver, Mapping[str, Verifier], None] = None,
+        shapes: Optional[Mapping[str, Optional[str]]] = None,
+        replay_guard: Optional[ReplayGuard] = None,
+        schema_filename: str = "envelope.json",
+        fast: bool = True,
+        concurrency: Optional[Mapping[str, int]] = None,
+        queue_size: int = 64,
+        executor: Any = None,
+        max_size: Optional[int] = None,
+        registry: Optional[SchemaRegistry] = None,
+        context_loader: Optional[ContextLoader] = None,
+    ):
+        """
+        Args:
+            receiver_id: ROR of this PCL. Messages addressed elsewhere are refused.
+            signer: Signs the replies. Replies are unsigned without one.
+            verifier: Verifier for every sender, a KeyResolver finding the
+                sender's key, or a mapping of sender to Verifier. Signatures
+                are not checked without one.
+            shapes: Shapes file per accepted action, None for no SHACL check.
+                Defaults to the registry's dispatch by schema URI and action.
+            replay_guard: Rejects replayed messages when given.
+            schema_filename: Schema file used for the envelope check.
+            fast: Use the compiled SHACL checks where the shapes allow it.
+            concurrency: Workers per stage, overriding DEFAULT_CONCURRENCY.
+            queue_size: Capacity of the queue in front of each stage.
+            executor: concurrent.futures executor for the stage functions.
+            max_size: Refuse payloads that expand beyond this many bytes.
+            registry: Registry holding compiled schemas and shapes.
+            context_loader: Resolves remote @context references.
+        """
+        unknown = set(concurrency or ()) - set(STAGES)
+        if unknown:
+            raise ValueError(f"Unknown stages: {', '.join(sorted(unknown))}")
+        self.concurrency = dict(DEFAULT_CONCURRENCY, **(concurrency or {}))
+        if min(self.concurrency.values()) < 1 or queue_size < 1:
+            raise ValueError("concurrency and queue_size must be at least 1")
+        self.receiver_id = receiver_id
+        self.signer = signer
+        self.verifier = verifier
+        self.shapes = None if shapes is None else dict(shapes)
+        self.replay_guard = replay_guard
+        self.schema_filename = schema_filename
+        self.fast = fast
+        self.queue_size = queue_size
+        self.executor = executor
+        self.max_size = max_size
+        self.registry = registry or default_registry
+        self.context_loader = context_loader
+        self._queues: Dict[str, asyncio.Queue] = {}
+        self._tasks: List[asyncio.Task] = []
+        self._started: Optional[float] = None
+        self._received = self._accepted = self._rejected = 0
+
+    async def __aenter__(self) -> "ReceiverPipeline":
+        await self.start()
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.close()
+
+    async def start(self):
+        """Starts the stage workers on the running loop."""
+        if self._tasks:
+            return
+        # compile before the first message instead of inside a worker
+        shape_files = self.registry.dispatched_shapes() if self.shapes is None else tuple(s for s in self.shapes.values() if s)
+        await self._call(self.registry.preload, (self.schema_filename,), shape_files)
+        self._queues = {stage: asyncio.Queue(self.queue_size) for stage in STAGES}
+        for stage in STAGES:
+            for _ in range(self.concurrency[stage]):
+                self._tasks.append(asyncio.ensure_future(self._worker(stage)))
+        self._started = time.monotonic()
+
+    async def close(self):
+        """Waits for the messages in flight, then stops the workers."""
+        # nothing to wait for if start() was never called
+        for queue in self._queues.values():
+            await queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def submit(self, data: Union[bytes, str, Dict[str, Any]]) -> "asyncio.Future[ReceiveResult]":
+        """
+        Queues a message, waiting while the pipeline is full.
+
+        Args:
+            data: The received bytes (identity, gzip or zstd), JSON text or document dict.
+
+        Returns:
+            A future resolving to the ReceiveResult.
+        """
+        if not self._tasks:
+            raise RuntimeError("Pipeline is not running, call start() first")
+        item = _Item(data, asyncio.get_running_loop().create_future())
+        self._received += 1
+        await self._queues["parse"].put(item)
+        return item.future
+
+    async def receive(self, data: Union[bytes, str, Dict[str, Any]]) -> ReceiveResult:
+        """Queues a message and waits for its result."""
+        return await (await self.submit(data))
+
+    def stats(self) -> PipelineStats:
+        done = self._accepted + self._rejected
+        elapsed = time.monotonic() - self._started if self._started is not None else 0.0
+        return PipelineStats(
+            received=self._received,
+            accepted=self._accepted,
+            rejected=self._rejected,
+            in_flight=self._received - done,
+            messages_per_second=done / elapsed if elapsed > 0 else 0.0,
+            queue_depths={stage: queue.qsize() for stage, queue in self._queues.items()},
+        )
+
+    def _call(self, fn: Callable, *args, **kwargs):
+        return asyncio.get_running_loop().run_in_executor(self.executor, functools.partial(fn, *args, **kwargs))
+
+    async def _run(self, stage: str, item: _Item):
+        if stage == "parse":
+            item.document, item.envelope, item.error = await self._call(parse_stage, item.data, self.max_size)
+            item.data = None
+        elif stage == "verify":
+            item.error = await self._call(
+                verify_stage, item.envelope, self.receiver_id, self.verifier, self.replay_guard
+            )
+        elif stage == "schema":
+            item.error = await self._call(
+                schema_stage, item.envelope, self.shapes, self.schema_filename, self.registry
+            )
+        elif stage == "shacl":
+            item.error = await self._call(
+                shacl_stage, item.document, shapes_for(item.envelope, self.shapes, self.registry),
+                self.fast, self.registry, self.context_loader,
+            )
+
+    async def _worker(self, stage: str):
+        queue = self._queues[stage]
+        next_stage = STAGES[STAGES.index(stage) + 1] if stage != "reply" else None
+        while True:
+            item = await queue.get()
+            try:
+                if next_stage is None:
+                    await self._finish(item)
+                    continue
+                try:
+                    await self._run(stage, item)
+                except Exception as e:
+                    item.error = PCLError.create("INTERNAL_ERROR", f"{stage} stage failed: {e}")
+                # a rejected message skips the remaining checks
+                await self._queues["reply" if item.error is not None else next_stage].put(item)
+            finally:
+                queue.task_done()
+
+    async def _finish(self, item: _Item):
+        try:
+            reply = await self._call(reply_stage, self.receiver_id, item.envelope, item.error, self.signer)
+        except Exception:
+            reply = None
+        accepted = item.error is None
+        if accepted:
+            self._accepted += 1
+        else:
+            self._rejected += 1
+        identifier = item.envelope.get("identifier") if item.envelope is not None else None
+        if not item.future.done():
+            item.future.set_result(
+                ReceiveResult(accepted, identifier, item.error, reply, item.document if accepted else None)
+            )
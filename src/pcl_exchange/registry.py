@@ -0,0 +1,300 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Callable, Dict, Iterable, Optional, Tuple
+
+if TYPE_CHECKING:
+    import jsonschema
+    from rdflib import Graph
+
+DEFAULT_SCHEMAS = ("envelope.json", "error.json")
+DEFAULT_SHAPES = ("shapes/measurement_request.ttl", "shapes/workflow_launch.ttl")
+
+# shapes for the content of an envelope, looked up by its schema URI first and
+# then by its action; None means the content has no shapes to check
+SHAPES_BY_SCHEMA: Dict[str, Optional[str]] = {
+    "https://w3id.org/pcl-schema/measure-request/v1.0": "shapes/measurement_request.ttl",
+    "https://w3id.org/pcl-schema/register-data/v1.0": None,
+    "https://w3id.org/pcl-schema/reply/v1.0": None,
+}
+SHAPES_BY_ACTION: Dict[str, Optional[str]] = {
+    "request_measurement": "shapes/measurement_request.ttl",
+    "launch_workflow": "shapes/workflow_launch.ttl",
+    "register_data": None,
+    "ack": None,
+    "nack": None,
+}
+
+
+class _LRUCache:
+    """
+    Small thread-safe LRU mapping used by the registry.
+    """
+    def __init__(self, maxsize: int):
+        if maxsize < 1:
+            raise ValueError("maxsize must be at least 1")
+        self.maxsize = maxsize
+        self._data: "OrderedDict[str, object]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key: str, factory: Callable[[], object]):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                return self._data[key]
+
+        # build outside the lock, parsing a shapes file can take a while
+        value = factory()
+
+        with self._lock:
+            if key in self._data:
+                # another thread won the race, keep its value
+                self._data.move_to_end(key)
+                return self._data[key]
+            self._data[key] = value
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+            return value
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._data
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._data)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class SchemaRegistry:
+    """
+    Caches compiled JSON Schema validators and parsed SHACL shapes graphs.
+
+    Each schema file is read and compiled once into a reusable validator, and
+    each shapes file is parsed once into an rdflib Graph. Both caches are
+    bounded and evict the least recently used entry when full.
+
+    The registry also knows which shapes file applies to an envelope, by its
+    schema URI or its action, see shapes_for() and register_shapes().
+
+    The cached shapes graphs are shared between callers and must be treated
+    as read-only. Callers that modify a shapes graph, such as pyshacl, take
+    a per-thread copy from get_thread_shapes().
+    """
+    def __init__(
+        self,
+        max_schemas: int = 16,
+        max_shapes: int = 16,
+        loader: Optional[Callable[[str], str]] = None,
+    ):
+        """
+        Args:
+            max_schemas: Maximum number of compiled JSON Schema validators to keep.
+            max_shapes: Maximum number of parsed shapes graphs to keep.
+            loader: Callable returning the text of a schema file. Defaults to
+                reading from the package resources.
+        """
+        self._validators = _LRUCache(max_schemas)
+        self._shapes = _LRUCache(max_shapes)
+        self._compiled = _LRUCache(max_shapes)
+        self._closures = _LRUCache(max_shapes)
+        self._local = threading.local()
+        self._versions = _LRUCache(max_schemas + max_shapes)
+        self._loader = loader
+        self._shapes_by_schema = dict(SHAPES_BY_SCHEMA)
+        self._shapes_by_action = dict(SHAPES_BY_ACTION)
+
+    def _read(self, filename: str) -> str:
+        if self._loader is not None:
+            return self._loader(filename)
+        from .validation import get_schema_text
+        return get_schema_text(filename)
+
+    def _compile_schema(self, filename: str) -> "jsonschema.protocols.Validator":
+        # imported here so that loading the package does not load jsonschema
+        import jsonschema
+
+        schema_dict = json.loads(self._read(filename))
+        validator_cls = jsonschema.validators.validator_for(
+            schema_dict, default=jsonschema.Draft202012Validator
+        )
+        validator_cls.check_schema(schema_dict)
+        return validator_cls(schema_dict)
+
+    def _parse_shapes(self, filename: str) -> "Graph":
+        from rdflib import Graph
+
+        shape_graph = Graph()
+        fmt = "json-ld" if filename.endswith(".json") else "turtle"
+        shape_graph.parse(data=self._read(filename), format=fmt)
+        return shape_graph
+
+    def version(self, filename: str) -> str:
+        """
+        Returns a digest of a schema or shapes file's text, which changes
+        whenever the file does. Results cached against a file use it.
+        """
+        return self._versions.get_or_create(
+            filename, lambda: hashlib.sha256(self._read(filename).encode("utf-8")).hexdigest()[:16]
+        )
+
+    def get_validator(self, schema_filename: str) -> "jsonschema.protocols.Validator":
+        """
+        Returns the compiled validator for a schema, compiling it on first use.
+        """
+        return self._validators.get_or_create(
+            schema_filename, lambda: self._compile_schema(schema_filename)
+        )
+
+    def get_shapes(self, shape_filename: str) -> "Graph":
+        """
+        Returns the parsed shapes graph for a shapes file, parsing it on first use.
+        """
+        return self._shapes.get_or_create(
+            shape_filename, lambda: self._parse_shapes(shape_filename)
+        )
+
+    def get_thread_shapes(self, shape_filename: str) -> "Graph":
+        """
+        Returns the calling thread's own copy of a shapes graph, copied once
+        from the shared parsed graph. pyshacl adds its system triples to the
+        shapes graph it is given, so validation runs on this copy.
+        """
+        shared = self.get_shapes(shape_filename)
+        copies = getattr(self._local, "shapes", None)
+        if copies is None:
+            copies = self._local.shapes = {}
+        entry = copies.get(shape_filename)
+        if entry is None or entry[0] is not shared:
+            # first use in this thread, or the shared graph was evicted and parsed again
+            from rdflib import Graph
+
+            copy = Graph(bind_namespaces="none")
+            for prefix, namespace in shared.namespaces():
+                # the prefixes show up in pyshacl's reports
+                copy.bind(prefix, namespace)
+            copy += shared
+            copies.pop(shape_filename, None)
+            entry = copies[shape_filename] = (shared, copy)
+            while len(copies) > self._shapes.maxsize:
+                copies.pop(next(iter(copies)))
+        return entry[1]
+
+    def get_compiled_shapes(self, shape_filename: str):
+        """
+        Returns the fast-path checks compiled from a shapes file, or None if the
+        shapes use features the fast path does not support.
+        """
+        def compile_or_none():
+            from .shacl import UnsupportedShapeError, compile_shapes
+            try:
+                return compile_shapes(self.get_shapes(shape_filename))
+            except UnsupportedShapeError:
+                return None
+
+        return self._compiled.get_or_create(shape_filename, compile_or_none)
+
+    def get_closure(self, shape_filename: str):
+        """
+        Returns the RDFS closure precomputed from a shapes file's vocabulary, or
+        None if the shapes need a full rdfs inference run.
+        """
+        def compute():
+            from .shacl import compute_closure
+            return compute_closure(self.get_shapes(shape_filename))
+
+        return self._closures.get_or_create(shape_filename, compute)
+
+    def register_shapes(
+        self,
+        shape_filename: Optional[str],
+        action: Optional[str] = None,
+        schema: Optional[str] = None,
+    ):
+        """
+        Dispatches envelopes with the given action or schema URI to a shapes file.
+
+        Args:
+            shape_filename: Shapes file relative to the schemas package, or None
+                to accept the content without a SHACL check.
+            action: Envelope action using these shapes.
+            schema: Envelope schema URI using these shapes. Takes precedence
+                over the action when both are registered.
+        """
+        if action is None and schema is None:
+            raise ValueError("Give an action, a schema URI, or both")
+        if schema is not None:
+            self._shapes_by_schema[schema] = shape_filename
+        if action is not None:
+            self._shapes_by_action[action] = shape_filename
+
+    def shapes_for(self, action: Optional[str] = None, schema: Optional[str] = None) -> Optional[str]:
+        """
+        Returns the shapes file for an envelope's schema URI or action.
+
+        Returns:
+            The shapes filename, or None if the content has no shapes to check.
+
+        Raises:
+            KeyError: If neither the schema URI nor the action is registered.
+        """
+        if schema in self._shapes_by_schema:
+            return self._shapes_by_schema[schema]
+        if action in self._shapes_by_action:
+            return self._shapes_by_action[action]
+        raise KeyError(f"No shapes registered for action '{action}' or schema '{schema}'")
+
+    def dispatched_shapes(self) -> Tuple[str, ...]:
+        """Every shapes file an envelope can be dispatched to."""
+        files = list(self._shapes_by_schema.values()) + list(self._shapes_by_action.values())
+        return tuple(dict.fromkeys(f for f in files if f is not None))
+
+    def dispatch_version(self) -> str:
+        """Like version(), over the dispatch tables and every shapes file they name."""
+        tables = repr((sorted(self._shapes_by_schema.items()), sorted(self._shapes_by_action.items())))
+        versions = [self.version(filename) for filename in self.dispatched_shapes()]
+        return hashlib.sha256("\n".join([tables] + versions).encode("utf-8")).hexdigest()[:16]
+
+    def preload(
+        self,
+        schemas: Iterable[str] = DEFAULT_SCHEMAS,
+        shapes: Iterable[str] = DEFAULT_SHAPES,
+    ) -> "SchemaRegistry":
+        """
+        Compiles the given schemas and parses the given shapes files up front,
+        so the first validation does not pay for it.
+        """
+        for filename in schemas:
+            self.get_validator(filename)
+        for filename in shapes:
+            self.get_shapes(filename)
+            self.get_compiled_shapes(filename)
+        return self
+
+    def clear(self):
+        """Drops every cached validator and shapes graph."""
+        self._validators.clear()
+        self._shapes.clear()
+        self._compiled.clear()
+        self._closures.clear()
+        self._versions.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {"schemas": len(self._validators), "shapes": len(self._shapes)}
+
+
+default_registry = SchemaRegistry()
+
+
+def preload(
+    schemas: Iterable[str] = DEFAULT_SCHEMAS,
+    shapes: Iterable[str] = DEFAULT_SHAPES,
+) -> SchemaRegistry:
+    """
+    Warms up the default registry used by validate_structure and validate_semantics.
+    """
+    return default_registry.preload(schemas, shapes)
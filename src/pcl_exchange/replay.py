@@ -0,0 +1,232 @@
+"""
+Replay protection for received envelopes.
+
+An envelope is accepted once: its (sender, identifier) pair must not have
+been seen before, and its dateCreated must fall inside the accepted window.
+Because older envelopes are rejected on their timestamp alone, identifiers
+only need to be remembered for the length of that window. They are kept in
+time buckets keyed by dateCreated, and whole buckets are dropped as they
+age out.
+"""
+import math
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+
+class ReplayResult(NamedTuple):
+    """Outcome of checking one envelope, reason is None when accepted."""
+    accepted: bool
+    reason: Optional[str] = None
+
+
+def _timestamp(value: Any) -> float:
+    if isinstance(value, str):
+        # fromisoformat only accepts "Z" from Python 3.11 on
+        value = datetime.fromisoformat(value[:-1] + "+00:00" if value.endswith("Z") else value)
+    if not isinstance(value, datetime):
+        raise ValueError(f"dateCreated must be a datetime or ISO 8601 string, got {type(value).__name__}")
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+def _envelope_fields(envelope: Any) -> Tuple[Any, Any, Any]:
+    if isinstance(envelope, dict) and "@graph" in envelope:
+        from .wire import find_nodes
+
+        envelope = find_nodes(envelope)[0] or {}
+    elif hasattr(envelope, "envelope"):
+        # LazyPCLMessage
+        envelope = envelope.envelope
+    elif hasattr(envelope, "graph"):
+        from .models import PCLEnvelope
+
+        envelope = next((n for n in envelope.graph if isinstance(n, PCLEnvelope)), {})
+    if isinstance(envelope, dict):
+        return envelope.get("sender"), envelope.get("identifier"), envelope.get("dateCreated")
+    return envelope.sender, envelope.identifier, envelope.date_created
+
+
+class SQLiteReplayStore:
+    """
+    Persists seen identifiers so a ReplayGuard survives restarts.
+
+    Writes are committed in batches; identifiers accepted since the last
+    commit are lost if the process dies, so a small batch_size trades
+    throughput for a shorter exposure window. flush() commits immediately.
+    """
+    def __init__(self, path: str, batch_size: int = 256):
+        """
+        Args:
+            path: SQLite database file, created if missing.
+            batch_size: Number of new identifiers per commit.
+        """
+        self.batch_size = max(1, batch_size)
+        self._pending = 0
+        self._connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=NORMAL")
+        self._connection.execute(
+            "CREATE TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY, bucket INTEGER NOT NULL)"
+        )
+        self._connection.execute("CREATE INDEX IF NOT EXISTS seen_bucket ON seen (bucket)")
+        self._connection.execute("BEGIN")
+
+    def load(self, min_bucket: int) -> Iterable[Tuple[str, int]]:
+        """Yields the (key, bucket) pairs still inside the window."""
+        return self._connection.execute("SELECT key, bucket FROM seen WHERE bucket >= ?", (min_bucket,))
+
+    def add(self, key: str, bucket: int):
+        self._connection.execute("INSERT OR IGNORE INTO seen (key, bucket) VALUES (?, ?)", (key, bucket))
+        self._pending += 1
+        if self._pending >= self.batch_size:
+            self.flush()
+
+    def expire(self, min_bucket: int):
+        self._connection.execute("DELETE FROM seen WHERE bucket < ?", (min_bucket,))
+
+    def flush(self):
+        """Commits pending writes."""
+        self._connection.execute("COMMIT")
+        self._connection.execute("BEGIN")
+        self._pending = 0
+
+    def close(self):
+        self._connection.execute("COMMIT")
+        self._connection.close()
+
+
+class ReplayGuard:
+    """
+    Rejects envelopes that were seen before or whose dateCreated is outside
+    [now - max_age, now + max_skew].
+
+    Lookups and inserts are O(1) dict operations under one lock. Each
+    identifier is filed under the time bucket of its dateCreated, and
+    buckets that fall behind the window are dropped as a whole, so memory
+    is bounded by the traffic of one window. When max_entries identifiers
+    are held, new envelopes are rejected rather than forgetting live ones.
+    """
+    def __init__(
+        self,
+        max_age: float = 300.0,
+        max_skew: float = 30.0,
+        buckets: int = 16,
+        max_entries: int = 1_000_000,
+        store: Optional[SQLiteReplayStore] = None,
+        clock: Callable[[], float] = time.time,
+    ):
+        """
+        Args:
+            max_age: Seconds an envelope stays acceptable after its dateCreated.
+            max_skew: Seconds an envelope's dateCreated may lie in the future.
+            buckets: Number of time buckets the window is split into.
+            max_entries: Maximum number of identifiers held in memory.
+            store: Optional persistence layer, loaded on start and written through.
+            clock: Returns the current time as a Unix timestamp.
+        """
+        if max_age <= 0 or max_skew < 0:
+            raise ValueError("max_age must be positive and max_skew not negative")
+        self.max_age = max_age
+        self.max_skew = max_skew
+        self.max_entries = max_entries
+        self.bucket_seconds = (max_age + max_skew) / max(1, buckets)
+        self.store = store
+        self._clock = clock
+        self._lock = threading.Lock()
+        # key -> bucket, and bucket -> keys in that bucket
+        self._seen: Dict[str, int] = {}
+        self._buckets: "OrderedDict[int, List[str]]" = OrderedDict()
+        self._min_bucket = self._bucket(clock() - max_age)
+
+        if store is not None:
+            store.expire(self._min_bucket)
+            for key, bucket in store.load(self._min_bucket):
+                self._remember(key, bucket)
+
+    def _bucket(self, timestamp: float) -> int:
+        return math.floor(timestamp / self.bucket_seconds)
+
+    def _remember(self, key: str, bucket: int):
+        self._seen[key] = bucket
+        keys = self._buckets.get(bucket)
+        if keys is None:
+            newest = next(reversed(self._buckets), None)
+            keys = self._buckets[bucket] = []
+            if newest is not None and bucket < newest:
+                # buckets are kept in order so expiry can stop at the first live one
+                self._buckets = OrderedDict(sorted(self._buckets.items()))
+        keys.append(key)
+
+    def _expire(self, now: float):
+        min_bucket = self._bucket(now - self.max_age)
+        if min_bucket <= self._min_bucket:
+            return
+        self._min_bucket = min_bucket
+        while self._buckets:
+            bucket = next(iter(self._buckets))
+            if bucket >= min_bucket:
+                break
+            for key in self._buckets.pop(bucket):
+                if self._seen.get(key) == bucket:
+                    del self._seen[key]
+        if self.store is not None:
+            self.store.expire(min_bucket)
+
+    def check(self, envelope: Any, record: bool = True) -> ReplayResult:
+        """
+        Checks an envelope and, if accepted, remembers its identifier.
+
+        Args:
+            envelope: A PCLEnvelope or its JSON dict, or a whole message
+                (PCLMessage, LazyPCLMessage or JSON-LD document dict).
+            record: Remember the identifier. Pass False to only ask.
+
+        Returns:
+            ReplayResult(accepted, reason).
+        """
+        try:
+            sender, identifier, created = _envelope_fields(envelope)
+            created = _timestamp(created)
+        except (AttributeError, TypeError, ValueError) as e:
+            return ReplayResult(False, f"Cannot read identifier or dateCreated: {e}")
+        if not identifier:
+            return ReplayResult(False, "Envelope has no identifier.")
+
+        now = self._clock()
+        if created < now - self.max_age:
+            return ReplayResult(False, "dateCreated is older than the replay window.")
+        if created > now + self.max_skew:
+            return ReplayResult(False, "dateCreated is too far in the future.")
+
+        key = f"{sender}\n{identifier}"
+        with self._lock:
+            self._expire(now)
+            if key in self._seen:
+                return ReplayResult(False, "Envelope identifier was already seen.")
+            if record:
+                if len(self._seen) >= self.max_entries:
+                    return ReplayResult(False, "Replay cache is full.")
+                bucket = self._bucket(created)
+                self._remember(key, bucket)
+                if self.store is not None:
+                    self.store.add(key, bucket)
+        return ReplayResult(True)
+
+    def __len__(self) -> int:
+        return len(self._seen)
+
+    def flush(self):
+        """Commits pending writes to the store, if there is one."""
+        if self.store is not None:
+            with self._lock:
+                self.store.flush()
+
+    def close(self):
+        if self.store is not None:
+            with self._lock:
+                self.store.close()
@@ -0,0 +1,518 @@
+import re
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from rdflib import BNode, Graph, Literal, URIRef
+from rdflib.namespace import RDF, RDFS, XSD, Namespace
+
+SH = Namespace("http://www.w3.org/ns/shacl#")
+
+# predicates whose presence in the data graph would make RDFS inference matter
+_RDFS_VOCABULARY = {RDFS.subClassOf, RDFS.subPropertyOf, RDFS.domain, RDFS.range}
+
+_NODE_SHAPE_KEYS = {
+    RDF.type, SH.targetClass, SH.property, SH.message, SH.severity, SH.name,
+    SH.description, RDFS.label, RDFS.comment,
+}
+_PROPERTY_SHAPE_KEYS = {
+    RDF.type, SH.path, SH.minCount, SH.maxCount, SH.nodeKind, SH.datatype,
+    SH.pattern, SH.node, SH.message, SH.severity, SH.name, SH.description,
+    SH.order, SH.group,
+}
+_TARGET_KEYS = {SH.targetNode, SH.targetSubjectsOf, SH.targetObjectsOf, SH.target}
+_ADVANCED_KEYS = {SH.rule, SH.sparql, SH.deactivated, SH.shapesGraph}
+
+_NODE_KINDS = {
+    SH.IRI: (URIRef,),
+    SH.BlankNode: (BNode,),
+    SH.Literal: (Literal,),
+    SH.BlankNodeOrIRI: (BNode, URIRef),
+    SH.BlankNodeOrLiteral: (BNode, Literal),
+    SH.IRIOrLiteral: (URIRef, Literal),
+}
+
+
+class UnsupportedShapeError(ValueError):
+    """Raised when a shapes graph uses SHACL features the fast path does not compile."""
+
+
+class ValidationResult(NamedTuple):
+    component: URIRef
+    focus_node: Any
+    result_path: Optional[URIRef]
+    value: Any
+    source_shape: Any
+    severity: URIRef
+    messages: Tuple[str, ...]
+    details: Tuple["ValidationResult", ...] = ()
+
+
+class _NodeIndex:
+    """
+    Subject -> predicate -> objects index over the data triples.
+    """
+    def __init__(self, triples: Iterable[Tuple[Any, Any, Any]]):
+        self.out: Dict[Any, Dict[Any, Set[Any]]] = {}
+        self.instances: Dict[Any, Set[Any]] = {}
+        self.uses_rdfs = False
+        for s, p, o in triples:
+            self.out.setdefault(s, {}).setdefault(p, set()).add(o)
+            if p == RDF.type:
+                self.instances.setdefault(o, set()).add(s)
+            elif p in _RDFS_VOCABULARY:
+                self.uses_rdfs = True
+
+    def values(self, node, path) -> Set[Any]:
+        return self.out.get(node, {}).get(path, set())
+
+
+def _literal_text(node: Literal) -> str:
+    if node.language:
+        return f'Literal("{node}", lang={node.language})'
+    if node.datatype is not None:
+        datatype = str(node.datatype)
+        if datatype.startswith(str(XSD)):
+            datatype = "xsd:" + datatype[len(str(XSD)):]
+        else:
+            datatype = f"<{datatype}>"
+        return f'Literal("{node}", datatype={datatype})'
+    return f'Literal("{node}")'
+
+
+def _node_text(index: _NodeIndex, node) -> str:
+    """Renders a data node the way pyshacl reports do."""
+    if isinstance(node, Literal):
+        return _literal_text(node)
+    if isinstance(node, URIRef):
+        return f"<{node}>"
+    # rdfs inference types every node as rdfs:Resource, pyshacl shows that too
+    edges = dict(index.out.get(node, {}))
+    edges[RDF.type] = edges.get(RDF.type, set()) | {RDFS.Resource}
+    parts = []
+    for predicate, objects in sorted(edges.items(), key=lambda i: str(i[0])):
+        key = "rdf:type" if predicate == RDF.type else f"<{predicate}>"
+        rendered = sorted(
+            _literal_text(o) if isinstance(o, Literal)
+            else "rdfs:Resource" if o == RDFS.Resource
+            else f"<{o}>" if isinstance(o, URIRef)
+            else "[ ]"
+            for o in objects
+        )
+        parts.append(f"{key} {', '.join(rendered)}")
+    return "[ " + " ; ".join(parts) + " ]"
+
+
+def _datatype_matches(value, datatype) -> bool:
+    # mirrors pyshacl's DatatypeConstraintComponent
+    if not isinstance(value, Literal):
+        return False
+    if value.datatype == datatype:
+        if getattr(value, "ill_typed", None) is True:
+            return False
+        return _python_type_matches(value, datatype)
+    if datatype == RDFS.Literal:
+        return True
+    if datatype == RDFS.Datatype and value.datatype:
+        return True
+    if value.datatype is None and value.language is None and datatype == XSD.string:
+        return _python_type_matches(value, datatype)
+    if datatype == RDF.langString and value.language:
+        return _python_type_matches(value, datatype)
+    return False
+
+
+def _python_type_matches(value: Literal, datatype) -> bool:
+    checks = {
+        XSD.string: (str, bytes),
+        RDF.langString: (str, bytes),
+        XSD.integer: int,
+        XSD.boolean: bool,
+    }
+    expected = checks.get(datatype)
+    if expected is None:
+        return True
+    return isinstance(value.value, expected)
+
+
+def _pattern_text(value) -> str:
+    if isinstance(value, Literal):
+        if value.value is not None and value.datatype in (None, RDF.langString, XSD.string):
+            return str(value.value)
+    return str(value)
+
+
+class _PropertyShape:
+    def __init__(self, node, path, severity, messages, text, path_text):
+        self.node = node
+        self.path = path
+        self.severity = severity
+        self.messages = messages
+        self.text = text
+        self.path_text = path_text
+        self.min_count: Optional[int] = None
+        self.max_count: Optional[int] = None
+        self.node_kind = None
+        self.node_kind_text = ""
+        self.datatype = None
+        self.datatype_text = ""
+        self.pattern: Optional[re.Pattern] = None
+        self.node_shapes: List["_NodeShape"] = []
+
+
+class _NodeShape:
+    def __init__(self, node, text):
+        self.node = node
+        self.text = text
+        self.target_classes: List[Any] = []
+        self.properties: List[_PropertyShape] = []
+
+
+class CompiledShapes:
+    """
+    Plain Python checks compiled from a SHACL shapes graph.
+
+    Supports node shapes targeting classes with property shapes using
+    sh:minCount, sh:maxCount, sh:nodeKind, sh:datatype, sh:pattern and sh:node
+    over simple predicate paths. Anything else raises UnsupportedShapeError
+    at compile time so callers can fall back to pyshacl.
+    """
+    def __init__(self, shape_graph: Graph):
+        from pyshacl.rdfutil import stringify_node
+
+        self._graph = shape_graph
+        self._stringify = lambda node: stringify_node(shape_graph, node)
+        self._compiled: Dict[Any, _NodeShape] = {}
+        self._compiling: Set[Any] = set()
+
+        for predicate in _ADVANCED_KEYS | _TARGET_KEYS:
+            if (None, predicate, None) in shape_graph:
+                raise UnsupportedShapeError(f"{predicate} is not supported by the fast path")
+
+        self.shapes = [
+            self._compile_node_shape(node)
+            for node in sorted(set(shape_graph.subjects(SH.targetClass, None)), key=str)
+        ]
+
+    def _objects(self, node, predicate) -> List[Any]:
+        return list(self._graph.objects(node, predicate))
+
+    def _single(self, node, predicate):
+        values = self._objects(node, predicate)
+        if len(values) > 1:
+            raise UnsupportedShapeError(f"multiple {predicate} on {node}")
+        return values[0] if values else None
+
+    def _compile_node_shape(self, node) -> _NodeShape:
+        if node in self._compiled:
+            return self._compiled[node]
+        if node in self._compiling:
+            raise UnsupportedShapeError(f"recursive shape {node}")
+        self._compiling.add(node)
+
+        for predicate in set(self._graph.predicates(node, None)):
+            if predicate not in _NODE_SHAPE_KEYS:
+                raise UnsupportedShapeError(f"{predicate} on node shape {node}")
+        if (node, SH.path, None) in self._graph:
+            raise UnsupportedShapeError(f"targeted property shape {node}")
+        if (node, RDF.type, RDFS.Class) in self._graph:
+            raise UnsupportedShapeError(f"implicit class target on {node}")
+
+        shape = _NodeShape(node, self._stringify(node))
+        for target in self._objects(node, SH.targetClass):
+            if str(target).startswith((str(RDF), str(RDFS))):
+                raise UnsupportedShapeError(f"RDFS-inferred target class {target}")
+            shape.target_classes.append(target)
+        for prop in sorted(self._objects(node, SH.property), key=str):
+            shape.properties.append(self._compile_property_shape(prop))
+
+        self._compiling.discard(node)
+        self._compiled[node] = shape
+        return shape
+
+    def _compile_property_shape(self, node) -> _PropertyShape:
+        for predicate in set(self._graph.predicates(node, None)):
+            if predicate not in _PROPERTY_SHAPE_KEYS:
+                raise UnsupportedShapeError(f"{predicate} on property shape {node}")
+
+        path = self._single(node, SH.path)
+        if not isinstance(path, URIRef):
+            raise UnsupportedShapeError(f"complex path on {node}")
+
+        shape = _PropertyShape(
+            node,
+            path,
+            self._single(node, SH.severity) or SH.Violation,
+            [str(m) for m in self._objects(node, SH.message)],
+            self._stringify(node),
+            self._stringify(path),
+        )
+
+        min_count = self._single(node, SH.minCount)
+        if min_count is not None:
+            shape.min_count = int(min_count)
+        max_count = self._single(node, SH.maxCount)
+        if max_count is not None:
+            shape.max_count = int(max_count)
+
+        node_kind = self._single(node, SH.nodeKind)
+        if node_kind is not None:
+            if node_kind not in _NODE_KINDS:
+                raise UnsupportedShapeError(f"unknown node kind {node_kind}")
+            shape.node_kind = node_kind
+            shape.node_kind_text = self._stringify(node_kind)
+
+        datatype = self._single(node, SH.datatype)
+        if datatype is not None:
+            shape.datatype = datatype
+            shape.datatype_text = self._stringify(datatype)
+
+        pattern = self._single(node, SH.pattern)
+        if pattern is not None:
+            shape.pattern = re.compile(str(pattern))
+
+        for ref in self._objects(node, SH.node):
+            shape.node_shapes.append(self._compile_node_shape(ref))
+        return shape
+
+    def _check_node(self, index: _NodeIndex, shape: _NodeShape, focus) -> List[ValidationResult]:
+        results: List[ValidationResult] = []
+        for prop in shape.properties:
+            results.extend(self._check_property(index, prop, focus))
+        return results
+
+    def _result(self, prop, component, focus, value, generic, details=()):
+        return ValidationResult(
+            component=component,
+            focus_node=focus,
+            result_path=prop.path,
+            value=value,
+            source_shape=prop.node,
+            severity=prop.severity,
+            messages=tuple(prop.messages) or (generic,),
+            details=tuple(details),
+        )
+
+    def _check_property(self, index: _NodeIndex, prop: _PropertyShape, focus) -> List[ValidationResult]:
+        results: List[ValidationResult] = []
+        values = index.values(focus, prop.path)
+
+        if prop.min_count is not None and len(values) < prop.min_count:
+            generic = f"Less than {prop.min_count} values on {_node_text(index, focus)}->{prop.path_text}"
+            results.append(self._result(prop, SH.MinCountConstraintComponent, focus, None, generic))
+        if prop.max_count is not None and len(values) > prop.max_count:
+            generic = f"More than {prop.max_count} values on {_node_text(index, focus)}->{prop.path_text}"
+            results.append(self._result(prop, SH.MaxCountConstraintComponent, focus, None, generic))
+
+        for value in values:
+            if prop.node_kind is not None and not isinstance(value, _NODE_KINDS[prop.node_kind]):
+                generic = f"Value is not of Node Kind {prop.node_kind_text}"
+                results.append(self._result(prop, SH.NodeKindConstraintComponent, focus, value, generic))
+            if prop.datatype is not None and not _datatype_matches(value, prop.datatype):
+                generic = f"Value is not Literal with datatype {prop.datatype_text}"
+                results.append(self._result(prop, SH.DatatypeConstraintComponent, focus, value, generic))
+            if prop.pattern is not None and (
+                isinstance(value, BNode) or not prop.pattern.search(_pattern_text(value))
+            ):
+                generic = f"Value does not match pattern '{prop.pattern.pattern}'"
+                results.append(self._result(prop, SH.PatternConstraintComponent, focus, value, generic))
+            for node_shape in prop.node_shapes:
+                details = self._check_node(index, node_shape, value)
+                if details:
+                    generic = (
+                        f"Value does not conform to Shape {node_shape.text}."
+                        " See details for more information."
+                    )
+                    results.append(
+                        self._result(prop, SH.NodeConstraintComponent, focus, value, generic, details)
+                    )
+        return results
+
+    def results(self, triples: Iterable[Tuple[Any, Any, Any]]) -> Optional[List[ValidationResult]]:
+        """
+        Checks the data triples against the compiled shapes.
+
+        Returns:
+            The list of validation results, or None if the data carries RDFS
+            vocabulary that would change the outcome under inference.
+        """
+        index = triples if isinstance(triples, _NodeIndex) else _NodeIndex(triples)
+        if index.uses_rdfs:
+            return None
+        results: List[ValidationResult] = []
+        for shape in self.shapes:
+            focus_nodes = set()
+            for target in shape.target_classes:
+                focus_nodes |= index.instances.get(target, set())
+            for focus in focus_nodes:
+                results.extend(self._check_node(index, shape, focus))
+        return results
+
+    def _describe(self, index: _NodeIndex, result: ValidationResult, indent: str = "") -> str:
+        prop_text = self._stringify(result.source_shape)
+        severity = self._stringify(result.severity)
+        component = str(result.component)
+        name = component[len(str(SH)):] if component.startswith(str(SH)) else component
+        lines = [
+            f"Constraint Violation in {name} ({component}):"
+            if result.severity == SH.Violation
+            else f"Validation Result in {name} ({component}):",
+            f"\tSeverity: {severity}",
+            f"\tSource Shape: {prop_text}",
+            f"\tFocus Node: {_node_text(index, result.focus_node)}",
+        ]
+        if result.value is not None:
+            lines.append(f"\tValue Node: {_node_text(index, result.value)}")
+        if result.result_path is not None:
+            lines.append(f"\tResult Path: {self._stringify(result.result_path)}")
+        for message in sorted(result.messages):
+            lines.append(f"\tMessage: {message}")
+        text = "".join(f"{indent}{line}\n" for line in lines)
+        if result.details:
+            text += f"{indent}\tDetails:\n"
+            for detail in sorted(self._describe(index, d, indent + "\t\t") for d in result.details):
+                text += detail
+        return text
+
+    def validate(self, triples: Iterable[Tuple[Any, Any, Any]]) -> Optional[Tuple[bool, str]]:
+        """
+        Validates the data triples and renders a pyshacl style text report.
+
+        Returns:
+            (conforms, report_text), or None if the caller should fall back to pyshacl.
+        """
+        index = _NodeIndex(triples)
+        results = self.results(index)
+        if results is None:
+            return None
+        conforms = not results
+        text = f"Validation Report\nConforms: {conforms}\n"
+        if results:
+            text += f"Results ({len(results)}):\n"
+            text += "".join(sorted(self._describe(index, r) for r in results))
+        return conforms, text
+
+
+def compile_shapes(shape_graph: Graph) -> CompiledShapes:
+    """
+    Compiles a shapes graph into plain Python checks.
+
+    Raises:
+        UnsupportedShapeError: If the shapes use features outside the fast path.
+    """
+    return CompiledShapes(shape_graph)
+
+
+def _transitive(pairs: Iterable[Tuple[Any, Any]]) -> Dict[Any, Set[Any]]:
+    """Maps each node to everything reachable from it over the pairs, itself excluded."""
+    direct: Dict[Any, Set[Any]] = {}
+    for child, parent in pairs:
+        if child != parent:
+            direct.setdefault(child, set()).add(parent)
+    closure = {}
+    for start in direct:
+        seen: Set[Any] = set()
+        stack = list(direct[start])
+        while stack:
+            node = stack.pop()
+            if node not in seen and node != start:
+                seen.add(node)
+                stack.extend(direct.get(node, ()))
+        closure[start] = seen
+    return closure
+
+
+class RDFSClosure:
+    """
+    The RDFS entailments of a fixed vocabulary, computed once per shapes graph.
+
+    pyshacl's rdfs inference re-materializes the subclass, subproperty,
+    domain and range consequences for every data graph. Of everything it adds,
+    only rdf:type triples and values of super-properties can change a SHACL
+    result, so those are precomputed here as lookup tables and expand() adds
+    just them to the data. With no vocabulary in the shapes graph, expand()
+    returns the data unchanged and the rdfs run reduces to plain validation.
+    """
+    def __init__(self, vocabulary: Iterable[Tuple[Any, Any, Any]]):
+        vocabulary = list(vocabulary)
+        self.superclasses = _transitive((s, o) for s, p, o in vocabulary if p == RDFS.subClassOf)
+        self.superproperties = _transitive((s, o) for s, p, o in vocabulary if p == RDFS.subPropertyOf)
+
+        def with_superclasses(classes: Set[Any]) -> Set[Any]:
+            out = set(classes)
+            for cls in classes:
+                out |= self.superclasses.get(cls, set())
+            return out
+
+        # per property, the classes its subjects and objects get, through its super-properties too
+        declared_domains: Dict[Any, Set[Any]] = {}
+        declared_ranges: Dict[Any, Set[Any]] = {}
+        for s, p, o in vocabulary:
+            if p == RDFS.domain:
+                declared_domains.setdefault(s, set()).add(o)
+            elif p == RDFS.range:
+                declared_ranges.setdefault(s, set()).add(o)
+        self.domains: Dict[Any, Set[Any]] = {}
+        self.ranges: Dict[Any, Set[Any]] = {}
+        for prop in set(declared_domains) | set(declared_ranges) | set(self.superproperties):
+            props = {prop} | self.superproperties.get(prop, set())
+            domains = set().union(*(declared_domains.get(q, set()) for q in props))
+            ranges = set().union(*(declared_ranges.get(q, set()) for q in props))
+            if domains:
+                self.domains[prop] = with_superclasses(domains)
+            if ranges:
+                self.ranges[prop] = with_superclasses(ranges)
+
+    def __bool__(self) -> bool:
+        return bool(self.superclasses or self.superproperties or self.domains or self.ranges)
+
+    def expand(self, triples: Iterable[Tuple[Any, Any, Any]]) -> Optional[List[Tuple[Any, Any, Any]]]:
+        """
+        Adds the entailed types and super-property values to the data triples.
+
+        Returns:
+            The expanded triples, or None if the data carries RDFS vocabulary of
+            its own, which only a full rdfs inference run takes into account.
+        """
+        out = list(triples)
+        for _, p, _ in out:
+            if p in _RDFS_VOCABULARY:
+                return None
+        if not self:
+            return out
+
+        seen = set(out)
+        added: List[Tuple[Any, Any, Any]] = []
+
+        def add(triple):
+            if triple not in seen:
+                seen.add(triple)
+                added.append(triple)
+
+        for s, p, o in out:
+            if p == RDF.type:
+                for cls in self.superclasses.get(o, ()):
+                    add((s, RDF.type, cls))
+                continue
+            for prop in self.superproperties.get(p, ()):
+                add((s, prop, o))
+            for cls in self.domains.get(p, ()):
+                add((s, RDF.type, cls))
+            if not isinstance(o, Literal):
+                for cls in self.ranges.get(p, ()):
+                    add((o, RDF.type, cls))
+        return out + added
+
+
+def compute_closure(shape_graph: Graph) -> Optional[RDFSClosure]:
+    """
+    Precomputes the RDFS closure of the vocabulary declared in a shapes graph.
+
+    Returns:
+        The closure, or None when the shapes target RDF or RDFS classes
+        themselves (rdfs:Resource, rdfs:Class, ...), whose instances only a
+        full inference run derives.
+    """
+    for predicate in (SH.targetClass, SH["class"]):
+        for cls in shape_graph.objects(None, predicate):
+            if str(cls).startswith((str(RDF), str(RDFS))):
+                return None
+    return RDFSClosure(t for t in shape_graph if t[1] in _RDFS_VOCABULARY)
@@ -1,12 +1,26 @@
 import json
 import importlib.resources
-from typing import Union, Dict, Tuple, Optional
-
-from rdflib import Graph
-from pyshacl import validate
-import jsonschema
+import os
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from itertools import islice
+from typing import TYPE_CHECKING, Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 
 from . import schemas
+from .cache import ValidationCache, cache_key, message_digest
+from .contexts import ContextLoader, default_loader
+from .crypto import Verifier
+from .keys import KeyResolver
+from .metrics import span, timed
+from .models import PCLEnvelope, PCLMessage
+from .registry import DEFAULT_SCHEMAS, DEFAULT_SHAPES, SchemaRegistry, default_registry
+from .wire import ContentDigestError, check_content_digest, decompress, find_nodes
+
+# rdflib, pyshacl and jsonschema take most of a second to import, so they are
+# imported where first needed and processes that only build and sign never pay for them
+if TYPE_CHECKING:
+    from rdflib import Graph
+
+INFERENCE_MODES = ("rdfs", "closure", "none")
 
 def get_schema_text(filename: str) -> str:
     """
@@ -22,76 +36,536 @@ def get_schema_text(filename: str) -> str:
     except FileNotFoundError:
         raise FileNotFoundError(f"Schema file '{filename}' not found in package resources.")
 
-def validate_structure(data: Dict, schema_filename: str = "envelope.json") -> Tuple[bool, Optional[str]]:
+@timed("validate_structure")
+def validate_structure(
+    data: Dict,
+    schema_filename: str = "envelope.json",
+    registry: Optional[SchemaRegistry] = None,
+) -> Tuple[bool, Optional[str]]:
     """
     Validates the pure JSON structure against the JSON Schema.
 
     Args:
         data: The message as a dictionary.
         schema_filename: Path to the schema file relative to the schemas package.
+        registry: Registry holding compiled validators. Defaults to the shared one.
     
     Returns:
         (True, None) if valid
         (False, error_message) if invalid
     """
     try:
-        schema_str = get_schema_text(schema_filename)
-        schema_dict = json.loads(schema_str)
-        jsonschema.validate(instance=data, schema=schema_dict)
-        return True, None
-    except jsonschema.ValidationError as e:
-        return False, e.message
+        from jsonschema.exceptions import best_match
+
+        with span("validate_structure.schema_load"):
+            validator = (registry or default_registry).get_validator(schema_filename)
+        with span("validate_structure.validate"):
+            error = best_match(validator.iter_errors(data))
+        if error is None:
+            return True, None
+        return False, error.message
     except Exception as e:
         return False, str(e)
 
+def _dispatch_fields(data: Any) -> Tuple[Optional[str], Optional[str], Any]:
+    """Returns the action, schema URI and contentRef of the envelope in a crate."""
+    if isinstance(data, PCLMessage):
+        for node in data.graph:
+            if isinstance(node, PCLEnvelope):
+                return node.action, node.schema_, node.content_ref
+        return None, None, None
+    envelope, _ = find_nodes(data)
+    if envelope is None:
+        return None, None, None
+    return envelope.get("action"), envelope.get("schema"), envelope.get("contentRef")
+
+
+@timed("validate_semantics")
 def validate_semantics(
-    data: Union[str, Dict, Graph], 
-    shape_filename: str = "shapes/measurement_request.ttl"
+    data: Union[str, Dict, "Graph", PCLMessage], 
+    shape_filename: Optional[str] = "shapes/measurement_request.ttl",
+    registry: Optional[SchemaRegistry] = None,
+    context_loader: Optional[ContextLoader] = None,
+    fast: bool = False,
+    content_only: bool = False,
+    inference: str = "rdfs",
 ) -> Tuple[bool, str]:
     """
     Validates the RDF semantics using SHACL.
     
     Args:
-        data: The message as a Dict, JSON string, or existing RDFLib Graph.
-        shape_filename: Path to the .ttl file relative to the schemas package.
+        data: The message as a Dict, JSON string, PCLMessage, or existing RDFLib Graph.
+            A PCLMessage is converted to triples directly, skipping the JSON-LD parse.
+        shape_filename: Path to the .ttl file relative to the schemas package. With
+            None, the shapes are picked by the envelope's schema URI or action
+            (see SchemaRegistry.shapes_for) and only the content is validated.
+        registry: Registry holding parsed shapes graphs. Defaults to the shared one.
+        context_loader: Resolves remote @context references from bundled or
+            cached copies. Defaults to the shared loader.
+        fast: Check with plain Python predicates compiled from the shapes instead
+            of pyshacl. Falls back to pyshacl when the shapes or data need it.
+        content_only: Validate only the nodes reachable from the envelope's
+            contentRef, leaving the metadata, root and envelope nodes out of
+            the SHACL run and its RDFS inference.
+        inference: "rdfs" lets pyshacl run RDFS inference over the data graph.
+            "closure" adds only the entailments of the shapes vocabulary,
+            precomputed once per shapes file, then validates without inference;
+            data carrying RDFS vocabulary of its own still gets the full rdfs
+            run. "none" skips inference altogether.
     
     Returns:
         (True, None) if valid
         (False, error_message) if invalid
     """
+    from rdflib import Graph
+    from .rdf import CRATE_BASE, message_to_graph, reachable, triples
+
+    if inference not in INFERENCE_MODES:
+        raise ValueError(f"inference must be one of {', '.join(INFERENCE_MODES)}")
+    registry = registry or default_registry
+
+    if isinstance(data, (str, bytes)):
+        try:
+            data = json.loads(data)
+        except ValueError as e:
+            return False, f"JSON-LD Parsing Error: {str(e)}"
+
+    content_ref = None
+    if shape_filename is None or content_only:
+        action, schema, content_ref = _dispatch_fields(data)
+        if shape_filename is None:
+            if action is None and schema is None:
+                return False, "No PCLActionEnvelope found to pick the shapes from"
+            try:
+                shape_filename = registry.shapes_for(action, schema)
+            except KeyError as e:
+                return False, e.args[0]
+            if shape_filename is None:
+                # the action carries no content shapes
+                return True, None
+            content_only = True
+
+    # the triples to validate, once they have been narrowed to the content or expanded
+    subset = None
+    if (content_only and content_ref is not None) or inference == "closure":
+        with span("validate_semantics.parse"):
+            try:
+                data_triples = data if isinstance(data, Graph) else triples(data, context_loader=context_loader)
+            except Exception as e:
+                return False, f"JSON-LD Parsing Error: {str(e)}"
+            if content_only and content_ref is not None:
+                subset = reachable(data_triples, content_ref)
+
+    pyshacl_inference = inference
+    if inference == "closure":
+        with span("validate_semantics.closure"):
+            closure = registry.get_closure(shape_filename)
+            expanded = None if closure is None else closure.expand(subset if subset is not None else data_triples)
+        if expanded is None:
+            pyshacl_inference = "rdfs"
+        else:
+            subset = expanded
+            pyshacl_inference = "none"
+
+    if fast:
+        with span("validate_semantics.shapes_load"):
+            compiled = registry.get_compiled_shapes(shape_filename)
+        if compiled is not None:
+            try:
+                with span("validate_semantics.parse"):
+                    data_triples = subset if subset is not None else data if isinstance(data, Graph) else triples(
+                        data, context_loader=context_loader
+                    )
+            except Exception as e:
+                return False, f"JSON-LD Parsing Error: {str(e)}"
+            with span("validate_semantics.compiled"):
+                outcome = compiled.validate(data_triples)
+            if outcome is not None:
+                return outcome
+            if not isinstance(data_triples, Graph):
+                with span("validate_semantics.parse"):
+                    data = Graph()
+                    for triple in data_triples:
+                        data.add(triple)
+                subset = None
+
     # convert input data to RDFLib Graph
-    if isinstance(data, Graph):
+    if subset is not None:
+        with span("validate_semantics.parse"):
+            data_graph = Graph()
+            for triple in subset:
+                data_graph.add(triple)
+    elif isinstance(data, Graph):
         data_graph = data
+    elif isinstance(data, PCLMessage):
+        with span("validate_semantics.parse"):
+            data_graph = message_to_graph(data, context_loader=context_loader)
     else:
         data_graph = Graph()
-        if isinstance(data, dict):
-            payload = json.dumps(data)
-        else:
-            payload = data
-        
         try:
-            data_graph.parse(data=payload, format="json-ld")
+            # inline remote contexts so rdflib never fetches them
+            with span("validate_semantics.contexts"):
+                document = (context_loader or default_loader).resolve(data)
+            with span("validate_semantics.parse"):
+                data_graph.parse(data=json.dumps(document), format="json-ld", base=CRATE_BASE)
         except Exception as e:
             return False, f"JSON-LD Parsing Error: {str(e)}"
 
-    # load SHACL shapes
+    # load SHACL shapes, parsed once per registry and copied once per thread for pyshacl
     try:
-        shape_text = get_schema_text(shape_filename)
+        with span("validate_semantics.shapes_load"):
+            shape_graph = registry.get_thread_shapes(shape_filename)
     except FileNotFoundError as e:
         return False, str(e)
 
-    shape_graph = Graph()
-    # assume ttl
-    fmt = "json-ld" if shape_filename.endswith(".json") else "turtle"
-    shape_graph.parse(data=shape_text, format=fmt)
-
-    # run validation
-    is_valid, _, error_message = validate(
-        data_graph,
-        shacl_graph=shape_graph,
-        inference='rdfs',
-        abort_on_first=False,
-        advanced=True
-    )
+    # run validation, pyshacl does the RDFS inference inside this call unless it was precomputed
+    from pyshacl import validate
+
+    with span("validate_semantics.shacl"):
+        is_valid, _, error_message = validate(
+            data_graph,
+            shacl_graph=shape_graph,
+            inference=pyshacl_inference,
+            abort_on_first=False,
+            advanced=True
+        )
     
-    return is_valid, error_message
\ No newline at end of file
+    return is_valid, error_message
+
+def _envelope_node(document: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    if "@graph" not in document:
+        return document
+    for node in document["@graph"]:
+        if isinstance(node, dict) and node.get("@type") == "PCLActionEnvelope":
+            return node
+    return None
+
+
+@timed("validate_message")
+def validate_message(
+    data: Union[str, bytes, Dict, PCLMessage],
+    shape_filename: Optional[str] = "shapes/measurement_request.ttl",
+    schema_filename: str = "envelope.json",
+    structure: bool = True,
+    semantics: bool = True,
+    fast: bool = False,
+    inference: str = "rdfs",
+    verifier: Union[Verifier, KeyResolver, None] = None,
+    registry: Optional[SchemaRegistry] = None,
+    context_loader: Optional[ContextLoader] = None,
+    cache: Optional[ValidationCache] = None,
+) -> Tuple[bool, Optional[str]]:
+    """
+    Runs the checks on a full message: the content digest and JSON Schema on
+    the envelope node, the envelope signature if a verifier is given, then
+    SHACL on the crate.
+
+    Args:
+        data: The message as a Dict, JSON string or bytes, or PCLMessage.
+            Bytes may be gzip or zstd compressed.
+        shape_filename: Shapes file used for the SHACL check. None picks it by
+            the envelope's schema URI or action and validates only the content.
+        schema_filename: Schema file used for the envelope check.
+        structure: Run the JSON Schema check.
+        semantics: Run the SHACL check.
+        fast: Passed on to validate_semantics.
+        inference: Passed on to validate_semantics.
+        verifier: Verifier holding the sender's public key, or a KeyResolver
+            finding it by sender. Signatures are not checked without one. With
+            one, the envelope must carry a contentDigest binding the content.
+        registry: Registry holding compiled schemas and shapes. Defaults to the shared one.
+        context_loader: Resolves remote @context references. Defaults to the shared loader.
+        cache: Returns the verdict of an identical earlier message under the same
+            schema and shapes versions, options and verifier key, and records new ones.
+            With a KeyResolver, the sender's resolved keys stand in for the verifier key.
+
+    Returns:
+        (True, None) if valid
+        (False, error_message) if invalid
+    """
+    if isinstance(data, bytes):
+        try:
+            data, _ = decompress(data)
+        except (ImportError, ValueError) as e:
+            return False, f"Decoding Error: {str(e)}"
+
+    key = None
+    if cache is not None:
+        with span("validate_message.cache"):
+            key = _cache_key(
+                data, registry or default_registry, shape_filename, schema_filename,
+                structure, semantics, fast, inference, verifier,
+            )
+            verdict = cache.get(key) if key is not None else None
+        if verdict is not None:
+            return verdict
+        result = validate_message(
+            data, shape_filename, schema_filename, structure, semantics, fast, inference,
+            verifier, registry, context_loader,
+        )
+        if key is not None:
+            cache.put(key, result)
+        return result
+
+    if isinstance(data, (str, bytes)):
+        try:
+            data = json.loads(data)
+        except ValueError as e:
+            return False, f"JSON Parsing Error: {str(e)}"
+
+    if structure or verifier is not None:
+        document = data.model_dump(mode="json", by_alias=True) if isinstance(data, PCLMessage) else data
+        envelope = _envelope_node(document) if isinstance(document, dict) else None
+        if envelope is None:
+            return False, "No PCLActionEnvelope node found"
+        # cheaper than everything below, and catches content changed after signing
+        try:
+            with span("validate_message.digest"):
+                digested = check_content_digest(document)
+        except ContentDigestError as e:
+            return False, f"Content Digest: {str(e)}"
+        if verifier is not None and not digested:
+            return False, "Content Digest: Envelope has no contentDigest, the signature does not cover the content."
+        if structure:
+            valid, error = validate_structure(envelope, schema_filename, registry=registry)
+            if not valid:
+                return False, f"JSON Schema: {error}"
+        if verifier is not None and not verifier.verify(envelope):
+            return False, "Signature verification failed"
+
+    if semantics:
+        conforms, report = validate_semantics(
+            data, shape_filename, registry=registry, context_loader=context_loader, fast=fast,
+            inference=inference,
+        )
+        if not conforms:
+            return False, report
+
+    return True, None
+
+
+def _cache_key(
+    data: Any,
+    registry: SchemaRegistry,
+    shape_filename: Optional[str],
+    schema_filename: str,
+    structure: bool,
+    semantics: bool,
+    fast: bool,
+    inference: str,
+    verifier: Union[Verifier, KeyResolver, None],
+) -> Optional[str]:
+    """The ValidationCache key of a message and the settings it is checked with, None if it has none."""
+    if verifier is None:
+        key_id = "-"
+    elif isinstance(verifier, KeyResolver):
+        key_id = _resolved_key_id(data, verifier)
+    else:
+        key_id = verifier.key_id
+    if key_id is None:
+        # no keys for the sender, leave it to the signature check to report
+        return None
+    try:
+        parts = [
+            f"schema={schema_filename}@{registry.version(schema_filename)}" if structure else "schema=-",
+            f"fast={fast}",
+            f"inference={inference}",
+            f"key={key_id}",
+        ]
+        if not semantics:
+            parts.append("shapes=-")
+        elif shape_filename is None:
+            parts.append(f"shapes=dispatch@{registry.dispatch_version()}")
+        else:
+            parts.append(f"shapes={shape_filename}@{registry.version(shape_filename)}")
+        return cache_key(message_digest(data), parts)
+    except (FileNotFoundError, TypeError, ValueError):
+        # unreadable settings or message, leave it to the checks to report
+        return None
+
+
+def _resolved_key_id(data: Any, resolver: KeyResolver) -> Optional[str]:
+    """The identity of the keys a KeyResolver checks a message's signature with, None if unknown."""
+    if isinstance(data, PCLMessage):
+        envelope = next((node for node in data.graph if isinstance(node, PCLEnvelope)), None)
+    else:
+        if isinstance(data, (str, bytes)):
+            try:
+                data = json.loads(data)
+            except ValueError:
+                return None
+        envelope = _envelope_node(data) if isinstance(data, dict) else None
+    return resolver.key_identity(envelope) if envelope is not None else None
+
+
+def _init_worker(schema_files: Tuple[str, ...], shape_files: Tuple[str, ...]):
+    # compile everything once per process instead of once per chunk
+    default_registry.preload(schema_files, shape_files)
+
+
+def _validate_chunk(chunk: List[Any], options: Dict[str, Any]) -> List[Tuple[bool, Optional[str]]]:
+    results = []
+    for item in chunk:
+        try:
+            results.append(validate_message(item, **options))
+        except Exception as e:
+            results.append((False, str(e)))
+    return results
+
+
+def _lookup(item: Any, options: Dict[str, Any], cache: ValidationCache) -> Tuple[Any, Optional[str], Any]:
+    """Returns (item, key, cached verdict or None), with compressed bytes decoded for the digest."""
+    if isinstance(item, bytes):
+        try:
+            item, _ = decompress(item)
+        except (ImportError, ValueError):
+            # left for the worker to report
+            return item, None, None
+    key = _cache_key(item, default_registry, **options)
+    return item, key, cache.get(key) if key is not None else None
+
+
+def _chunks(items: Iterable[Any], size: int) -> Iterator[List[Any]]:
+    iterator = iter(items)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def validate_many(
+    items: Iterable[Union[str, bytes, Dict, PCLMessage]],
+    workers: Optional[int] = None,
+    chunksize: int = 8,
+    ordered: bool = True,
+    shape_filename: Optional[str] = "shapes/measurement_request.ttl",
+    schema_filename: str = "envelope.json",
+    structure: bool = True,
+    semantics: bool = True,
+    fast: bool = False,
+    inference: str = "rdfs",
+    verifier: Optional[Verifier] = None,
+    mp_context=None,
+    cache: Optional[ValidationCache] = None,
+) -> Iterator[Any]:
+    """
+    Validates many messages with validate_message across a pool of processes.
+
+    Messages are sent to the workers in chunks to keep the pickling overhead
+    low, and only a bounded number of chunks is in flight at once, so the
+    input can be a lazy stream. Each worker compiles the schemas and shapes
+    once when it starts.
+
+    Args:
+        items: Messages as Dicts, JSON strings or bytes, or PCLMessages.
+        workers: Number of processes. Defaults to os.cpu_count(). With 0 or 1
+            everything runs in the calling process.
+        chunksize: Number of messages sent to a worker at a time.
+        ordered: Yield results in input order. Otherwise results are yielded
+            as chunks complete, as (index, (ok, report)) pairs.
+        shape_filename: Shapes file used for the SHACL check. None picks it per
+            message, so mixed batches are checked against the right shapes.
+        schema_filename: Schema file used for the envelope check.
+        structure: Run the JSON Schema check.
+        semantics: Run the SHACL check.
+        fast: Use the compiled SHACL checks where the shapes allow it.
+        inference: RDFS inference mode, see validate_semantics.
+        verifier: Verifier for the envelope signatures, sent to each worker.
+        mp_context: Optional multiprocessing context for the pool.
+        cache: Consulted in the calling process, so only messages without a
+            cached verdict are sent to the workers, and their verdicts are recorded.
+
+    Yields:
+        (ok, report) per message, or (index, (ok, report)) if ordered is False.
+    """
+    if chunksize < 1:
+        raise ValueError("chunksize must be at least 1")
+    if workers is None:
+        workers = os.cpu_count() or 1
+    options = {
+        "shape_filename": shape_filename,
+        "schema_filename": schema_filename,
+        "structure": structure,
+        "semantics": semantics,
+        "fast": fast,
+        "inference": inference,
+        "verifier": verifier,
+    }
+    chunks = _chunks(items, chunksize)
+
+    if workers <= 1:
+        if cache is not None:
+            options["cache"] = cache
+        start = 0
+        for chunk in chunks:
+            for offset, result in enumerate(_validate_chunk(chunk, options)):
+                yield result if ordered else (start + offset, result)
+            start += len(chunk)
+        return
+
+    if shape_filename is None:
+        shape_files = tuple(dict.fromkeys(DEFAULT_SHAPES + default_registry.dispatched_shapes()))
+    else:
+        shape_files = tuple(dict.fromkeys(DEFAULT_SHAPES + (shape_filename,)))
+    shape_files = shape_files if semantics else ()
+    schema_files = tuple(dict.fromkeys(DEFAULT_SCHEMAS + (schema_filename,))) if structure else ()
+
+    with ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=mp_context,
+        initializer=_init_worker,
+        initargs=(schema_files, shape_files),
+    ) as pool:
+        # future -> (index of the first message in its chunk, cache lookups), in submission order
+        pending: Dict[Any, Tuple[int, Optional[List[Tuple[Optional[str], Any]]]]] = {}
+        submitted = 0
+
+        def submit(chunk: List[Any]) -> Tuple[Future, Optional[List[Tuple[Optional[str], Any]]]]:
+            if cache is None:
+                pending_lookups = None
+            else:
+                lookups = [_lookup(item, options, cache) for item in chunk]
+                pending_lookups = [(key, verdict) for _, key, verdict in lookups]
+                chunk = [item for item, _, verdict in lookups if verdict is None]
+            if not chunk:
+                # every verdict was cached, nothing to send
+                future = Future()
+                future.set_result([])
+            else:
+                future = pool.submit(_validate_chunk, chunk, options)
+            return future, pending_lookups
+
+        def fill():
+            nonlocal submitted
+            # keep every worker busy with one chunk queued behind it
+            while len(pending) < workers * 2:
+                chunk = next(chunks, None)
+                if chunk is None:
+                    return
+                future, lookups = submit(chunk)
+                pending[future] = (submitted, lookups)
+                submitted += len(chunk)
+
+        fill()
+        while pending:
+            if ordered:
+                future = next(iter(pending))
+                done = [future]
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                start, lookups = pending.pop(future)
+                results = future.result()
+                if lookups is not None:
+                    computed = iter(results)
+                    results = []
+                    for key, verdict in lookups:
+                        if verdict is None:
+                            verdict = next(computed)
+                            if key is not None:
+                                cache.put(key, verdict)
+                        results.append(verdict)
+                for offset, result in enumerate(results):
+                    yield result if ordered else (start + offset, result)
+            fill()
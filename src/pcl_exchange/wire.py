@@ -0,0 +1,206 @@
+"""
+Wire format for PCL messages: compact JSON bytes, optionally compressed with
+gzip or zstd as declared by the envelope's ``encoding`` field.
+
+Receivers decompress, parse the JSON and check the envelope's contentDigest
+against the content node before any model validation, RDF or SHACL work.
+"""
+import gzip
+import io
+import zlib
+from typing import Any, Dict, Optional, Tuple
+
+import pydantic_core
+
+ENCODINGS = ("identity", "gzip", "zstd")
+
+_GZIP_MAGIC = b"\x1f\x8b"
+_ZSTD_MAGIC = b"\x28\xb5\x2f\xfd"
+
+
+class ContentDigestError(ValueError):
+    """Raised when the content node does not match the envelope's contentDigest."""
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError:
+        raise ImportError(
+            "zstd encoding needs the 'zstandard' package: pip install 'pcl-exchange[zstd]'"
+        ) from None
+    return zstandard
+
+
+def sniff(data: bytes) -> str:
+    """Returns the encoding of a payload from its magic bytes."""
+    if data[:2] == _GZIP_MAGIC:
+        return "gzip"
+    if data[:4] == _ZSTD_MAGIC:
+        return "zstd"
+    return "identity"
+
+
+def compress(data: bytes, encoding: str = "identity", level: Optional[int] = None) -> bytes:
+    """
+    Encodes bytes for the wire.
+
+    Args:
+        data: The JSON bytes.
+        encoding: identity, gzip or zstd.
+        level: Compression level, defaults to 6 for gzip and 3 for zstd.
+    """
+    if encoding == "identity":
+        return data
+    if encoding == "gzip":
+        # mtime=0 keeps the output deterministic
+        return gzip.compress(data, compresslevel=6 if level is None else level, mtime=0)
+    if encoding == "zstd":
+        return _zstandard().ZstdCompressor(level=3 if level is None else level).compress(data)
+    raise ValueError(f"Unknown encoding '{encoding}', expected one of {', '.join(ENCODINGS)}")
+
+
+def _zstd_inflate(zstandard, data: bytes) -> Tuple[bytes, bool]:
+    # a decompressobj also handles frames written without a content size
+    decoder = zstandard.ZstdDecompressor().decompressobj()
+    output = decoder.decompress(data)
+    return output, decoder.eof
+
+
+def _zstd_complete(zstandard, data: bytes, output: bytes) -> bool:
+    """Tells a whole frame from a truncated one after a bounded stream read."""
+    size = zstandard.frame_content_size(data)
+    if size >= 0:
+        return len(output) == size
+    # without a declared size, rerun the frame; its output is known to fit the limit
+    return _zstd_inflate(zstandard, data)[1]
+
+
+def decompress(data: bytes, max_size: Optional[int] = None) -> Tuple[bytes, str]:
+    """
+    Decodes a payload whose encoding is detected from its magic bytes.
+
+    Args:
+        data: The received bytes.
+        max_size: Refuse payloads that expand beyond this many bytes.
+
+    Returns:
+        (json_bytes, encoding)
+
+    Raises:
+        ValueError: If the payload is truncated, corrupt or too large.
+    """
+    encoding = sniff(data)
+    if encoding == "gzip":
+        decoder = zlib.decompressobj(wbits=31)
+        try:
+            output = decoder.decompress(data, 0 if max_size is None else max_size + 1)
+        except zlib.error as e:
+            raise ValueError(f"Corrupt gzip payload: {e}") from None
+        if not decoder.eof and (max_size is None or len(output) <= max_size):
+            raise ValueError("Truncated gzip payload")
+    elif encoding == "zstd":
+        zstandard = _zstandard()
+        try:
+            if max_size is None:
+                output, complete = _zstd_inflate(zstandard, data)
+            else:
+                # never inflate more than one byte past the limit
+                with zstandard.ZstdDecompressor().stream_reader(io.BytesIO(data)) as reader:
+                    output = reader.read(max_size + 1)
+                complete = len(output) > max_size or _zstd_complete(zstandard, data, output)
+        except zstandard.ZstdError as e:
+            raise ValueError(f"Corrupt zstd payload: {e}") from None
+        if not complete:
+            raise ValueError("Truncated zstd payload")
+    else:
+        output = bytes(data)
+    if max_size is not None and len(output) > max_size:
+        raise ValueError(f"Payload expands beyond {max_size} bytes")
+    return output, encoding
+
+
+def find_nodes(document: Any) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """Returns the envelope node and the content node it references, if present."""
+    if not isinstance(document, dict) or not isinstance(document.get("@graph"), list):
+        return None, None
+    nodes = [node for node in document["@graph"] if isinstance(node, dict)]
+    envelope = next((node for node in nodes if node.get("@type") == "PCLActionEnvelope"), None)
+    if envelope is None:
+        return None, None
+    ref = envelope.get("contentRef")
+    content_id = ref.get("@id") if isinstance(ref, dict) else ref
+    content = next((node for node in nodes if content_id is not None and node.get("@id") == content_id), None)
+    return envelope, content
+
+
+def check_content_digest(document: Any) -> bool:
+    """
+    Checks the envelope's contentDigest against the content node.
+
+    Returns:
+        True if the digest was checked, False if the envelope declares none.
+
+    Raises:
+        ContentDigestError: If the digest does not match or the content node is missing.
+    """
+    from .models import ContentDigest
+
+    envelope, content = find_nodes(document)
+    declared = envelope.get("contentDigest") if envelope is not None else None
+    if declared is None:
+        return False
+    try:
+        expected = ContentDigest.model_validate(declared)
+    except ValueError as e:
+        raise ContentDigestError(f"Malformed contentDigest: {e}") from None
+    if content is None:
+        raise ContentDigestError("contentDigest is set but the referenced content node is missing")
+    if not expected.matches(content):
+        raise ContentDigestError("Content does not match the envelope's contentDigest")
+    return True
+
+
+def encode_message(message, encoding: Optional[str] = None, level: Optional[int] = None) -> bytes:
+    """
+    Serializes a PCLMessage to compact JSON and compresses it.
+
+    Args:
+        message: The PCLMessage.
+        encoding: Defaults to the envelope's encoding, or identity if it has none.
+        level: Compression level.
+
+    Raises:
+        ValueError: If encoding contradicts the (signed) encoding in the envelope.
+    """
+    from .models import PCLEnvelope
+
+    declared = next((n.encoding for n in message.graph if isinstance(n, PCLEnvelope)), None)
+    if encoding is None:
+        encoding = declared or "identity"
+    elif declared is not None and declared != encoding:
+        raise ValueError(f"Envelope declares encoding '{declared}', cannot send it as '{encoding}'")
+    return compress(message.model_dump_json(by_alias=True).encode("utf-8"), encoding, level)
+
+
+def decode_document(data: bytes, verify_digest: bool = True, max_size: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Decompresses and parses a received message, checking its content digest.
+
+    Args:
+        data: The received bytes, in any supported encoding.
+        verify_digest: Check the envelope's contentDigest when it has one.
+        max_size: Refuse payloads that expand beyond this many bytes.
+
+    Returns:
+        The JSON-LD document as plain Python objects.
+
+    Raises:
+        ValueError: If the payload cannot be decoded or parsed.
+        ContentDigestError: If the content does not match its digest.
+    """
+    payload, _ = decompress(data, max_size)
+    document = pydantic_core.from_json(payload)
+    if verify_digest:
+        check_content_digest(document)
+    return document
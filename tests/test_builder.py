@@ -1,5 +1,7 @@
 import pytest
-from pcl_exchange.builder import PCLMessageBuilder
+from pcl_exchange.builder import PCLCampaignBuilder, PCLMessageBuilder
+from pcl_exchange.crypto import Signer, Verifier
+from pcl_exchange.validation import validate_message
 
 def test_builder_initialization(builder_defaults):
     builder = PCLMessageBuilder(**builder_defaults)
@@ -35,4 +37,62 @@ def test_missing_content_raises_error(builder_defaults):
     # dont call set_content()
     
     with pytest.raises(Exception): # Pydantic validation error expected
-        builder.build()
\ No newline at end of file
+        builder.build()
+
+def _campaign(builder_defaults, valid_payload_data):
+    return PCLCampaignBuilder(
+        **builder_defaults,
+        instrument=valid_payload_data["instrument"],
+        method=valid_payload_data["method"],
+        capabilities=["xrd.powder.theta-2theta"],
+        params=valid_payload_data["params"],
+    )
+
+
+def test_campaign_matches_single_builder(builder_defaults, valid_payload_data, key_pair):
+    """Campaign rows serialize exactly like messages from PCLMessageBuilder."""
+    campaign = _campaign(builder_defaults, valid_payload_data)
+    table = {"sample": ["igsn:XYZ00001", "igsn:XYZ00002"], "step": [0.01, 0.05], "dwell": [1, 2]}
+    messages = list(campaign.messages(table, signer=Signer(key_pair)))
+
+    for message, sample, step, dwell in zip(messages, table["sample"], table["step"], table["dwell"]):
+        envelope = message.graph[2]
+        builder = PCLMessageBuilder(**builder_defaults)
+        builder.envelope_uuid = envelope.identifier
+        builder.creation_timestamp = envelope.date_created
+        params = dict(valid_payload_data["params"], step={"val": step, "unit": "deg"}, dwell={"val": dwell})
+        builder.set_content(valid_payload_data["instrument"], sample, valid_payload_data["method"], params)
+        builder.add_capability("xrd.powder.theta-2theta")
+        builder.sign(Signer(key_pair))
+
+        assert message.to_json() == builder.build().to_json()
+        assert validate_message(message.to_json(), verifier=Verifier(key_pair)) == (True, None)
+
+    assert messages[0].graph[2].identifier != messages[1].graph[2].identifier
+
+
+def test_campaign_is_lazy(builder_defaults, valid_payload_data):
+    campaign = _campaign(builder_defaults, valid_payload_data)
+    consumed = []
+
+    def samples():
+        for i in range(1000):
+            consumed.append(i)
+            yield f"igsn:XYZ{i:05d}"
+
+    messages = campaign.messages({"sample": samples()})
+    first = next(messages)
+    assert first.graph[3].object == {"@id": "igsn:XYZ00000"}
+    assert len(consumed) == 1
+
+
+def test_campaign_rejects_bad_rows(builder_defaults, valid_payload_data):
+    campaign = _campaign(builder_defaults, valid_payload_data)
+    with pytest.raises(ValueError):
+        list(campaign.messages({"sample": ["igsn:XYZ00001"], "step": [0.1, 0.2]}))
+    with pytest.raises(ValueError):
+        list(campaign.messages({"sample": ["igsn:XYZ00001"], "step": [None]}))
+    with pytest.raises(ValueError):
+        list(campaign.messages({"step": [0.1]}))
+    with pytest.raises(Exception):
+        PCLCampaignBuilder("not-a-ror", builder_defaults["receiver_id"], "urn:i", "urn:m")
@@ -0,0 +1,137 @@
+import gzip
+import json
+
+import pytest
+from jwcrypto import jwk
+
+from pcl_exchange.builder import PCLMessageBuilder
+from pcl_exchange.cache import SQLiteResultStore, ValidationCache, message_digest
+from pcl_exchange.crypto import Signer, Verifier, thumbprint
+from pcl_exchange.keys import KeyResolver
+from pcl_exchange.validation import validate_many, validate_message
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def _message(builder_defaults, valid_payload_data, key_pair):
+    builder = PCLMessageBuilder(**builder_defaults)
+    builder.set_content(**valid_payload_data)
+    builder.add_capability("xrd.powder.theta-2theta")
+    builder.sign(Signer(key_pair))
+    return builder.build().to_json()
+
+
+def test_repeat_is_answered_from_cache(builder_defaults, valid_payload_data, key_pair):
+    data = _message(builder_defaults, valid_payload_data, key_pair)
+    cache = ValidationCache()
+    verifier = Verifier(key_pair)
+
+    first = validate_message(data, verifier=verifier, fast=True, cache=cache)
+    assert first == validate_message(data, verifier=verifier, fast=True)
+    assert validate_message(data, verifier=verifier, fast=True, cache=cache) == first
+    # compressed redeliveries share the entry of the decoded JSON
+    assert validate_message(gzip.compress(data.encode()), verifier=verifier, fast=True, cache=cache) == first
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.entries) == (2, 1, 1)
+    assert stats.hit_ratio == pytest.approx(2 / 3)
+
+    # anything the verdict depends on is part of the key
+    other = Verifier(jwk.JWK.generate(kty="OKP", crv="Ed25519"))
+    assert validate_message(data, verifier=other, fast=True, cache=cache)[0] is False
+    validate_message(data, verifier=verifier, fast=True, shape_filename=None, cache=cache)
+    validate_message(data, verifier=verifier, fast=True, structure=False, cache=cache)
+    assert cache.stats().misses == 4
+
+    broken = json.loads(data)
+    broken["@graph"][3]["parameter"] = []
+    failed = validate_message(broken, fast=True, cache=cache)
+    assert failed[0] is False
+    assert validate_message(broken, fast=True, cache=cache) == failed
+
+
+def test_ttl_and_eviction():
+    clock = FakeClock()
+    cache = ValidationCache(maxsize=2, ttl=10, clock=clock)
+    cache.put("a", (True, None))
+    cache.put("b", (False, "nope"))
+    assert cache.get("a") == (True, None)
+    cache.put("c", (True, None))
+    # b was the least recently used
+    assert cache.get("b") is None and len(cache) == 2
+
+    clock.now += 10
+    assert cache.get("a") is None and cache.get("c") is None
+    with pytest.raises(ValueError):
+        ValidationCache(ttl=0)
+
+
+def test_store_outlives_the_process(tmp_path):
+    clock = FakeClock()
+    path = str(tmp_path / "verdicts.db")
+    cache = ValidationCache(store=SQLiteResultStore(path), ttl=60, clock=clock)
+    cache.put("a", (False, "JSON Schema: bad"))
+    cache.put("b", (True, None))
+    cache.close()
+
+    clock.now += 30
+    cache = ValidationCache(store=SQLiteResultStore(path), ttl=60, clock=clock)
+    assert cache.get("a") == (False, "JSON Schema: bad")
+    assert cache.get("a") == (False, "JSON Schema: bad")
+    assert cache.stats()[:4] == (2, 0, 1, 1)
+    cache.close()
+
+    clock.now += 60
+    store = SQLiteResultStore(path)
+    assert store.get("b", clock.now) is None
+    assert store.expire(clock.now) == 2
+    store.close()
+
+
+def test_validate_many_skips_cached(builder_defaults, valid_payload_data, key_pair):
+    good = _message(builder_defaults, valid_payload_data, key_pair)
+    items = [good, "{not json", good, good]
+    cache = ValidationCache()
+
+    inline = list(validate_many(items, workers=1, fast=True, cache=cache))
+    assert [ok for ok, _ in inline] == [True, False, True, True]
+    assert cache.stats().hits == 2
+
+    pooled = list(validate_many(items, workers=2, chunksize=2, fast=True, cache=cache))
+    assert pooled == inline
+    assert cache.stats().hits == 6
+
+
+def test_resolver_verdicts_are_cached(builder_defaults, valid_payload_data, key_pair):
+    data = _message(builder_defaults, valid_payload_data, key_pair)
+    keys = {builder_defaults["sender_id"]: key_pair.export_public(as_dict=True)}
+
+    class Backend:
+        def lookup(self, reference):
+            return keys.get(reference)
+
+    resolver = KeyResolver([Backend()])
+    cache = ValidationCache()
+    first = validate_message(data, verifier=resolver, fast=True, cache=cache)
+    assert first == validate_message(data, verifier=Verifier(key_pair), fast=True) == (True, None)
+    assert validate_message(data, verifier=resolver, fast=True, cache=cache) == first
+    assert (cache.stats().hits, len(cache)) == (1, 1)
+
+    # once the sender's key rotates, the earlier verdict no longer applies
+    keys[builder_defaults["sender_id"]] = jwk.JWK.generate(kty="OKP", crv="Ed25519").export_public(as_dict=True)
+    resolver.invalidate()
+    assert validate_message(data, verifier=resolver, fast=True, cache=cache)[0] is False
+    assert cache.stats().misses == 2
+
+
+def test_key_id(key_pair):
+    public = key_pair.export_public(as_dict=True)
+    assert Verifier(key_pair).key_id == key_pair.thumbprint()
+    assert thumbprint(public) == key_pair.thumbprint()
+    assert Verifier(dict(public, kid="lab-key-1")).key_id == "lab-key-1"
+    assert message_digest({"b": 1, "a": 2}) == message_digest('{"a":2,"b":1}')
@@ -0,0 +1,79 @@
+import io
+import json
+import sys
+import tarfile
+
+import pytest
+
+from pcl_exchange.builder import PCLMessageBuilder
+from pcl_exchange.cli import iter_records, main
+from pcl_exchange.crypto import Signer
+
+
+@pytest.fixture
+def messages(key_pair, builder_defaults, valid_payload_data):
+    builder = PCLMessageBuilder(**builder_defaults)
+    builder.set_content(**valid_payload_data)
+    builder.add_capability("xrd.powder.theta-2theta")
+    builder.sign(Signer(key_pair))
+    good = json.loads(builder.build().to_json())
+
+    # built rather than edited, so the content digest matches and SHACL reports the problem
+    builder.set_content(**dict(valid_payload_data, params={}))
+    broken = json.loads(builder.build().to_json())
+    return good, broken
+
+
+def _results(capsys):
+    return [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+
+
+def test_directory_and_tarball(tmp_path, messages, capsys):
+    good, broken = messages
+    crates = tmp_path / "crates"
+    (crates / "nested").mkdir(parents=True)
+    (crates / "a.json").write_text(json.dumps(good))
+    (crates / "nested" / "b.json").write_text(json.dumps(broken))
+    (crates / "notes.txt").write_text("ignored")
+
+    archive = tmp_path / "crates.tar.gz"
+    with tarfile.open(archive, "w:gz") as tar:
+        tar.add(crates, arcname="crates")
+
+    assert [source for source, _ in iter_records([str(crates)])] == [
+        str(crates / "a.json"), str(crates / "nested" / "b.json")
+    ]
+
+    assert main(["validate", str(crates), str(archive), "-q"]) == 1
+    results = _results(capsys)
+    assert [r["ok"] for r in results] == [True, False, True, False]
+    assert results[2]["source"] == f"{archive}:crates/a.json"
+    assert "Conforms: False" in results[1]["error"]
+
+
+def test_ndjson_stdin_with_signature(tmp_path, messages, key_pair, monkeypatch, capsys):
+    good, _ = messages
+    tampered = json.loads(json.dumps(good))
+    tampered["@graph"][2]["project"] = "doi:10.1234/other"
+    lines = "\n".join(json.dumps(m) for m in (good, tampered, good)) + "\n\n"
+    monkeypatch.setattr(sys, "stdin", io.TextIOWrapper(io.BytesIO(lines.encode())))
+
+    key_file = tmp_path / "sender.jwk"
+    key_file.write_text(key_pair.export_public())
+
+    assert main(["validate", "--key", str(key_file), "--failures-only"]) == 1
+    captured = capsys.readouterr()
+    results = [json.loads(line) for line in captured.out.splitlines()]
+    assert results == [{"source": "<stdin>:2", "ok": False, "error": "Signature verification failed"}]
+    assert "3 messages, 2 valid, 1 invalid" in captured.err
+
+
+def test_parallel_workers(tmp_path, messages, capsys):
+    good, broken = messages
+    stream = tmp_path / "batch.ndjson"
+    stream.write_text("".join(json.dumps(m) + "\n" for m in [good, broken] * 3))
+
+    assert main(["validate", str(stream), "-j", "2", "--chunksize", "2", "--fast", "-q"]) == 1
+    results = _results(capsys)
+    assert [r["source"] for r in results] == [f"{stream}:{i}" for i in range(1, 7)]
+    assert [r["ok"] for r in results] == [True, False] * 3
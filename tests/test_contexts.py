@@ -0,0 +1,65 @@
+import pytest
+
+from pcl_exchange.builder import PCLMessageBuilder
+from pcl_exchange.contexts import RO_CRATE_CONTEXT, ContextLoader
+from pcl_exchange.validation import validate_semantics
+
+
+def _no_network(url):
+    raise AssertionError(f"unexpected fetch of {url}")
+
+
+def test_bundled_context_served_offline(builder_defaults, valid_payload_data):
+    """Messages from the builder validate without fetching any context."""
+    loader = ContextLoader(fetch=_no_network, allow_remote=False)
+
+    builder = PCLMessageBuilder(**builder_defaults)
+    builder.set_content(**valid_payload_data)
+    message = builder.build()
+
+    resolved = loader.resolve(message.model_dump(by_alias=True, mode="json"))
+    assert resolved["@context"][0]["CreativeWork"] == "http://schema.org/CreativeWork"
+
+    conforms, report = validate_semantics(message.to_json(), context_loader=loader)
+    assert conforms, report
+
+
+def test_remote_context_fetched_once(tmp_path):
+    calls = []
+
+    def fetch(url):
+        calls.append(url)
+        return {"@context": {"ex": "http://example.org/"}}
+
+    loader = ContextLoader(cache_dir=tmp_path, fetch=fetch)
+    assert loader.load("https://example.org/context")["@context"]["ex"] == "http://example.org/"
+    loader.load("https://example.org/context")
+    assert calls == ["https://example.org/context"]
+
+    # a fresh loader picks it up from the on-disk cache
+    offline = ContextLoader(cache_dir=tmp_path, fetch=_no_network, allow_remote=False)
+    assert offline.load("https://example.org/context")["@context"]["ex"] == "http://example.org/"
+
+
+def test_remote_lru_eviction():
+    calls = []
+
+    def fetch(url):
+        calls.append(url)
+        return {"@context": {}}
+
+    loader = ContextLoader(max_entries=1, fetch=fetch)
+    loader.load("https://example.org/a")
+    loader.load("https://example.org/b")
+    loader.load("https://example.org/a")
+    assert calls == ["https://example.org/a", "https://example.org/b", "https://example.org/a"]
+
+    # bundled contexts never count against the LRU
+    loader.load(RO_CRATE_CONTEXT)
+    assert len(calls) == 3
+
+
+def test_unknown_context_offline_raises():
+    loader = ContextLoader(allow_remote=False)
+    with pytest.raises(LookupError):
+        loader.load("https://example.org/unknown")
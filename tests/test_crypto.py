@@ -1,5 +1,9 @@
+import json
+
 from pcl_exchange.builder import PCLMessageBuilder
-from pcl_exchange.crypto import Signer, Verifier
+from pcl_exchange.crypto import Signer, VerificationResult, Verifier, canonicalize
+from pcl_exchange.models import PCLMessage
+from pcl_exchange.validation import validate_message
 
 def test_signature_verification_success(key_pair, builder_defaults, valid_payload_data):
     """A correctly signed message should verify True."""
@@ -18,7 +22,7 @@ def test_signature_verification_success(key_pair, builder_defaults, valid_payloa
     assert verifier.verify(envelope) is True
 
 def test_tampered_payload_fails(key_pair, builder_defaults, valid_payload_data):
-    """Modifying the payload after signing should cause verification to fail."""
+    """Modifying the payload after signing should fail the contentDigest that binds it to the signature."""
     
     # build and sign the message
     builder = PCLMessageBuilder(**builder_defaults)
@@ -26,14 +30,128 @@ def test_tampered_payload_fails(key_pair, builder_defaults, valid_payload_data):
     signer = Signer(private_key=key_pair)
     builder.sign(signer)
     message = builder.build()
+    untouched = message.to_json()
     
     # change the payload
     content_node = next(item for item in message.graph if item.id == "#content")
     content_node.instrument["@id"] = "urn:malicious:instrument"
     
-    # verify signature and envelope
     verifier = Verifier(public_key=key_pair)
     envelope = next(item for item in message.graph if item.id == "#envelope")
     
-    # should fail because the envelope signature covers the content hash
-    assert verifier.verify(envelope) is False
\ No newline at end of file
+    # the envelope itself is untouched, its signature still holds
+    assert verifier.verify(envelope) is True
+    # but the content no longer hashes to the signed contentDigest
+    assert not envelope.content_digest.matches(content_node)
+    expected = VerificationResult(False, "Content does not match the envelope's contentDigest")
+    assert verifier.check_message(message) == expected
+    assert verifier.check_message(json.loads(message.to_json())) == expected
+    assert validate_message(message, semantics=False, verifier=verifier) == (
+        False, "Content Digest: Content does not match the envelope's contentDigest"
+    )
+
+    # the untampered message passes both checks
+    assert verifier.check_message(PCLMessage.from_json_bytes(untouched)).valid
+    assert verifier.check_message(json.loads(untouched)).valid
+    unbound = json.loads(untouched)
+    del unbound["@graph"][2]["contentDigest"]
+    assert not verifier.check_message(unbound).valid
+    # a signature over an envelope without a digest says nothing about the content
+    unbound["@graph"][2]["authz"]["jws"] = signer.sign(unbound["@graph"][2])
+    unbound["@graph"][3]["instrument"]["@id"] = "urn:malicious:instrument"
+    assert verifier.verify(unbound["@graph"][2]) is True
+    assert validate_message(unbound, semantics=False, verifier=verifier) == (
+        False, "Content Digest: Envelope has no contentDigest, the signature does not cover the content."
+    )
+    assert validate_message(unbound, structure=False, semantics=False) == (True, None)
+
+def _signed_envelope_dicts(key_pair, builder_defaults, valid_payload_data, count):
+    envelopes = []
+    for i in range(count):
+        builder = PCLMessageBuilder(**builder_defaults)
+        valid_payload_data["sample"] = f"igsn:XYZ{i:05d}"
+        builder.set_content(**valid_payload_data)
+        builder.sign(Signer(private_key=key_pair))
+        message = json.loads(builder.build().to_json())
+        envelopes.append(next(n for n in message["@graph"] if n["@id"] == "#envelope"))
+    return envelopes
+
+
+def test_verify_many_reports_reasons(key_pair, builder_defaults, valid_payload_data):
+    envelopes = _signed_envelope_dicts(key_pair, builder_defaults, valid_payload_data, 6)
+    envelopes[1]["project"] = "doi:10.1234/other"
+    envelopes[2]["authz"] = None
+    envelopes[3]["authz"]["jws"] = "not-a-jws"
+    envelopes[4]["authz"]["jws"] = envelopes[4]["authz"]["jws"][:-4] + "AAAA"
+
+    verifier = Verifier(public_key=json.loads(key_pair.export_public()))
+    results = verifier.verify_many(envelopes, workers=3)
+
+    assert [r.valid for r in results] == [True, False, False, False, False, True]
+    assert results[0] == VerificationResult(True, None)
+    assert results[1].reason == "Signature does not match."
+    assert results[2].reason == "No signature found in the envelope."
+    assert results[3].reason.startswith("Malformed JWS")
+    assert verifier.verify_many(envelopes, workers=1) == results
+
+
+def test_direct_path_matches_jwcrypto(key_pair, builder_defaults, valid_payload_data):
+    """The pre-parsed Ed25519 key gives the same answers as jwcrypto."""
+    envelopes = _signed_envelope_dicts(key_pair, builder_defaults, valid_payload_data, 2)
+    envelopes[1]["receiver"] = "https://ror.org/00000000a"
+
+    verifier = Verifier(public_key=key_pair)
+    for envelope in envelopes:
+        direct = verifier.check(envelope)
+        payload = canonicalize(envelope)
+        assert verifier._verify_jwcrypto(envelope["authz"]["jws"], payload) == direct
+
+
+def test_fast_signing_is_byte_identical(key_pair, builder_defaults, valid_payload_data):
+    envelope = _signed_envelope_dicts(key_pair, builder_defaults, valid_payload_data, 1)[0]
+    signer = Signer(private_key=key_pair)
+    assert signer.sign(envelope) == signer._sign_jwcrypto(canonicalize(envelope))
+    assert signer.sign(envelope) == envelope["authz"]["jws"]
+
+
+def test_sign_many(key_pair, builder_defaults, valid_payload_data):
+    signer = Signer(private_key=key_pair)
+    builders = []
+    for i in range(4):
+        builder = PCLMessageBuilder(**builder_defaults)
+        valid_payload_data["sample"] = f"igsn:XYZ{i:05d}"
+        builder.set_content(**valid_payload_data)
+        builders.append(builder)
+
+    signatures = signer.sign_many(builders, workers=2)
+    assert signatures == [b.authz["jws"] for b in builders]
+
+    envelopes = [
+        next(n for n in json.loads(b.build().to_json())["@graph"] if n["@id"] == "#envelope")
+        for b in builders
+    ]
+    assert signer.sign_many(envelopes, workers=2) == signatures
+    assert all(r.valid for r in Verifier(public_key=key_pair).verify_many(envelopes))
+
+
+def test_verify_accepts_models(key_pair, builder_defaults, valid_payload_data):
+    """PCLEnvelope models verify against the same canonical bytes the signer signed."""
+    envelopes = []
+    for i in range(4):
+        builder = PCLMessageBuilder(**builder_defaults)
+        valid_payload_data["sample"] = f"igsn:XYZ{i:05d}"
+        builder.set_content(**valid_payload_data)
+        builder.sign(Signer(private_key=key_pair))
+        envelopes.append(next(item for item in builder.build().graph if item.id == "#envelope"))
+    envelopes[1].project = "doi:10.1234/other"
+    envelopes[2].authz = None
+
+    verifier = Verifier(public_key=key_pair)
+    assert verifier.verify(envelopes[0]) is True
+    results = verifier.verify_many(envelopes, workers=2)
+    assert [r.valid for r in results] == [True, False, False, True]
+    assert results[1].reason == "Signature does not match."
+    assert results[2].reason == "No signature found in the envelope."
+    # the model and its JSON form give the same answers
+    dicts = [json.loads(envelope.model_dump_json(by_alias=True)) for envelope in envelopes]
+    assert verifier.verify_many(dicts, workers=1) == results
@@ -0,0 +1,163 @@
+import hashlib
+import json
+import os
+
+import pytest
+
+from pcl_exchange.builder import PCLDataRegistrationBuilder
+from pcl_exchange.crypto import Signer, Verifier
+from pcl_exchange.datafiles import DataFileVerifier, FileCheck, FileHasher, hash_file, hash_files
+from pcl_exchange.models import DataFile, LazyPCLMessage, PCLDatasetContent, PCLMessage
+from pcl_exchange.validation import validate_message
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    (tmp_path / "scans").mkdir()
+    for i in range(3):
+        (tmp_path / "scans" / f"scan_{i}.xy").write_bytes(os.urandom(50000 * (i + 1)))
+    (tmp_path / "scans" / "empty.xy").write_bytes(b"")
+    return tmp_path
+
+
+@pytest.fixture
+def crate(data_dir, builder_defaults, key_pair):
+    builder = PCLDataRegistrationBuilder(**builder_defaults, base_dir=data_dir, chunk_size=4096, workers=2)
+    builder.set_dataset("igsn:XYZ12345", "XRD scans")
+    builder.add_capability("data.register")
+    for name in sorted(os.listdir(data_dir / "scans")):
+        builder.add_file(data_dir / "scans" / name, encoding_format="text/plain")
+    builder.sign(Signer(key_pair))
+    return builder.build()
+
+
+def test_hash_file_matches_hashlib(data_dir):
+    path = data_dir / "scans" / "scan_2.xy"
+    expected = hashlib.sha512(path.read_bytes()).hexdigest()
+    assert hash_file(path, "sha512", chunk_size=4096).value == expected
+    assert hash_file(data_dir / "scans" / "empty.xy").size == 0
+
+    paths = sorted((data_dir / "scans").iterdir())
+    assert hash_files(paths, workers=3) == hash_files(paths, workers=1)
+
+
+def test_hasher_resumes_and_restarts(data_dir):
+    path = data_dir / "scans" / "scan_1.xy"
+    hasher = FileHasher(path, chunk_size=4096)
+    assert hasher.run(max_bytes=5000) is None
+    assert hasher.offset == 8192
+    assert hasher.run().value == hashlib.sha256(path.read_bytes()).hexdigest()
+
+    hasher = FileHasher(path, chunk_size=4096)
+    hasher.run(max_bytes=1)
+    path.write_bytes(b"rewritten")
+    # the file changed since the first chunk, hashing starts over
+    assert hasher.run().value == hashlib.sha256(b"rewritten").hexdigest()
+
+
+def test_builder_lists_files(crate):
+    document = json.loads(crate.to_json())
+    graph = document["@graph"]
+    files = [node for node in graph if node["@type"] == "File"]
+
+    assert graph[2]["action"] == "register_data"
+    assert [f["@id"] for f in files] == [f"scans/{n}" for n in ("empty.xy", "scan_0.xy", "scan_1.xy", "scan_2.xy")]
+    assert {"@id": "scans/scan_0.xy"} in graph[1]["hasPart"]
+    # the Dataset entries repeat size and checksum, so the contentDigest covers them
+    assert graph[3]["hasPart"] == [{"@id": f["@id"], "contentSize": f["contentSize"], "sha256": f["sha256"]} for f in files]
+    assert files[1]["contentSize"] == 50000 and len(files[1]["sha256"]) == 64
+    assert document["@context"][1]["sha256"] == "http://schema.org/sha256"
+
+    parsed = PCLMessage.from_bytes(crate.to_bytes())
+    assert isinstance(parsed.graph[3], PCLDatasetContent)
+    assert all(isinstance(n, DataFile) for n in parsed.graph[4:])
+    assert isinstance(LazyPCLMessage(document).content, PCLDatasetContent)
+
+
+def test_verifier_reports_mismatches(crate, data_dir):
+    verifier = DataFileVerifier(data_dir, workers=2)
+    assert all(check.valid for check in verifier.verify(crate))
+
+    (data_dir / "scans" / "scan_0.xy").write_bytes(b"x" * 50000)
+    (data_dir / "scans" / "scan_1.xy").write_bytes(b"short")
+    (data_dir / "scans" / "scan_2.xy").unlink()
+    checks = verifier.verify(json.loads(crate.to_json()))
+
+    assert checks[0] == FileCheck("scans/empty.xy", True)
+    assert checks[1].reason == "sha256 does not match."
+    assert checks[2].reason == "Size is 5, expected 100000."
+    assert checks[3].reason.startswith("Cannot read file")
+
+    outside = {"@id": "../secret.txt", "@type": "File", "contentSize": 1, "sha256": "0" * 64}
+    assert not verifier.check_file(outside).valid
+
+
+def test_substituted_file_is_caught(crate, data_dir, key_pair):
+    substitute = b"forged" * 1000
+    (data_dir / "scans" / "scan_0.xy").write_bytes(substitute)
+    forged_sha256 = hashlib.sha256(substitute).hexdigest()
+    verifier = DataFileVerifier(data_dir)
+
+    # editing the File entity alone: the signed content still holds the real checksum
+    document = json.loads(crate.to_json())
+    entity = next(node for node in document["@graph"] if node["@id"] == "scans/scan_0.xy")
+    entity.update(sha256=forged_sha256, contentSize=len(substitute))
+    assert validate_message(document, verifier=Verifier(key_pair), semantics=False) == (True, None)
+    checks = {check.id: check for check in verifier.verify(document)}
+    assert checks["scans/scan_0.xy"] == FileCheck("scans/scan_0.xy", False, "File entity does not match the signed content.")
+    assert checks["scans/scan_1.xy"].valid
+
+    # editing the content as well breaks the contentDigest
+    part = next(part for part in document["@graph"][3]["hasPart"] if part["@id"] == "scans/scan_0.xy")
+    part.update(sha256=forged_sha256, contentSize=len(substitute))
+    valid, error = validate_message(document, verifier=Verifier(key_pair), semantics=False)
+    assert not valid and error.startswith("Content Digest")
+
+    # dropping the File entity does not skip the file
+    document = json.loads(crate.to_json())
+    document["@graph"] = [node for node in document["@graph"] if node["@id"] != "scans/scan_0.xy"]
+    assert FileCheck("scans/scan_0.xy", False, "Size is 6000, expected 50000.") in verifier.verify(document)
+
+    # a File entity the signed content does not list is not trusted
+    document["@graph"].append({"@id": "scans/extra.xy", "@type": "File", "contentSize": 1, "sha256": "0" * 64})
+    assert verifier.verify(document)[-2].reason == "Size and checksum are not covered by the signed content."
+
+
+def test_checkpoint_skips_verified_files(crate, data_dir, monkeypatch):
+    checkpoint = data_dir / "verified.jsonl"
+    assert all(check.valid for check in DataFileVerifier(data_dir, checkpoint).verify(crate))
+    assert len(checkpoint.read_text().splitlines()) == 4
+
+    # a restarted receiver trusts the checkpoint and hashes nothing
+    def fail(self, max_bytes=None):
+        raise AssertionError("hashed a checkpointed file")
+
+    monkeypatch.setattr(FileHasher, "run", fail)
+    with open(checkpoint, "a") as f:
+        f.write('{"path": "torn')
+    assert all(check.valid for check in DataFileVerifier(data_dir, checkpoint).verify(crate))
+
+
+def test_interrupted_file_resumes(crate, data_dir, monkeypatch):
+    verifier = DataFileVerifier(data_dir, chunk_size=4096, workers=1)
+    real_read = FileHasher._hash_read
+    calls = []
+
+    def flaky_mapped(self, f, size, stop):
+        raise OSError("mmap unavailable")
+
+    def flaky_read(self, f, stop):
+        calls.append(self.offset)
+        if len(calls) == 1:
+            # hash one chunk, then lose the connection
+            real_read(self, f, self.offset + 4096)
+            raise OSError(5, "Input/output error")
+        real_read(self, f, stop)
+
+    monkeypatch.setattr(FileHasher, "_hash_mapped", flaky_mapped)
+    monkeypatch.setattr(FileHasher, "_hash_read", flaky_read)
+    entity = next(n for n in crate.graph if isinstance(n, DataFile) and n.id == "scans/scan_2.xy")
+
+    assert verifier.check_file(entity).reason == "Cannot read file: Input/output error"
+    assert verifier.check_file(entity).valid
+    assert calls == [0, 4096]
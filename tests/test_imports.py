@@ -0,0 +1,72 @@
+import json
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+import pcl_exchange
+
+HEAVY = ("rdflib", "pyshacl", "jsonschema", "jwcrypto", "requests")
+
+# builds and signs a message from a fresh interpreter, then reports what got loaded
+SCRIPT = """
+import json, sys
+
+before = set(sys.modules)
+import pcl_exchange
+imported = sorted(set(sys.modules) - before)
+
+key = json.loads(sys.argv[1])
+builder = pcl_exchange.PCLMessageBuilder("https://ror.org/03yrm5c26", "https://ror.org/01bj3aw27")
+builder.set_content(
+    "urn:aimd:instrument:proto-xrd-01", "igsn:XYZ12345",
+    "urn:aimd:method:xrd:powder:theta-2theta:v1", {"step": {"val": 0.02, "unit": "deg"}},
+)
+builder.add_capability("xrd.powder.theta-2theta")
+builder.sign(pcl_exchange.Signer(key))
+document = json.loads(builder.build().to_json())
+valid = pcl_exchange.Verifier(key).check(document["@graph"][2]).valid
+sending = sorted({name.split(".")[0] for name in sys.modules})
+
+pcl_exchange.validate_structure(document["@graph"][2])
+print(json.dumps({
+    "imported": imported,
+    "valid": valid,
+    "sending": sending,
+    "validating": sorted({name.split(".")[0] for name in sys.modules}),
+}))
+"""
+
+
+def _run(key_pair):
+    env = dict(os.environ, PYTHONPATH=str(Path(pcl_exchange.__file__).parents[1]))
+    output = subprocess.run(
+        [sys.executable, "-c", SCRIPT, json.dumps(key_pair.export_private(as_dict=True))],
+        capture_output=True, check=True, env=env, text=True,
+    ).stdout
+    return json.loads(output)
+
+
+def test_sending_does_not_load_validation_stack(key_pair):
+    report = _run(key_pair)
+
+    assert report["valid"]
+    # the package itself only sets up its lazy exports, not even pydantic is loaded yet
+    assert report["imported"] == ["pcl_exchange"]
+    for name in HEAVY:
+        assert name not in report["sending"], name
+    # validating pulls in what it needs on first use
+    assert "jsonschema" in report["validating"]
+    assert "rdflib" not in report["validating"]
+
+
+def test_lazy_exports():
+    assert "validate_message" in dir(pcl_exchange)
+    assert set(pcl_exchange.__all__) <= set(dir(pcl_exchange))
+    from pcl_exchange.crypto import Signer
+
+    assert pcl_exchange.Signer is Signer
+    with pytest.raises(AttributeError, match="nope"):
+        pcl_exchange.nope
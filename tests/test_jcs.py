@@ -0,0 +1,123 @@
+import struct
+
+import pytest
+
+from pcl_exchange.builder import PCLMessageBuilder
+from pcl_exchange.crypto import Signer
+from pcl_exchange.jcs import JCSEncoder, canonicalize, digest, format_number
+from pcl_exchange.models import PCLEnvelope
+
+# RFC 8785 appendix B
+NUMBERS = [
+    ("0000000000000000", "0"),
+    ("8000000000000000", "0"),
+    ("0000000000000001", "5e-324"),
+    ("8000000000000001", "-5e-324"),
+    ("7fefffffffffffff", "1.7976931348623157e+308"),
+    ("ffefffffffffffff", "-1.7976931348623157e+308"),
+    ("4340000000000000", "9007199254740992"),
+    ("c340000000000000", "-9007199254740992"),
+    ("4430000000000000", "295147905179352830000"),
+    ("44b52d02c7e14af5", "9.999999999999997e+22"),
+    ("44b52d02c7e14af6", "1e+23"),
+    ("44b52d02c7e14af7", "1.0000000000000001e+23"),
+    ("444b1ae4d6e2ef4e", "999999999999999700000"),
+    ("444b1ae4d6e2ef4f", "999999999999999900000"),
+    ("444b1ae4d6e2ef50", "1e+21"),
+    ("3eb0c6f7a0b5ed8c", "9.999999999999997e-7"),
+    ("3eb0c6f7a0b5ed8d", "0.000001"),
+    ("41b3de4355555553", "333333333.3333332"),
+    ("41b3de4355555554", "333333333.33333325"),
+    ("41b3de4355555555", "333333333.3333333"),
+    ("41b3de4355555556", "333333333.3333334"),
+    ("41b3de4355555557", "333333333.33333343"),
+    ("becbf647612f3696", "-0.0000033333333333333333"),
+    ("43143ff3c1cb0959", "1424953923781206.2"),
+]
+
+
+@pytest.mark.parametrize("bits, expected", NUMBERS)
+def test_number_formatting(bits, expected):
+    value = struct.unpack(">d", bytes.fromhex(bits))[0]
+    assert format_number(value) == expected
+
+
+def test_rfc_example():
+    data = {
+        "numbers": [333333333.33333329, 1e30, 4.50, 2e-3, 0.000000000000000000000000001],
+        "string": "\u20ac$\u000f\u000aA'\u0042\u0022\u005c\\\"/",
+        "literals": [None, True, False],
+    }
+    expected = (
+        r'''{"literals":[null,true,false],"numbers":[333333333.3333333,1e+30,4.5,0.002,1e-27],'''
+        r'''"string":"€$\u000f\nA'B\"\\\\\"/"}'''
+    )
+    assert canonicalize(data) == expected.encode("utf-8")
+
+
+def test_utf16_key_order():
+    data = {
+        "€": "Euro Sign",
+        "\r": "Carriage Return",
+        "דּ": "Hebrew Letter Dalet With Dagesh",
+        "1": "One",
+        "\U0001f600": "Emoji: Grinning Face",
+        "\u0080": "Control",
+        "ö": "Latin Small Letter O With Diaeresis",
+    }
+    order = [value for value in canonicalize(data).decode("utf-8").split('"')[3::4]]
+    assert order == [
+        "Carriage Return", "One", "Control", "Latin Small Letter O With Diaeresis",
+        "Euro Sign", "Emoji: Grinning Face", "Hebrew Letter Dalet With Dagesh",
+    ]
+
+
+def test_rejects_non_json():
+    for value in (float("nan"), float("inf"), 2 ** 60 + 1):
+        with pytest.raises(ValueError):
+            canonicalize([value])
+    with pytest.raises(TypeError):
+        canonicalize({1: "a", "b": 2})
+    with pytest.raises(TypeError):
+        canonicalize({"a": object()})
+    assert canonicalize(2 ** 60) == b"1152921504606847000"
+    assert digest({}) == "44136fa355b3678a1146ad16f7e8649e94fb4fc21fe77e8310c060f61caaff8a"
+
+
+@pytest.mark.parametrize("value", [
+    {"b": [1.0, -0.0, 1e21, 1e-7, 0.1, 2 ** 53, 2 ** 54, 1234567890123456], "a": "x1.0e5"},
+    {"\ue000": 1, "\U0001f600": 2, "z": 3},
+    {"text": "1.0 and 1e5 in a string \"1.0\"", "n": [10.0, 10.05, 3.0e-5]},
+    [None, True, False, "", {}, []],
+])
+def test_fast_path_matches_reference(value):
+    assert canonicalize(value) == JCSEncoder().encode(value)
+
+
+def test_envelope_memoizes_canonical_bytes(key_pair, builder_defaults, valid_payload_data):
+    builder = PCLMessageBuilder(**builder_defaults)
+    builder.set_content(**valid_payload_data)
+    builder.sign(Signer(key_pair))
+    envelope = next(n for n in builder.build().graph if isinstance(n, PCLEnvelope))
+
+    first = envelope.canonical_bytes()
+    assert first == canonicalize(envelope.signing_dict())
+    assert envelope.canonical_bytes() is first
+    assert envelope.canonical_digest() == digest(envelope.signing_dict())
+
+    # the signature covers exactly these bytes
+    assert Signer(key_pair).sign(envelope) == envelope.authz.jws
+
+    envelope.authz = None
+    assert envelope.canonical_bytes() is first
+
+    envelope.project = "doi:10.1234/other"
+    assert envelope.canonical_bytes() != first
+    assert envelope.canonical_digest() == digest(envelope.signing_dict())
+
+    copied = envelope.model_copy(update={"sample": "igsn:OTHER123"})
+    assert b"igsn:OTHER123" in copied.canonical_bytes()
+
+    envelope.capabilities.append("extra")
+    envelope.invalidate_canonical()
+    assert b"extra" in envelope.canonical_bytes()
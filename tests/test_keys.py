@@ -0,0 +1,247 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+from jwcrypto import jwk
+
+from pcl_exchange.builder import PCLMessageBuilder
+from pcl_exchange.crypto import Signer, Verifier, canonicalize
+from pcl_exchange.keys import DidWebBackend, JWKSFile, KeyLookupError, KeyResolver
+from pcl_exchange.models import PCLEnvelope
+from pcl_exchange.receiver import verify_stage
+from pcl_exchange.validation import validate_message
+
+SENDER = "https://ror.org/03yrm5c26"
+RECEIVER = "https://ror.org/01bj3aw27"
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def did_server():
+    """Serves DID documents from a dict of path -> document on localhost, counting requests."""
+    documents, requests = {}, []
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            requests.append(self.path)
+            document = documents.get(self.path)
+            body = json.dumps(document).encode() if document is not None else b"{}"
+            self.send_response(200 if document is not None else 404)
+            self.send_header("Content-Type", "application/did+json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    host = f"127.0.0.1%3A{server.server_address[1]}"
+    yield host, documents, requests
+    server.shutdown()
+    server.server_close()
+
+
+def _public(key):
+    return key.export_public(as_dict=True)
+
+
+def _envelope(key, kid=None, sender=SENDER):
+    builder = PCLMessageBuilder(sender, RECEIVER)
+    builder.set_content(
+        "urn:aimd:instrument:proto-xrd-01", "igsn:XYZ12345",
+        "urn:aimd:method:xrd:powder:theta-2theta:v1", {"step": {"val": 0.02, "unit": "deg"}},
+    )
+    builder.add_capability("xrd.powder.theta-2theta")
+    builder.sign(Signer(key, kid=kid))
+    return json.loads(builder.build().to_json())
+
+
+def _model_envelope(key, kid=None):
+    builder = PCLMessageBuilder(SENDER, RECEIVER)
+    builder.set_content(
+        "urn:aimd:instrument:proto-xrd-01", "igsn:XYZ12345",
+        "urn:aimd:method:xrd:powder:theta-2theta:v1", {"step": {"val": 0.02, "unit": "deg"}},
+    )
+    builder.sign(Signer(key, kid=kid))
+    return builder.build().graph[2]
+
+
+def test_file_backend(tmp_path, key_pair):
+    other = jwk.JWK.generate(kty="OKP", crv="Ed25519")
+    path = tmp_path / "peers.json"
+    path.write_text(json.dumps({
+        SENDER: dict(_public(key_pair), kid="lab-a-1"),
+        "https://orcid.org/0000-0002-1825-0097": {"keys": [_public(other)]},
+        "keys": [dict(_public(other), kid="person-1")],
+    }))
+    resolver = KeyResolver([JWKSFile(path)])
+
+    envelope = _envelope(key_pair)["@graph"][2]
+    assert resolver.check(envelope).valid
+    # PCLEnvelope models as well as their JSON form
+    assert resolver.check(PCLEnvelope.model_validate(envelope)).valid
+    assert resolver.check(_model_envelope(key_pair, kid="lab-a-1")).valid
+    assert resolver.verify(envelope)
+    assert validate_message(_envelope(key_pair), verifier=resolver, fast=True) == (True, None)
+    assert resolver.resolve("person-1").key_id == "person-1"
+    # keys in the JWKS are found by thumbprint too
+    assert resolver.resolve(other.thumbprint()).key_id == "person-1"
+
+    forged = _envelope(other)["@graph"][2]
+    assert resolver.check(forged).reason == "Signature does not match."
+    unknown = _envelope(key_pair, sender="https://ror.org/05gq02987")["@graph"][2]
+    assert not resolver.check(unknown).valid
+    with pytest.raises(KeyLookupError):
+        resolver.resolve("https://ror.org/05gq02987")
+
+    assert verify_stage(envelope, RECEIVER, resolver) is None
+    assert verify_stage(forged, RECEIVER, resolver).code == "UNAUTHORIZED"
+    stats = resolver.stats()
+    assert stats.lookups == 4 and stats.negative_hits == 1
+
+
+def test_did_web(did_server, tmp_path, key_pair):
+    host, documents, requests = did_server
+    did = f"did:web:{host}:labs:a"
+    rotated = jwk.JWK.generate(kty="OKP", crv="Ed25519")
+    documents["/labs/a/did.json"] = {
+        "id": did,
+        "verificationMethod": [
+            {"id": "#key-1", "type": "JsonWebKey2020", "controller": did, "publicKeyJwk": _public(key_pair)},
+            {"id": f"{did}#key-2", "type": "JsonWebKey2020", "controller": did, "publicKeyJwk": _public(rotated)},
+        ],
+    }
+    path = tmp_path / "peers.json"
+    path.write_text(json.dumps({SENDER: did}))
+    resolver = KeyResolver([JWKSFile(path), DidWebBackend(scheme="http")])
+
+    assert resolver.check(_envelope(key_pair)["@graph"][2]).valid
+    assert resolver.check(_envelope(rotated)["@graph"][2]).valid
+    assert resolver.check(_envelope(key_pair, kid=f"{did}#key-1")["@graph"][2]).valid
+    # a kid picks the key, and must be one of the sender's own
+    assert resolver.check(_envelope(key_pair, kid=f"{did}#key-2")["@graph"][2]).reason == "Signature does not match."
+    assert not resolver.check(_envelope(key_pair, kid="did:web:elsewhere#key-1")["@graph"][2]).valid
+    assert resolver.resolve(f"{did}#key-2").key_id == f"{did}#key-2"
+    assert requests == ["/labs/a/did.json", "/labs/a/did.json"]
+
+    assert DidWebBackend().url("did:web:example.org") == "https://example.org/.well-known/did.json"
+    missing = KeyResolver([DidWebBackend(scheme="http")])
+    with pytest.raises(KeyLookupError, match="No key known"):
+        missing.resolve(f"did:web:{host}:labs:b")
+
+
+def test_ttl_and_negative_caching():
+    clock = FakeClock()
+    key = _public(jwk.JWK.generate(kty="OKP", crv="Ed25519"))
+    table, calls = {}, []
+
+    class Backend:
+        def lookup(self, reference):
+            calls.append(reference)
+            if reference == "broken":
+                raise ConnectionError("host down")
+            return table.get(reference)
+
+    resolver = KeyResolver([Backend()], ttl=100, negative_ttl=10, clock=clock)
+    with pytest.raises(KeyLookupError):
+        resolver.resolve("a")
+    table["a"] = key
+    with pytest.raises(KeyLookupError):
+        resolver.resolve("a")
+    with pytest.raises(KeyLookupError, match="host down"):
+        resolver.resolve("broken")
+    assert calls == ["a", "broken"]
+
+    clock.now = 10
+    verifier = resolver.resolve("a")
+    clock.now = 50
+    assert resolver.resolve("a") is verifier
+    clock.now = 111
+    table["a"] = dict(key, kid="renamed")
+    assert resolver.resolve("a").key_id == "renamed"
+    assert calls == ["a", "broken", "a", "a"]
+
+    resolver.invalidate("a")
+    resolver.resolve("a")
+    assert calls[-1] == "a" and len(calls) == 5
+
+
+def test_concurrent_lookups_share_one_call():
+    key = _public(jwk.JWK.generate(kty="OKP", crv="Ed25519"))
+    calls = []
+    release = threading.Event()
+
+    class SlowBackend:
+        def lookup(self, reference):
+            calls.append(reference)
+            release.wait(5)
+            return key
+
+    resolver = KeyResolver([SlowBackend()])
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(resolver.resolve("peer"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    while resolver.stats().coalesced < 7:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert calls == ["peer"]
+    assert len(results) == 8 and all(result is results[0] for result in results)
+
+
+def test_keys_are_parsed_once_across_peers():
+    key = _public(jwk.JWK.generate(kty="OKP", crv="Ed25519"))
+    peers = {f"https://ror.org/0{i:08d}": key for i in range(50)}
+
+    class Backend:
+        def lookup(self, reference):
+            return peers.get(reference)
+
+    resolver = KeyResolver([Backend()], max_entries=10)
+    verifiers = {resolver.resolve(peer) for peer in peers}
+    assert len(verifiers) == 1
+    stats = resolver.stats()
+    assert (stats.entries, stats.keys) == (10, 1)
+
+
+def test_signer_kid(key_pair):
+    signed = _envelope(key_pair, kid="lab-a-1")["@graph"][2]
+    header = json.loads(jwk.base64url_decode(signed["authz"]["jws"].split(".")[0]))
+    assert header == {"alg": "EdDSA", "kid": "lab-a-1"}
+    assert Verifier(key_pair).check(signed).valid
+    # the jwcrypto path accepts the same header
+    assert Verifier(jwk.JWK(**_public(key_pair)))._verify_jwcrypto(signed["authz"]["jws"], canonicalize(signed)).valid
+
+
+def test_rotated_keys_are_released():
+    clock = FakeClock()
+    current = {}
+
+    class RotatingBackend:
+        def lookup(self, reference):
+            return current.get(reference)
+
+    resolver = KeyResolver([RotatingBackend()], ttl=10, max_entries=4, clock=clock)
+    for _ in range(20):
+        current["peer"] = _public(jwk.JWK.generate(kty="OKP", crv="Ed25519"))
+        resolver.resolve("peer")
+        clock.now += 11
+    # only the key of the cached entry is still held
+    assert resolver.stats().keys == 1
+    resolver.invalidate()
+    assert resolver.stats().keys == 0
@@ -0,0 +1,89 @@
+import json
+
+from pcl_exchange import metrics
+from pcl_exchange.builder import PCLMessageBuilder
+from pcl_exchange.crypto import Signer, Verifier
+from pcl_exchange.metrics import Histogram, MetricsRecorder, recording, span
+from pcl_exchange.validation import validate_semantics, validate_structure
+
+
+def _message(builder_defaults, valid_payload_data, key_pair):
+    builder = PCLMessageBuilder(**builder_defaults)
+    builder.set_content(**valid_payload_data)
+    builder.add_capability("xrd.powder.theta-2theta")
+    builder.sign(Signer(key_pair))
+    return builder.build()
+
+
+def test_disabled_spans_are_shared_noops():
+    assert not metrics.enabled()
+    assert span("a") is span("b")
+    with span("a"):
+        pass
+
+
+def test_records_library_stages(builder_defaults, valid_payload_data, key_pair):
+    with recording() as recorder:
+        message = _message(builder_defaults, valid_payload_data, key_pair)
+        document = json.loads(message.to_json())
+        assert Verifier(key_pair).verify(document["@graph"][2])
+        assert validate_structure(document["@graph"][2]) == (True, None)
+        assert validate_semantics(document, fast=True)[0]
+        assert validate_semantics(document)[0]
+    assert not metrics.enabled()
+
+    stages = recorder.to_dict()
+    for stage in (
+        "build", "build.content", "build.envelope", "build.message",
+        "sign", "sign.canonicalize", "sign.signature",
+        "verify", "verify.canonicalize", "verify.signature",
+        "validate_structure", "validate_structure.schema_load", "validate_structure.validate",
+        "validate_semantics", "validate_semantics.compiled", "validate_semantics.parse",
+        "validate_semantics.shapes_load", "validate_semantics.shacl",
+    ):
+        assert stage in stages, stage
+    assert stages["validate_semantics"]["count"] == 2
+    assert stages["sign"]["count"] == 1
+    # nested stages fit inside their parent
+    assert stages["validate_semantics.shacl"]["sum"] <= stages["validate_semantics"]["sum"]
+
+    # nothing is recorded once the block is left
+    validate_structure(document["@graph"][2])
+    assert recorder["validate_structure"].count == 1
+
+
+def test_histogram_summary():
+    histogram = Histogram((0.001, 0.01, 0.1))
+    for value in (0.0005, 0.002, 0.003, 0.05, 0.5):
+        histogram.observe(value)
+
+    summary = histogram.to_dict()
+    assert summary["count"] == 5
+    assert summary["buckets"] == {"0.001": 1, "0.01": 3, "0.1": 4, "+Inf": 5}
+    assert summary["min"] == 0.0005 and summary["max"] == 0.5
+    assert 0.001 <= histogram.quantile(0.5) <= 0.01
+    assert histogram.quantile(1.0) == 0.5
+    assert Histogram().quantile(0.5) == 0.0
+
+
+def test_prometheus_text():
+    recorder = MetricsRecorder(buckets=(0.01, 0.1))
+    metrics.add_hook(recorder)
+    try:
+        with span("sign"):
+            pass
+        recorder('odd "stage"', 0.05)
+    finally:
+        metrics.remove_hook(recorder)
+
+    lines = recorder.to_prometheus().splitlines()
+    assert lines[:2] == [
+        "# HELP pcl_exchange_stage_seconds Time spent in each pcl-exchange stage.",
+        "# TYPE pcl_exchange_stage_seconds histogram",
+    ]
+    assert 'pcl_exchange_stage_seconds_bucket{stage="sign",le="+Inf"} 1' in lines
+    assert 'pcl_exchange_stage_seconds_count{stage="sign"} 1' in lines
+    assert 'pcl_exchange_stage_seconds_bucket{stage="odd \\"stage\\"",le="0.01"} 0' in lines
+
+    recorder.reset()
+    assert recorder.to_dict() == {}
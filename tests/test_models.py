@@ -0,0 +1,65 @@
+import json
+
+import pytest
+from pydantic import ValidationError
+
+from pcl_exchange.builder import PCLMessageBuilder
+from pcl_exchange.crypto import Signer
+from pcl_exchange.models import LazyPCLMessage, PCLActionContent, PCLEnvelope, PCLMessage
+
+
+@pytest.fixture
+def crate(builder_defaults, valid_payload_data, key_pair):
+    builder = PCLMessageBuilder(**builder_defaults)
+    builder.set_content(**valid_payload_data)
+    builder.add_capability("xrd.powder.theta-2theta")
+    builder.sign(Signer(key_pair))
+    message = builder.build()
+    message.graph.append({"@id": "#criteria", "@type": "CreativeWork", "text": "SNR >= 20"})
+    return message.to_json().encode()
+
+
+def test_from_json_bytes_round_trip(crate):
+    message = PCLMessage.from_json_bytes(crate)
+    assert [type(n).__name__ for n in message.graph] == [
+        "ROCrateMetadata", "ROCrateRoot", "PCLEnvelope", "PCLActionContent", "dict"
+    ]
+    assert message.to_json().encode() == crate
+
+
+def test_malformed_envelope_is_rejected(crate):
+    """A broken envelope used to be accepted as a plain dict node."""
+    document = json.loads(crate)
+    document["@graph"][2]["sender"] = "not-a-ror"
+    with pytest.raises(ValidationError):
+        PCLMessage.from_json_bytes(json.dumps(document))
+    with pytest.raises(ValidationError):
+        PCLMessage.model_validate(document)
+
+
+def test_lazy_defers_content(crate):
+    document = json.loads(crate)
+    document["@graph"][3]["parameter"] = "not-a-list"
+
+    lazy = PCLMessage.from_json_bytes(json.dumps(document), lazy=True)
+    assert isinstance(lazy, LazyPCLMessage)
+    assert isinstance(lazy.envelope, PCLEnvelope)
+    assert lazy.envelope.sample == "igsn:XYZ12345"
+
+    # the broken content node only fails once it is needed
+    with pytest.raises(ValidationError):
+        lazy.content
+
+
+def test_lazy_load_matches_eager(crate):
+    lazy = PCLMessage.from_json_bytes(crate, lazy=True)
+    content = lazy.content
+    assert isinstance(content, PCLActionContent)
+
+    message = lazy.load()
+    assert message.graph[2] is lazy.envelope
+    assert message.graph[3] is content
+    assert message == PCLMessage.from_json_bytes(crate)
+
+    with pytest.raises(ValueError):
+        PCLMessage.from_json_bytes(b'{"@context": [], "@graph": []}', lazy=True)
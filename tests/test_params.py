@@ -0,0 +1,80 @@
+import json
+import pickle
+from array import array
+
+import pytest
+from rdflib.compare import isomorphic
+
+from pcl_exchange.builder import PCLMessageBuilder
+from pcl_exchange.models import PCLMessage, PropertyValue
+from pcl_exchange.params import ParameterTable
+from pcl_exchange.validation import validate_semantics
+
+MIXED = {
+    "step": {"val": 0.02, "unit": "deg"},
+    "count": {"val": 3},
+    "label": {"val": "fast"},
+    "spin": {"val": True, "unit": "rpm"},
+    "huge": {"val": 2 ** 70, "unit": "deg"},
+}
+
+
+def _builder(builder_defaults, valid_payload_data, params):
+    builder = PCLMessageBuilder(**builder_defaults)
+    builder.set_content(**dict(valid_payload_data, params=params))
+    builder.add_capability("xrd.powder.theta-2theta")
+    return builder
+
+
+@pytest.mark.parametrize("params", [MIXED, {f"x{i}": {"val": i * 0.25, "unit": "mm"} for i in range(40)}])
+def test_table_serializes_like_property_values(builder_defaults, valid_payload_data, params):
+    models = _builder(builder_defaults, valid_payload_data, params)
+    table = _builder(builder_defaults, valid_payload_data, ParameterTable.from_params(params))
+    table.envelope_uuid, table.creation_timestamp = models.envelope_uuid, models.creation_timestamp
+
+    assert isinstance(table.payload.parameters, ParameterTable)
+    assert table.build().to_json() == models.build().to_json()
+    assert table.build().to_bytes() == models.build().to_bytes()
+    assert isomorphic(table.build().to_graph(), models.build().to_graph())
+
+    # a received copy holds PropertyValue models again
+    received = PCLMessage.from_json_bytes(table.build().to_json())
+    assert received.graph[3].parameters == list(table.payload.parameters)
+
+
+def test_columns():
+    floats = ParameterTable(["a", "b"], [1.5, True], units="mm")
+    assert floats.values == array("d", [1.5, 1.0])
+    assert floats.units == [None, "mm"] and list(floats.unit_codes) == [1, 1]
+
+    ints = ParameterTable(["a", "b", "c"], array("q", [1, 2, 3]), units=["mm", None, "mm"])
+    assert ints.values.typecode == "q"
+    assert list(ints.rows()) == [("a", 1, "mm"), ("b", 2, None), ("c", 3, "mm")]
+    assert ints[1] == PropertyValue(name="b", value=2)
+    assert [pv.unit_text for pv in ints] == ["mm", None, "mm"]
+    assert pickle.loads(pickle.dumps(ints)) == ints
+
+    assert ParameterTable([], []).to_jsonld() == []
+    with pytest.raises(ValueError):
+        ParameterTable(["a"], [1, 2])
+    with pytest.raises(ValueError):
+        ParameterTable(["a"], [1], units=["mm", "mm"])
+    with pytest.raises(TypeError):
+        ParameterTable([1], [1])
+    with pytest.raises(TypeError, match="NoneType"):
+        ParameterTable(["a"], [None])
+    with pytest.raises(TypeError):
+        ParameterTable(["a"], [1], units=[3])
+
+
+def test_table_content_validates(builder_defaults, valid_payload_data):
+    names = [f"position.{i}" for i in range(50)]
+    table = ParameterTable(names, [i * 0.1 for i in range(50)], units="mm")
+    message = _builder(builder_defaults, valid_payload_data, table).build()
+
+    for fast in (True, False):
+        assert validate_semantics(message, fast=fast)[0]
+        assert validate_semantics(json.loads(message.to_json()), fast=fast)[0]
+    assert not validate_semantics(
+        _builder(builder_defaults, valid_payload_data, ParameterTable([], [])).build(), fast=True
+    )[0]
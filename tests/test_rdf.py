@@ -0,0 +1,101 @@
+import json
+
+from rdflib import Graph
+from rdflib.compare import isomorphic
+
+from pcl_exchange import rdf
+from pcl_exchange.builder import PCLMessageBuilder
+from pcl_exchange.contexts import ContextLoader, default_loader
+from pcl_exchange.crypto import Signer
+from pcl_exchange.rdf import CRATE_BASE, message_to_graph
+from pcl_exchange.validation import validate_semantics
+
+
+def _parse_jsonld(message):
+    document = default_loader.resolve(json.loads(message.to_json()))
+    return Graph().parse(data=json.dumps(document), format="json-ld", base=CRATE_BASE)
+
+
+def _build(builder_defaults, valid_payload_data, key_pair=None):
+    builder = PCLMessageBuilder(**builder_defaults)
+    builder.set_content(**valid_payload_data)
+    builder.add_capability("xrd.powder.theta-2theta")
+    if key_pair is not None:
+        builder.sign(Signer(key_pair))
+    return builder.build()
+
+
+def _no_fallback(*args, **kwargs):
+    raise AssertionError("direct conversion fell back to the JSON-LD parser")
+
+
+def test_to_graph_isomorphic_to_jsonld(builder_defaults, valid_payload_data, key_pair, monkeypatch):
+    """Direct conversion must produce the same triples as the JSON-LD parse."""
+    valid_payload_data["params"]["count"] = {"val": 5}
+    valid_payload_data["params"]["flag"] = {"val": "on", "unit": None}
+    message = _build(builder_defaults, valid_payload_data, key_pair)
+
+    monkeypatch.setattr(rdf, "_parse_jsonld", _no_fallback)
+    direct = message.to_graph()
+    monkeypatch.undo()
+    parsed = _parse_jsonld(message)
+
+    assert len(direct) == len(parsed)
+    assert isomorphic(direct, parsed)
+
+
+def test_dict_nodes_isomorphic(builder_defaults, valid_payload_data, monkeypatch):
+    """Extra graph nodes kept as plain dicts go through the generic emitter."""
+    message = _build(builder_defaults, valid_payload_data)
+    message.graph.append({
+        "@id": "#criteria",
+        "@type": "CreativeWork",
+        "text": "SNR >= 20",
+        "about": [{"@id": "#content"}, {"@id": "prov:foo"}],
+        "undefinedTerm": "dropped",
+    })
+
+    monkeypatch.setattr(rdf, "_parse_jsonld", _no_fallback)
+    direct = message_to_graph(message)
+    monkeypatch.undo()
+    assert isomorphic(direct, _parse_jsonld(message))
+
+
+def test_unsupported_node_falls_back(builder_defaults, valid_payload_data):
+    message = _build(builder_defaults, valid_payload_data)
+    message.graph.append({
+        "@id": "#list",
+        "@type": "CreativeWork",
+        "name": {"@value": "typed", "@language": "en"},
+    })
+
+    assert isomorphic(message_to_graph(message), _parse_jsonld(message))
+
+
+def test_validate_semantics_accepts_message(builder_defaults, valid_payload_data):
+    message = _build(builder_defaults, valid_payload_data)
+    conforms, report = validate_semantics(message)
+    assert conforms, report
+
+    message.graph[3].parameters = []
+    conforms, report = validate_semantics(message)
+    assert not conforms
+    assert "parameter" in report
+
+
+def test_term_maps_are_bounded(builder_defaults, valid_payload_data):
+    """Inbound documents with ever-changing contexts do not grow the term map cache."""
+    document = json.loads(_build(builder_defaults, valid_payload_data).to_json())
+    for i in range(rdf.MAX_TERM_MAPS + 20):
+        document["@context"][1][f"x{i}"] = f"https://example.org/x{i}"
+        assert rdf.triples(document)
+    assert len(rdf._term_maps) == rdf.MAX_TERM_MAPS
+
+
+def test_term_maps_follow_the_loader():
+    """Two loaders resolving one context URL differently get their own term maps."""
+    document = {"@context": "https://example.org/context", "@graph": [{"@id": "#a", "name": "x"}]}
+    first = ContextLoader(fetch=lambda url: {"@context": {"name": "http://schema.org/name"}})
+    second = ContextLoader(fetch=lambda url: {"@context": {"name": "http://xmlns.com/foaf/0.1/name"}})
+    assert {str(p) for _, p, _ in rdf.triples(document, context_loader=first)} == {"http://schema.org/name"}
+    assert {str(p) for _, p, _ in rdf.triples(document, context_loader=second)} == {"http://xmlns.com/foaf/0.1/name"}
@@ -0,0 +1,226 @@
+import asyncio
+import json
+
+import pytest
+from jwcrypto import jwk
+
+from pcl_exchange.builder import PCLMessageBuilder, PCLReplyBuilder
+from pcl_exchange.crypto import Signer, Verifier
+from pcl_exchange.models import ACTION_FAILED, PCLError, PCLMessage, PCLReplyContent
+from pcl_exchange.receiver import ReceiverPipeline
+from pcl_exchange.registry import default_registry
+from pcl_exchange.replay import ReplayGuard
+
+
+@pytest.fixture(scope="module")
+def receiver_key():
+    return jwk.JWK.generate(kty="OKP", crv="Ed25519")
+
+
+def _message(
+    builder_defaults, valid_payload_data, key_pair, params=None, capability="xrd.powder.theta-2theta", encoding="identity"
+):
+    builder = PCLMessageBuilder(**builder_defaults)
+    payload = dict(valid_payload_data)
+    if params is not None:
+        payload["params"] = params
+    builder.set_content(**payload)
+    builder.add_capability(capability)
+    builder.set_encoding(encoding)
+    builder.sign(Signer(key_pair))
+    return builder.build()
+
+
+def _run(coroutine):
+    return asyncio.run(coroutine)
+
+
+async def _receive_all(pipeline, items):
+    async with pipeline:
+        futures = [await pipeline.submit(item) for item in items]
+        return await asyncio.gather(*futures)
+
+
+def _pipeline(builder_defaults, key_pair, receiver_key, **kwargs):
+    return ReceiverPipeline(
+        builder_defaults["receiver_id"],
+        signer=Signer(receiver_key),
+        verifier={builder_defaults["sender_id"]: Verifier(key_pair)},
+        **kwargs,
+    )
+
+
+def test_accepted_message_is_acked(builder_defaults, valid_payload_data, key_pair, receiver_key):
+    message = _message(builder_defaults, valid_payload_data, key_pair, encoding="gzip")
+    pipeline = _pipeline(builder_defaults, key_pair, receiver_key)
+    (result,) = _run(_receive_all(pipeline, [message.to_bytes()]))
+
+    assert result.accepted and result.error is None
+    assert result.identifier == message.graph[2].identifier
+    assert result.document["@graph"][3]["@id"] == "#content"
+
+    reply = result.reply
+    envelope = reply.graph[2]
+    assert envelope.action == "ack"
+    assert envelope.receiver == builder_defaults["sender_id"]
+    assert isinstance(reply.graph[3], PCLReplyContent)
+    assert reply.graph[3].object == {"@id": message.graph[2].identifier}
+    # the reply is signed by the receiver and passes the envelope schema
+    document = json.loads(reply.to_json())
+    assert Verifier(receiver_key).check(document["@graph"][2]).valid
+    assert default_registry.get_validator("envelope.json").is_valid(document["@graph"][2])
+    assert isinstance(PCLMessage.from_bytes(reply.to_bytes()).graph[3], PCLReplyContent)
+
+
+def test_rejections_are_nacked(builder_defaults, valid_payload_data, key_pair, receiver_key):
+    good = _message(builder_defaults, valid_payload_data, key_pair)
+    forged = json.loads(good.to_json())
+    forged["@graph"][2]["project"] = "doi:10.1234/other"
+    bad_capability = _message(builder_defaults, valid_payload_data, key_pair, capability="XRD")
+    no_params = _message(builder_defaults, valid_payload_data, key_pair, params={})
+    other_receiver = PCLMessageBuilder(builder_defaults["sender_id"], "https://ror.org/02mhbdp94")
+    other_receiver.set_content(**valid_payload_data)
+    other_receiver.add_capability("xrd.powder.theta-2theta")
+    stranger = json.loads(good.to_json())
+    stranger["@graph"][2]["sender"] = "https://ror.org/02mhbdp94"
+    # signed without a contentDigest, so the edited content is not covered
+    unbound = json.loads(good.to_json())
+    del unbound["@graph"][2]["contentDigest"]
+    unbound["@graph"][2]["authz"]["jws"] = Signer(key_pair).sign(unbound["@graph"][2])
+    unbound["@graph"][3]["parameter"][0]["value"] = "10 90"
+
+    items = [
+        forged, bad_capability.to_bytes(), no_params.to_bytes(), other_receiver.build().to_bytes(), stranger,
+        b"\x00garbage", unbound,
+    ]
+    pipeline = _pipeline(builder_defaults, key_pair, receiver_key)
+    results = _run(_receive_all(pipeline, items))
+
+    assert not any(result.accepted for result in results)
+    assert [result.error.code for result in results] == [
+        "UNAUTHORIZED", "SCHEMA_MISMATCH", "SCHEMA_MISMATCH", "FORBIDDEN", "UNAUTHORIZED", "INVALID_ENVELOPE",
+        "UNAUTHORIZED",
+    ]
+    assert "no contentDigest" in results[6].error.reason
+    assert results[1].error.faults[0].path == "/capabilities/0"
+    assert results[1].error.http_status == 422
+    assert results[2].error.details == {"shapes": "shapes/measurement_request.ttl"}
+
+    nack = results[0].reply
+    assert nack.graph[2].action == "nack"
+    assert nack.graph[3].action_status == ACTION_FAILED
+    error = json.loads(nack.to_json())["@graph"][3]["error"]
+    assert error["correlationId"] == forged["@graph"][2]["identifier"]
+    assert default_registry.get_validator("error.json").is_valid(error)
+    # nothing to answer when the envelope cannot be read
+    assert results[5].reply is None and results[5].identifier is None
+
+
+def test_replays_and_unsupported_actions(builder_defaults, valid_payload_data, key_pair, receiver_key):
+    data = _message(builder_defaults, valid_payload_data, key_pair).to_bytes()
+    pipeline = _pipeline(builder_defaults, key_pair, receiver_key, replay_guard=ReplayGuard())
+    results = _run(_receive_all(pipeline, [data, data]))
+    # two verify workers race, whichever copy comes second is the replay
+    assert sorted(result.error.code if result.error else "OK" for result in results) == ["CONFLICT", "OK"]
+
+    pipeline = _pipeline(builder_defaults, key_pair, receiver_key, shapes={"register_data": None})
+    (result,) = _run(_receive_all(pipeline, [data]))
+    assert result.error.code == "UNSUPPORTED_ACTION"
+
+
+
+def test_replies_are_accepted_without_answer(builder_defaults, valid_payload_data, key_pair, receiver_key):
+    request = json.loads(_message(builder_defaults, valid_payload_data, key_pair).to_bytes())["@graph"][2]
+    # the receiving PCL answers the request, the original sender takes in the ack and the nack
+    ack = PCLReplyBuilder(builder_defaults["receiver_id"], request)
+    ack.sign(Signer(receiver_key))
+    nack = PCLReplyBuilder(builder_defaults["receiver_id"], request)
+    nack.reject(PCLError.create("TEMPORARY_FAILURE", "detector offline"))
+    nack.sign(Signer(receiver_key))
+
+    pipeline = ReceiverPipeline(
+        builder_defaults["sender_id"],
+        verifier={builder_defaults["receiver_id"]: Verifier(receiver_key)},
+    )
+    results = _run(_receive_all(pipeline, [ack.build().to_bytes(), nack.build().to_bytes()]))
+    assert [result.accepted for result in results] == [True, True]
+    assert results[0].document["@graph"][2]["action"] == "ack"
+    # acks and nacks are not answered with another ack
+    assert all(result.reply is None for result in results)
+
+
+def test_backpressure_and_stats(builder_defaults, valid_payload_data, key_pair, receiver_key):
+    items = [_message(builder_defaults, valid_payload_data, key_pair).to_bytes() for _ in range(20)]
+    pipeline = _pipeline(
+        builder_defaults, key_pair, receiver_key, queue_size=1,
+        concurrency={"parse": 1, "verify": 1, "schema": 1, "shacl": 1, "reply": 1},
+    )
+    depths = []
+
+    async def scenario():
+        async with pipeline:
+            futures = []
+            for item in items:
+                futures.append(await pipeline.submit(item))
+                depths.append(max(pipeline.stats().queue_depths.values()))
+            return await asyncio.gather(*futures)
+
+    results = _run(scenario())
+    stats = pipeline.stats()
+    assert all(result.accepted for result in results)
+    # no queue ever holds more than one waiting message
+    assert max(depths) <= 1
+    assert (stats.received, stats.accepted, stats.rejected, stats.in_flight) == (20, 20, 0, 0)
+    assert stats.messages_per_second > 0
+
+    with pytest.raises(ValueError):
+        ReceiverPipeline(builder_defaults["receiver_id"], concurrency={"nope": 1})
+
+
+async def _http_stand_in(pipeline, reader, writer):
+    # a minimal HTTP/1.1 endpoint: POST a crate, get the reply crate back
+    head = await reader.readuntil(b"\r\n\r\n")
+    length = next(
+        int(line.split(b":", 1)[1]) for line in head.split(b"\r\n") if line.lower().startswith(b"content-length")
+    )
+    result = await pipeline.receive(await reader.readexactly(length))
+    status = 202 if result.accepted else result.error.http_status
+    body = result.reply.to_bytes() if result.reply is not None else result.error.model_dump_json(by_alias=True).encode()
+    writer.write(b"HTTP/1.1 %d X\r\nContent-Length: %d\r\n\r\n" % (status, len(body)) + body)
+    await writer.drain()
+    writer.close()
+
+
+async def _post(port, body):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    writer.write(b"POST /inbox HTTP/1.1\r\nContent-Length: %d\r\n\r\n" % len(body) + body)
+    await writer.drain()
+    head = await reader.readuntil(b"\r\n\r\n")
+    status = int(head.split()[1])
+    length = int(head.split(b"Content-Length:")[1].split(b"\r\n")[0])
+    body = await reader.readexactly(length)
+    writer.close()
+    return status, body
+
+
+def test_http_stand_in(builder_defaults, valid_payload_data, key_pair, receiver_key):
+    good = _message(builder_defaults, valid_payload_data, key_pair, encoding="gzip").to_bytes()
+    bad = _message(builder_defaults, valid_payload_data, key_pair, capability="XRD").to_bytes()
+
+    async def scenario():
+        async with _pipeline(builder_defaults, key_pair, receiver_key) as pipeline:
+            server = await asyncio.start_server(
+                lambda r, w: _http_stand_in(pipeline, r, w), "127.0.0.1", 0
+            )
+            port = server.sockets[0].getsockname()[1]
+            async with server:
+                return await asyncio.gather(_post(port, good), _post(port, bad), _post(port, b"{}"))
+
+    (ok_status, ack), (bad_status, nack), (empty_status, error) = _run(scenario())
+    assert ok_status == 202 and PCLMessage.from_bytes(ack).graph[2].action == "ack"
+    assert bad_status == 422 and PCLMessage.from_bytes(nack).graph[3].error.code == "SCHEMA_MISMATCH"
+    assert empty_status == 400 and PCLError.model_validate_json(error).code == "INVALID_ENVELOPE"
+
+
+def test_close_without_start(builder_defaults, key_pair, receiver_key):
+    _run(_pipeline(builder_defaults, key_pair, receiver_key).close())
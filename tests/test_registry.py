@@ -0,0 +1,143 @@
+import json
+import threading
+
+import pytest
+from rdflib import Graph
+
+from pcl_exchange.builder import PCLMessageBuilder
+from pcl_exchange.registry import SchemaRegistry
+from pcl_exchange.validation import validate_semantics, validate_structure
+
+
+def test_schema_compiled_once():
+    """Repeated lookups should return the same compiled validator."""
+    calls = []
+
+    def loader(filename):
+        calls.append(filename)
+        from pcl_exchange.validation import get_schema_text
+        return get_schema_text(filename)
+
+    registry = SchemaRegistry(loader=loader)
+    first = registry.get_validator("envelope.json")
+    second = registry.get_validator("envelope.json")
+
+    assert first is second
+    assert calls == ["envelope.json"]
+
+    # the compiled validator is used by validate_structure
+    valid, err = validate_structure({}, registry=registry)
+    assert not valid
+    assert "required" in err
+    assert calls == ["envelope.json"]
+
+
+def test_shapes_eviction():
+    """The least recently used shapes graph is dropped when the cache is full."""
+    registry = SchemaRegistry(max_shapes=1)
+    measurement = registry.get_shapes("shapes/measurement_request.ttl")
+    assert isinstance(measurement, Graph)
+    assert registry.get_shapes("shapes/measurement_request.ttl") is measurement
+
+    registry.get_shapes("shapes/workflow_launch.ttl")
+    assert registry.stats()["shapes"] == 1
+    assert registry.get_shapes("shapes/measurement_request.ttl") is not measurement
+
+
+def test_preload_and_semantics():
+    """Preloaded shapes are reused across validate_semantics calls."""
+    registry = SchemaRegistry().preload()
+    assert registry.stats() == {"schemas": 2, "shapes": 2}
+
+    data_graph = Graph()
+    data_graph.parse(
+        data="""
+        @prefix schema: <http://schema.org/> .
+        <urn:x> a schema:Action .
+        """,
+        format="turtle",
+    )
+    shapes = registry.get_shapes("shapes/measurement_request.ttl")
+    triples = set(shapes)
+
+    conforms, report = validate_semantics(data_graph, registry=registry)
+    assert not conforms
+    assert "instrument" in report
+    assert registry.get_shapes("shapes/measurement_request.ttl") is shapes
+    # pyshacl ran on this thread's copy, the shared graph is untouched
+    assert set(shapes) == triples
+
+
+def test_thread_shapes_are_private():
+    registry = SchemaRegistry(max_shapes=1)
+    mine = registry.get_thread_shapes("shapes/measurement_request.ttl")
+    assert registry.get_thread_shapes("shapes/measurement_request.ttl") is mine
+    assert mine is not registry.get_shapes("shapes/measurement_request.ttl")
+    assert set(mine) == set(registry.get_shapes("shapes/measurement_request.ttl"))
+
+    theirs = []
+    thread = threading.Thread(
+        target=lambda: theirs.append(registry.get_thread_shapes("shapes/measurement_request.ttl"))
+    )
+    thread.start()
+    thread.join()
+    assert theirs[0] is not mine
+
+    # a shared graph parsed again after eviction is copied again
+    registry.get_shapes("shapes/workflow_launch.ttl")
+    assert registry.get_thread_shapes("shapes/measurement_request.ttl") is not mine
+
+
+def test_missing_schema_reported():
+    valid, err = validate_structure({}, schema_filename="missing.json", registry=SchemaRegistry())
+    assert not valid
+    assert "missing.json" in err
+
+
+def test_shapes_dispatch():
+    registry = SchemaRegistry()
+    assert registry.shapes_for("request_measurement") == "shapes/measurement_request.ttl"
+    assert registry.shapes_for("launch_workflow") == "shapes/workflow_launch.ttl"
+    assert registry.shapes_for("register_data") is None
+    # the schema URI wins over the action
+    assert registry.shapes_for("register_data", "https://w3id.org/pcl-schema/measure-request/v1.0") == (
+        "shapes/measurement_request.ttl"
+    )
+    # replies carry no content shapes
+    assert registry.shapes_for("ack", "https://w3id.org/pcl-schema/reply/v1.0") is None
+    assert registry.shapes_for("nack") is None
+    with pytest.raises(KeyError):
+        registry.shapes_for("launch_rockets")
+
+    registry.register_shapes("shapes/workflow_launch.ttl", schema="https://example.org/launch/v2")
+    assert registry.shapes_for("launch_rockets", "https://example.org/launch/v2") == "shapes/workflow_launch.ttl"
+    assert registry.dispatched_shapes() == ("shapes/measurement_request.ttl", "shapes/workflow_launch.ttl")
+    with pytest.raises(ValueError):
+        registry.register_shapes("shapes/workflow_launch.ttl")
+
+
+@pytest.mark.parametrize("fast", [False, True])
+def test_dispatched_semantics_check_content_only(builder_defaults, valid_payload_data, fast):
+    builder = PCLMessageBuilder(**builder_defaults)
+    builder.set_content(**valid_payload_data)
+    builder.add_capability("xrd.powder.theta-2theta")
+    document = json.loads(builder.build().to_json())
+    # the metadata descriptor is a CreativeWork, which the acceptance criteria shape targets
+    del document["@graph"][0]["text"]
+
+    assert not validate_semantics(document, fast=fast)[0]
+    assert validate_semantics(document, None, fast=fast)[0]
+
+    del document["@graph"][3]["instrument"]
+    conforms, report = validate_semantics(document, None, fast=fast)
+    assert not conforms and "instrument" in report
+
+    document["@graph"][2]["action"] = "ack"
+    document["@graph"][2]["schema"] = "https://w3id.org/pcl-schema/reply/v1.0"
+    assert validate_semantics(document, None, fast=fast) == (True, None)
+
+    document["@graph"][2]["action"] = "launch_rockets"
+    document["@graph"][2]["schema"] = "https://example.org/rockets/v1"
+    assert validate_semantics(document, None, fast=fast) == (
+        False, "No shapes registered for action 'launch_rockets' or schema 'https://example.org/rockets/v1'"
+    )
@@ -0,0 +1,101 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from pcl_exchange.builder import PCLMessageBuilder
+from pcl_exchange.models import LazyPCLMessage
+from pcl_exchange.replay import ReplayGuard, ReplayResult, SQLiteReplayStore
+
+START = datetime(2026, 1, 1, tzinfo=timezone.utc)
+
+
+class Clock:
+    def __init__(self):
+        self.now = START.timestamp()
+
+    def __call__(self):
+        return self.now
+
+
+def _envelope(identifier, created=START, sender="https://ror.org/03yrm5c26"):
+    return {"identifier": identifier, "sender": sender, "dateCreated": created.isoformat().replace("+00:00", "Z")}
+
+
+def test_rejects_seen_identifiers():
+    guard = ReplayGuard(clock=Clock())
+    assert guard.check(_envelope("urn:uuid:1")) == ReplayResult(True)
+    assert guard.check(_envelope("urn:uuid:1")).reason == "Envelope identifier was already seen."
+    # identifiers are scoped to their sender
+    assert guard.check(_envelope("urn:uuid:1", sender="https://ror.org/01bj3aw27")).accepted
+    assert guard.check(_envelope("urn:uuid:2"), record=False).accepted
+    assert guard.check(_envelope("urn:uuid:2")).accepted
+    assert len(guard) == 3
+
+
+def test_rejects_dates_outside_window():
+    guard = ReplayGuard(max_age=300, max_skew=30, clock=Clock())
+    assert guard.check(_envelope("a", START - timedelta(seconds=301))).reason == "dateCreated is older than the replay window."
+    assert guard.check(_envelope("b", START + timedelta(seconds=31))).reason == "dateCreated is too far in the future."
+    assert guard.check(_envelope("c", START + timedelta(seconds=29))).accepted
+    assert not guard.check({"identifier": "d", "dateCreated": "yesterday"}).accepted
+    assert guard.check({"dateCreated": START}).reason == "Envelope has no identifier."
+
+
+def test_old_buckets_expire():
+    clock = Clock()
+    guard = ReplayGuard(max_age=300, max_skew=30, buckets=10, clock=clock)
+    for i in range(100):
+        assert guard.check(_envelope(f"urn:uuid:{i}", START - timedelta(seconds=i))).accepted
+    assert len(guard) == 100
+
+    clock.now += 250
+    guard.check(_envelope("fresh", START + timedelta(seconds=250)))
+    assert 1 < len(guard) < 101
+    clock.now += 400
+    guard.check(_envelope("later", START + timedelta(seconds=650)))
+    assert len(guard) == 1
+
+
+def test_full_cache_fails_closed():
+    guard = ReplayGuard(max_entries=2, clock=Clock())
+    assert guard.check(_envelope("a")).accepted and guard.check(_envelope("b")).accepted
+    assert guard.check(_envelope("c")).reason == "Replay cache is full."
+
+
+def test_store_survives_restart(tmp_path):
+    clock = Clock()
+    path = str(tmp_path / "replay.sqlite")
+    guard = ReplayGuard(store=SQLiteReplayStore(path, batch_size=1000), clock=clock)
+    assert guard.check(_envelope("a")).accepted
+    assert guard.check(_envelope("b", START - timedelta(seconds=200))).accepted
+    guard.close()
+
+    restarted = ReplayGuard(store=SQLiteReplayStore(path), clock=clock)
+    assert not restarted.check(_envelope("a")).accepted
+    assert len(restarted) == 2
+    restarted.close()
+
+    # entries that aged out while the receiver was down are not loaded
+    clock.now += 200
+    assert len(ReplayGuard(store=SQLiteReplayStore(path), clock=clock)) == 1
+
+
+def test_accepts_messages(builder_defaults, valid_payload_data):
+    builder = PCLMessageBuilder(**builder_defaults)
+    builder.set_content(**valid_payload_data)
+    builder.add_capability("xrd.powder.theta-2theta")
+    message = builder.build()
+    document = json.loads(message.to_json())
+
+    guard = ReplayGuard()
+    assert guard.check(message).accepted
+    assert not guard.check(document).accepted
+    assert not guard.check(LazyPCLMessage(document)).accepted
+    assert not guard.check(message.graph[2]).accepted
+    assert not ReplayGuard().check({"@graph": []}).accepted
+
+
+def test_invalid_window():
+    with pytest.raises(ValueError):
+        ReplayGuard(max_age=0)
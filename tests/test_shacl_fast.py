@@ -0,0 +1,194 @@
+import copy
+
+import pytest
+from pyshacl import validate
+from rdflib import Graph, Literal, URIRef
+from rdflib.namespace import RDF, RDFS
+
+from pcl_exchange.builder import PCLMessageBuilder
+from pcl_exchange.rdf import message_to_graph
+from pcl_exchange.registry import SchemaRegistry
+from pcl_exchange.shacl import SH, RDFSClosure, UnsupportedShapeError, compile_shapes, compute_closure
+from pcl_exchange.validation import validate_semantics
+
+SCHEMA = "http://schema.org/"
+MEASUREMENT = "shapes/measurement_request.ttl"
+
+
+def _build(builder_defaults, valid_payload_data):
+    builder = PCLMessageBuilder(**builder_defaults)
+    builder.set_content(**valid_payload_data)
+    return builder.build()
+
+
+def _pyshacl_results(data_graph, shape_graph, inference="rdfs"):
+    conforms, results_graph, text = validate(
+        data_graph, shacl_graph=shape_graph, inference=inference, abort_on_first=False, advanced=True
+    )
+    results = set()
+    for report in results_graph.subjects(RDF.type, SH.ValidationReport):
+        for result in results_graph.objects(report, SH.result):
+            results.add((
+                results_graph.value(result, SH.sourceConstraintComponent),
+                results_graph.value(result, SH.focusNode),
+                results_graph.value(result, SH.resultPath),
+                results_graph.value(result, SH.value),
+            ))
+    return conforms, results, text
+
+
+def _mutations(graph):
+    """Yields (label, graph) pairs each breaking or bending one constraint."""
+    content = next(graph.subjects(RDF.type, URIRef(SCHEMA + "Action")))
+    parameter = next(graph.objects(content, URIRef(SCHEMA + "parameter")))
+
+    def mutate(label, remove=(), add=()):
+        mutated = Graph()
+        for triple in graph:
+            mutated.add(triple)
+        for triple in remove:
+            mutated.remove(triple)
+        for triple in add:
+            mutated.add(triple)
+        return label, mutated
+
+    yield mutate("valid")
+    yield mutate("no instrument", remove=[(content, URIRef(SCHEMA + "instrument"), None)])
+    yield mutate("literal object", remove=[(content, URIRef(SCHEMA + "object"), None)],
+                 add=[(content, URIRef(SCHEMA + "object"), Literal("igsn:ABC123"))])
+    yield mutate("bad object pattern", remove=[(content, URIRef(SCHEMA + "object"), None)],
+                 add=[(content, URIRef(SCHEMA + "object"), URIRef("urn:sample:1"))])
+    yield mutate("no parameters", remove=[(content, URIRef(SCHEMA + "parameter"), None)])
+    yield mutate("parameter without value", remove=[(parameter, URIRef(SCHEMA + "value"), None)])
+    yield mutate("typed name", remove=[(parameter, URIRef(SCHEMA + "name"), None)],
+                 add=[(parameter, URIRef(SCHEMA + "name"), Literal(3))])
+    yield mutate("two units", add=[
+        (parameter, URIRef(SCHEMA + "unitText"), Literal("mm")),
+        (parameter, URIRef(SCHEMA + "unitText"), Literal("cm")),
+    ])
+    yield mutate("two attributions", add=[
+        (content, URIRef("http://www.w3.org/ns/prov#wasAttributedTo"), URIRef("https://example.org/a")),
+        (content, URIRef("http://www.w3.org/ns/prov#wasAttributedTo"), URIRef("https://example.org/b")),
+    ])
+    yield mutate("criteria without text", add=[
+        (content, URIRef(SCHEMA + "expectsAcceptanceCriteria"), URIRef("https://example.org/criteria")),
+    ])
+    yield mutate("method without identifier", add=[
+        (URIRef("https://example.org/method"), RDF.type, URIRef(SCHEMA + "CreativeWork")),
+        (URIRef("https://example.org/method"), URIRef(SCHEMA + "name"), Literal("XRD")),
+    ])
+
+
+def test_fast_path_matches_pyshacl(builder_defaults, valid_payload_data):
+    registry = SchemaRegistry()
+    shape_graph = registry.get_shapes(MEASUREMENT)
+    compiled = compile_shapes(shape_graph)
+    graph = message_to_graph(_build(builder_defaults, valid_payload_data))
+
+    for label, data_graph in _mutations(graph):
+        expected_conforms, expected, expected_text = _pyshacl_results(data_graph, shape_graph)
+        fast = compiled.results(data_graph)
+        actual = {(r.component, r.focus_node, r.result_path, r.value) for r in fast}
+        assert actual == expected, label
+        conforms, text = compiled.validate(data_graph)
+        assert conforms == expected_conforms, label
+        assert text == expected_text, label
+
+
+def test_fast_validate_semantics(builder_defaults, valid_payload_data):
+    message = _build(builder_defaults, valid_payload_data)
+    document = message.model_dump(mode="json", by_alias=True)
+
+    for data in (message, document, message.to_json()):
+        assert validate_semantics(data, fast=True) == validate_semantics(data)
+
+    broken = copy.deepcopy(document)
+    broken["@graph"][3]["parameter"] = []
+    conforms, report = validate_semantics(broken, fast=True)
+    assert not conforms
+    assert (conforms, report) == validate_semantics(broken)
+
+
+def test_unsupported_shapes_fall_back():
+    registry = SchemaRegistry()
+    with pytest.raises(UnsupportedShapeError):
+        compile_shapes(registry.get_shapes("shapes/workflow_launch.ttl"))
+    assert registry.get_compiled_shapes("shapes/workflow_launch.ttl") is None
+    assert registry.get_compiled_shapes(MEASUREMENT) is not None
+
+
+def test_rdfs_vocabulary_in_data_falls_back(builder_defaults, valid_payload_data):
+    graph = message_to_graph(_build(builder_defaults, valid_payload_data))
+    graph.add((URIRef("https://example.org/Request"), URIRef("http://www.w3.org/2000/01/rdf-schema#subClassOf"),
+               URIRef(SCHEMA + "Action")))
+    compiled = SchemaRegistry().get_compiled_shapes(MEASUREMENT)
+    assert compiled.validate(graph) is None
+    assert validate_semantics(graph, fast=True) == validate_semantics(graph)
+
+
+def _graph(triples):
+    graph = Graph()
+    for triple in triples:
+        graph.add(triple)
+    return graph
+
+
+def test_closure_matches_rdfs(builder_defaults, valid_payload_data):
+    registry = SchemaRegistry()
+    shape_graph = registry.get_shapes(MEASUREMENT)
+    closure = registry.get_closure(MEASUREMENT)
+    graph = message_to_graph(_build(builder_defaults, valid_payload_data))
+
+    for label, data_graph in _mutations(graph):
+        expected_conforms, expected, _ = _pyshacl_results(data_graph, shape_graph)
+        conforms, actual, _ = _pyshacl_results(_graph(closure.expand(data_graph)), shape_graph, inference="none")
+        assert (conforms, actual) == (expected_conforms, expected), label
+
+    message = _build(builder_defaults, valid_payload_data)
+    broken = message.model_dump(mode="json", by_alias=True)
+    broken["@graph"][3]["parameter"] = []
+    for data in (message, broken):
+        assert validate_semantics(data, inference="closure")[0] == validate_semantics(data)[0]
+        assert validate_semantics(data, fast=True, inference="closure") == validate_semantics(data, fast=True)
+
+
+def test_closure_applies_shapes_vocabulary(builder_defaults, valid_payload_data):
+    request = URIRef("https://example.org/Request")
+    used = URIRef("https://example.org/used")
+    vocabulary = [
+        (request, RDFS.subClassOf, URIRef(SCHEMA + "Action")),
+        (used, RDFS.subPropertyOf, URIRef("http://www.w3.org/ns/prov#used")),
+        (used, RDFS.domain, request),
+    ]
+    shape_graph = SchemaRegistry().get_shapes(MEASUREMENT)
+    closure = RDFSClosure(vocabulary)
+    assert closure.superclasses == {request: {URIRef(SCHEMA + "Action")}}
+
+    graph = message_to_graph(_build(builder_defaults, valid_payload_data))
+    content = next(graph.subjects(RDF.type, URIRef(SCHEMA + "Action")))
+    method = graph.value(content, URIRef("http://www.w3.org/ns/prov#used"))
+    graph.remove((content, RDF.type, None))
+    graph.remove((content, URIRef("http://www.w3.org/ns/prov#used"), None))
+    graph.add((content, used, method))
+
+    # the content is only an Action, and only has prov:used, through the vocabulary
+    expanded = _graph(closure.expand(graph))
+    assert (content, RDF.type, URIRef(SCHEMA + "Action")) in expanded
+    expected = _pyshacl_results(_graph(list(graph) + vocabulary), shape_graph)
+    actual = _pyshacl_results(expanded, shape_graph, inference="none")
+    assert actual[:2] == expected[:2] == (True, set())
+    graph.remove((content, URIRef(SCHEMA + "instrument"), None))
+    assert not _pyshacl_results(_graph(closure.expand(graph)), shape_graph, inference="none")[0]
+
+    # vocabulary in the data needs the full inference run
+    assert closure.expand(list(graph) + vocabulary) is None
+    with_vocabulary = _graph(list(graph) + vocabulary)
+    assert validate_semantics(with_vocabulary, inference="closure") == validate_semantics(with_vocabulary)
+
+
+def test_closure_refuses_rdfs_targets():
+    shape_graph = Graph()
+    shape_graph.add((URIRef("urn:shape"), SH.targetClass, RDFS.Resource))
+    assert compute_closure(shape_graph) is None
+    with pytest.raises(ValueError):
+        validate_semantics({}, inference="owl")
@@ -1,4 +1,6 @@
-from pcl_exchange.validation import validate_semantics, validate_structure
+from pcl_exchange.builder import PCLMessageBuilder
+from pcl_exchange.crypto import Signer
+from pcl_exchange.validation import validate_many, validate_message, validate_semantics, validate_structure
 
 import json
 
@@ -13,4 +15,41 @@ def test_example_compliance():
 
     # check semantics
     conforms, report = validate_semantics(data, "shapes/measurement_request.ttl")
-    assert conforms, f"SHACL failed: {report}"
\ No newline at end of file
+    assert conforms, f"SHACL failed: {report}"
+
+def _signed_message(builder_defaults, valid_payload_data, key_pair):
+    builder = PCLMessageBuilder(**builder_defaults)
+    builder.set_content(**valid_payload_data)
+    builder.add_capability("xrd.powder.theta-2theta")
+    builder.sign(Signer(key_pair))
+    return builder.build()
+
+
+def test_validate_message(builder_defaults, valid_payload_data, key_pair):
+    message = _signed_message(builder_defaults, valid_payload_data, key_pair)
+    assert validate_message(message) == (True, None)
+    assert validate_message(message.to_json()) == (True, None)
+
+    document = json.loads(message.to_json())
+    document["@graph"][2]["action"] = "launch_rockets"
+    valid, error = validate_message(document)
+    assert not valid and error.startswith("JSON Schema:")
+
+    assert validate_message("{not json")[0] is False
+
+
+def test_validate_many(builder_defaults, valid_payload_data, key_pair):
+    good = _signed_message(builder_defaults, valid_payload_data, key_pair).to_json()
+    broken = json.loads(good)
+    broken["@graph"][3]["parameter"] = []
+    items = [good, json.dumps(broken), good, "{not json", good]
+    expected = [True, False, True, False, True]
+
+    inline = list(validate_many(items, workers=1, chunksize=2))
+    assert [ok for ok, _ in inline] == expected
+
+    pooled = list(validate_many(iter(items), workers=2, chunksize=2))
+    assert pooled == inline
+
+    unordered = dict(validate_many(items, workers=2, chunksize=1, ordered=False, fast=True))
+    assert [unordered[i][0] for i in range(len(items))] == expected
@@ -0,0 +1,123 @@
+import json
+
+import pytest
+
+from pcl_exchange.builder import PCLMessageBuilder
+from pcl_exchange.crypto import Signer
+from pcl_exchange.jcs import canonicalize
+from pcl_exchange.models import ContentDigest, LazyPCLMessage, PCLEnvelope, PCLMessage
+from pcl_exchange.validation import validate_message
+from pcl_exchange.wire import ContentDigestError, check_content_digest, decompress, sniff
+
+
+def _build(builder_defaults, valid_payload_data, key_pair, encoding="identity", digest_alg=None):
+    builder = PCLMessageBuilder(**builder_defaults)
+    builder.set_content(**valid_payload_data)
+    builder.add_capability("xrd.powder.theta-2theta")
+    builder.set_encoding(encoding, digest_alg)
+    builder.sign(Signer(key_pair))
+    return builder.build()
+
+
+@pytest.mark.parametrize("encoding", ["identity", "gzip", "zstd"])
+def test_round_trip(encoding, builder_defaults, valid_payload_data, key_pair):
+    if encoding == "zstd":
+        pytest.importorskip("zstandard")
+    message = _build(builder_defaults, valid_payload_data, key_pair, encoding)
+    data = message.to_bytes()
+
+    assert sniff(data) == encoding
+    assert decompress(data)[0] == message.model_dump_json(by_alias=True).encode()
+    assert PCLMessage.from_bytes(data).to_json() == message.to_json()
+    assert isinstance(PCLMessage.from_bytes(data, lazy=True), LazyPCLMessage)
+    assert validate_message(data) == (True, None)
+
+
+def test_builder_fills_digest_before_signing(builder_defaults, valid_payload_data, key_pair):
+    message = _build(builder_defaults, valid_payload_data, key_pair, digest_alg="sha512")
+    envelope = next(n for n in message.graph if isinstance(n, PCLEnvelope))
+    content = canonicalize(message.graph[3].model_dump(mode="json", by_alias=True))
+
+    assert envelope.encoding == "identity"
+    assert envelope.content_digest.alg == "sha512"
+    assert len(envelope.content_digest.value) == 128
+    assert envelope.content_digest.size == len(content)
+    # the digest is part of what the signature covers
+    assert b"contentDigest" in envelope.canonical_bytes()
+    assert Signer(key_pair).sign(envelope) == envelope.authz.jws
+
+
+def test_tampered_content_is_rejected_before_parsing(builder_defaults, valid_payload_data, key_pair):
+    message = _build(builder_defaults, valid_payload_data, key_pair, "gzip")
+    document = json.loads(decompress(message.to_bytes())[0])
+    document["@graph"][3]["instrument"]["@id"] = "urn:malicious:instrument"
+    data = json.dumps(document).encode()
+
+    with pytest.raises(ContentDigestError):
+        PCLMessage.from_bytes(data)
+    assert PCLMessage.from_bytes(data, verify_digest=False).graph[3].instrument["@id"] == "urn:malicious:instrument"
+    ok, report = validate_message(data)
+    assert not ok and report.startswith("Content Digest:")
+
+    del document["@graph"][3]
+    with pytest.raises(ContentDigestError, match="missing"):
+        check_content_digest(document)
+
+
+def test_messages_without_digest_still_parse(builder_defaults, valid_payload_data, key_pair):
+    message = _build(builder_defaults, valid_payload_data, key_pair)
+    envelope = message.graph[2]
+    envelope.content_digest = None
+    envelope.encoding = None
+
+    # unset wire fields are left out instead of being sent as null
+    dumped = json.loads(message.to_json())["@graph"][2]
+    assert "contentDigest" not in dumped and "encoding" not in dumped
+    assert check_content_digest(json.loads(message.to_bytes())) is False
+    assert PCLMessage.from_bytes(message.to_bytes(encoding="gzip")).graph[2].content_digest is None
+
+
+def test_encoding_must_match_envelope(builder_defaults, valid_payload_data, key_pair):
+    message = _build(builder_defaults, valid_payload_data, key_pair, "gzip")
+    with pytest.raises(ValueError, match="declares encoding 'gzip'"):
+        message.to_bytes(encoding="identity")
+
+
+def test_compact_and_bounded(builder_defaults, valid_payload_data, key_pair):
+    message = _build(builder_defaults, valid_payload_data, key_pair)
+    compact = message.to_bytes()
+    assert b"\n" not in compact
+    assert len(compact) < len(message.to_json())
+
+    gzipped = _build(builder_defaults, valid_payload_data, key_pair, "gzip").to_bytes()
+    with pytest.raises(ValueError, match="Truncated"):
+        decompress(gzipped[:-12])
+    with pytest.raises(ValueError, match="expands beyond"):
+        PCLMessage.from_bytes(gzipped, max_size=100)
+
+
+def test_zstd_is_bounded():
+    zstandard = pytest.importorskip("zstandard")
+    bomb = zstandard.ZstdCompressor().compress(b"\0" * 50_000_000)
+    stream = zstandard.ZstdCompressor().compressobj()
+    unsized = stream.compress(b"{}" * 1000) + stream.flush()
+    with pytest.raises(ValueError, match="expands beyond 1000 bytes"):
+        decompress(bomb, max_size=1000)
+    assert decompress(unsized, max_size=2000)[0] == b"{}" * 1000
+    with pytest.raises(ValueError, match="expands beyond"):
+        decompress(unsized, max_size=1999)
+    for frame in (bomb, unsized):
+        with pytest.raises(ValueError, match="Truncated|Corrupt"):
+            decompress(frame[:-4], max_size=100_000_000)
+
+
+def test_content_digest_of_dict_and_model(builder_defaults, valid_payload_data, key_pair):
+    content = _build(builder_defaults, valid_payload_data, key_pair).graph[3]
+    node = json.loads(content.model_dump_json(by_alias=True))
+    digest = ContentDigest.of(content, "sha384")
+
+    assert digest == ContentDigest.of(node, "sha384")
+    assert digest.matches(node)
+    assert not digest.model_copy(update={"size": 1}).matches(node)
+    assert ContentDigest(value=digest.value.upper(), alg="sha384").matches(node)
+    assert "size" not in ContentDigest(value="0" * 64).model_dump()